@@ -1,29 +1,77 @@
 """
 TikTok Live WebSocket Server
 启动脚本 - 便捷启动FastAPI服务器
+
+用法:
+    python app.py                        # 开发模式：自动重载
+    python app.py --profile production   # 生产模式：uvloop + httptools（已安装时），无重载
 """
 
+import argparse
+import importlib.util
+import os
+
 import uvicorn
 
 from log.logger import logger
 from utils.config import Config
 
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def server_options(profile: str) -> dict:
+    """按运行配置生成 uvicorn 参数"""
+    if profile == "production":
+        # uvloop 不支持 Windows；未安装时回退到标准实现
+        return {
+            "reload": False,
+            "loop": "uvloop" if _installed("uvloop") else "asyncio",
+            "http": "httptools" if _installed("httptools") else "h11",
+            "ws": "websockets",
+            "access_log": False,
+        }
+    return {
+        "reload": True,  # 开发模式下自动重载
+        "loop": "asyncio",
+        "http": "h11",
+    }
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TikTok直播WebSocket服务器")
+    parser.add_argument(
+        "--profile",
+        choices=("development", "production"),
+        default=os.getenv("APP_PROFILE", "development"),
+        help="运行配置（也可通过 APP_PROFILE 设置）",
+    )
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    args = parser.parse_args()
+
     # 验证配置
     if not Config.validate():
         logger.error("[App] [❌ 配置验证失败] | [请检查.env文件中的配置]")
         exit(1)
 
+    options = server_options(args.profile)
+
     logger.info("[App] [🚀 启动TikTok直播WebSocket服务器]")
+    logger.info(
+        f"[App] [⚙️ 运行配置] | [配置: {args.profile}] | [事件循环: {options['loop']}] | "
+        f"[HTTP: {options['http']}] | [自动重载: {options['reload']}]"
+    )
     logger.info(f"[App] [📡 API服务器] | [地址: {Config.TIKHUB_BASE_URL}]")
-    logger.info("[App] [🌐 WebSocket端点] | [路径: ws://localhost:8000/ws/{{room_id}}]")
-    logger.info("[App] [📖 访问文档] | [地址: http://localhost:8000/docs]")
+    logger.info(f"[App] [🌐 WebSocket端点] | [路径: ws://localhost:{args.port}/ws/{{room_id}}]")
+    logger.info(f"[App] [📖 访问文档] | [地址: http://localhost:{args.port}/docs]")
 
     # 启动服务器
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,  # 开发模式下自动重载
+        host=args.host,
+        port=args.port,
         log_level="info",
+        **options,
     )
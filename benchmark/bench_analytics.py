@@ -0,0 +1,61 @@
+"""
+房间实时统计基准测试
+
+用法（在项目根目录执行）:
+    python -m benchmark.bench_analytics
+    python -m benchmark.bench_analytics --messages 200000 --users 50000
+
+合成负载经 MESSAGE_REGISTRY 解析后输入 RoomAnalytics，报告每条消息的统计耗时、
+近似去重的误差和统计结构的内存占用（应与消息数、用户数无关）。
+"""
+
+import argparse
+import time
+
+from benchmark.payloads import synthetic_payloads
+from crawler.analytics import RoomAnalytics
+from crawler.registry import MESSAGE_REGISTRY
+
+
+def main():
+    parser = argparse.ArgumentParser(description="房间实时统计基准测试")
+    parser.add_argument("--messages", type=int, default=100000, help="输入的消息数")
+    parser.add_argument("--users", type=int, default=20000, help="不同用户数")
+    parser.add_argument("--rate", type=int, default=2000, help="模拟的消息速率（条/秒）")
+    args = parser.parse_args()
+
+    decoded = []
+    for item in synthetic_payloads(200):
+        decoded.append((item["method"], MESSAGE_REGISTRY[item["method"]].decode(item["payload"])))
+
+    # 按用户数改写用户 id，复用解析结果
+    messages = []
+    for i in range(args.messages):
+        method, data = decoded[i % len(decoded)]
+        user = dict(data.get("user") or {}, id=str(7000000000000000000 + i % args.users))
+        messages.append((method, dict(data, user=user)))
+
+    analytics = RoomAnalytics()
+    base = time.monotonic()
+    start = time.perf_counter()
+    for i, (method, data) in enumerate(messages):
+        analytics.feed(method, data, now=base + i / args.rate)
+    elapsed = time.perf_counter() - start
+
+    snapshot_start = time.perf_counter()
+    snapshot = analytics.snapshot(now=base + args.messages / args.rate)
+    snapshot_ms = (time.perf_counter() - snapshot_start) * 1000
+
+    expected = min(args.users, args.messages)
+    print(f"消息: {args.messages} | 用户: {args.users} | 模拟速率: {args.rate}/s")
+    print(f"统计耗时: {elapsed / args.messages * 1e6:.2f} µs/条 | 快照耗时: {snapshot_ms:.2f} ms")
+    print(
+        f"去重用户: {snapshot['unique_users']}（实际 {expected}，"
+        f"误差 {abs(snapshot['unique_users'] - expected) / expected:.1%}）"
+    )
+    print(f"统计结构内存: {snapshot['memory_bytes']} 字节")
+    print(f"5m 窗口: {snapshot['windows']['5m']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+连击礼物聚合基准测试
+
+用法（在项目根目录执行）:
+    python -m benchmark.bench_combo
+    python -m benchmark.bench_combo --users 500 --streak 50 --gap 0.1
+
+模拟礼物高峰：users 个用户同时连击，每人连击 streak 次、每次间隔 gap 秒（按模拟时钟推进，
+不实际等待）。负载经 MESSAGE_REGISTRY 解析后输入 GiftComboAggregator，统计聚合前后的
+消息数、字节数和聚合耗时。
+"""
+
+import argparse
+import time
+
+from benchmark.payloads import _fill_common, _fill_image, _fill_user
+from crawler.combo import GiftComboAggregator
+from crawler.registry import MESSAGE_REGISTRY
+from proto.tiktok.tiktok_webcast_pb2 import GiftMessage
+
+
+def gift_storm(users: int, streak: int):
+    """按时间顺序交错生成每个用户的连击消息"""
+    payloads = []
+    for step in range(streak):
+        for user in range(users):
+            gift = GiftMessage()
+            _fill_common(gift.common, "WebcastGiftMessage", 7514168917980400426, step * users + user)
+            _fill_user(gift.user, user)
+            gift.gift_id = 5655
+            gift.group_id = 1734000000000 + user
+            gift.repeat_count = step + 1
+            gift.combo_count = step + 1
+            gift.repeat_end = 1 if step == streak - 1 else 0
+            gift.gift.describe = "sent Rose"
+            gift.gift.name = "Rose"
+            gift.gift.id = 5655
+            gift.gift.diamond_count = 1
+            gift.gift.combo = True
+            _fill_image(gift.gift.image, "rose", urls=4)
+            payloads.append((step, gift.SerializeToString()))
+    return payloads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="连击礼物聚合基准测试")
+    parser.add_argument("--users", type=int, default=200, help="同时连击的用户数")
+    parser.add_argument("--streak", type=int, default=30, help="每个用户的连击次数")
+    parser.add_argument("--gap", type=float, default=0.2, help="连击间隔（秒，模拟时钟）")
+    parser.add_argument("--progress-interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    spec = MESSAGE_REGISTRY["WebcastGiftMessage"]
+    messages = []
+    for step, payload in gift_storm(args.users, args.streak):
+        data = spec.decode(payload)
+        messages.append((step * args.gap, data, spec.encoder(data)))
+
+    aggregator = GiftComboAggregator(
+        progress_interval=args.progress_interval, max_combos=args.users * 2
+    )
+    frames = []
+    start = time.perf_counter()
+    for now, data, _ in messages:
+        frames.extend(aggregator.feed(data, now=now))
+    elapsed = time.perf_counter() - start
+
+    in_bytes = sum(len(frame.encode()) for _, _, frame in messages)
+    out_bytes = sum(len(frame.encode()) for frame in frames)
+    print(f"用户: {args.users} | 连击: {args.streak} 次 × {args.gap}s | 进度间隔: {args.progress_interval}s")
+    print(f"{'':8} {'messages':>10} {'bytes':>12}")
+    print(f"{'raw':8} {len(messages):>10} {in_bytes:>12}")
+    print(f"{'combo':8} {len(frames):>10} {out_bytes:>12}")
+    print(
+        f"消息数减少 {1 - len(frames) / len(messages):.1%} | 字节数减少 {1 - out_bytes / in_bytes:.1%} | "
+        f"聚合耗时 {elapsed / len(messages) * 1e6:.2f} µs/条"
+    )
+
+
+if __name__ == "__main__":
+    main()
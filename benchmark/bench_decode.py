@@ -0,0 +1,189 @@
+"""
+解码流水线基准测试（跨 protobuf 后端）
+
+用法（在项目根目录执行）:
+    python -m benchmark.bench_decode                       # 测试 python / upb / cpp 三种后端
+    python -m benchmark.bench_decode --backends upb --frames 2000
+    python -m benchmark.bench_decode --payloads recorded.jsonl
+
+按 handle_wss_message 的处理顺序分阶段计时：
+    push_frame  - PushFrame.ParseFromString
+    gzip        - 解压 payload
+    response    - Response.ParseFromString
+    parse       - 各消息类型 ParseFromString（按 method 统计）
+    encode      - MessageToDict + json.dumps
+
+每个后端在独立子进程中运行（后端只能在导入 protobuf 前通过
+PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION 选择），结果用于评估单机容量。
+"""
+
+import argparse
+import gzip
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+BACKENDS = ("python", "upb", "cpp")
+
+
+def _build_frames(items, per_frame: int):
+    from proto.tiktok.tiktok_webcast_pb2 import PushFrame, Response
+
+    frames = []
+    for i in range(0, len(items), per_frame):
+        response = Response()
+        for item in items[i : i + per_frame]:
+            msg = response.messages.add()
+            msg.method = item["method"]
+            msg.payload = item["payload"]
+        response.needAck = True
+        response.internalExt = "internal_ext:1"
+        frame = PushFrame()
+        frame.payload_encoding = "pb"
+        frame.payload_type = "msg"
+        frame.logid = i
+        frame.payload = gzip.compress(response.SerializeToString())
+        frames.append(frame.SerializeToString())
+    return frames
+
+
+def run_child(args) -> dict:
+    """在当前进程（已选定后端）中运行基准测试"""
+    from google.protobuf.internal import api_implementation
+
+    from benchmark.payloads import load_payloads
+    from crawler.registry import MESSAGE_REGISTRY, full_projection
+    from proto.tiktok.tiktok_webcast_pb2 import PushFrame, Response
+
+    items = load_payloads(args.payloads, args.count)
+    frames = _build_frames(items, args.per_frame)
+    stages = defaultdict(float)
+    parse_by_method = defaultdict(float)
+    encode_by_method = defaultdict(float)
+    count_by_method = defaultdict(int)
+    clock = time.perf_counter
+    total_msgs = 0
+
+    start_all = clock()
+    for n in range(args.frames):
+        raw = frames[n % len(frames)]
+        t0 = clock()
+        frame = PushFrame()
+        frame.ParseFromString(raw)
+        t1 = clock()
+        payload = gzip.decompress(frame.payload)
+        t2 = clock()
+        response = Response()
+        response.ParseFromString(payload)
+        t3 = clock()
+        stages["push_frame"] += t1 - t0
+        stages["gzip"] += t2 - t1
+        stages["response"] += t3 - t2
+        for msg in response.messages:
+            spec = MESSAGE_REGISTRY.get(msg.method)
+            if spec is None:
+                continue
+            t4 = clock()
+            message = spec.message_cls()
+            message.ParseFromString(msg.payload)
+            t5 = clock()
+            json.dumps(full_projection(message))
+            t6 = clock()
+            parse_by_method[msg.method] += t5 - t4
+            encode_by_method[msg.method] += t6 - t5
+            count_by_method[msg.method] += 1
+            total_msgs += 1
+    elapsed = clock() - start_all
+
+    stages["parse"] = sum(parse_by_method.values())
+    stages["encode"] = sum(encode_by_method.values())
+    return {
+        "backend": api_implementation.Type(),
+        "frames": args.frames,
+        "messages": total_msgs,
+        "elapsed": elapsed,
+        "stages": dict(stages),
+        "methods": {
+            m: {
+                "count": count_by_method[m],
+                "parse": parse_by_method[m],
+                "encode": encode_by_method[m],
+            }
+            for m in count_by_method
+        },
+    }
+
+
+def _spawn(backend: str, argv) -> dict:
+    env = dict(os.environ, PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION=backend)
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmark.bench_decode", "--child", *argv],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        return {"backend": backend, "error": proc.stderr.strip().splitlines()[-1:]}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if result["backend"] != backend:
+        return {"backend": backend, "error": [f"后端不可用（实际为 {result['backend']}）"]}
+    return result
+
+
+def _print_report(results) -> None:
+    print(f"{'backend':<8}{'frames/s':>10}{'msgs/s':>10}  " + "".join(
+        f"{s + ' us':>14}" for s in ("push_frame", "gzip", "response", "parse", "encode")
+    ))
+    for r in results:
+        if "error" in r:
+            print(f"{r['backend']:<8}  不可用: {' '.join(r['error'])}")
+            continue
+        frames, msgs, elapsed = r["frames"], r["messages"], r["elapsed"]
+        cols = "".join(
+            f"{r['stages'][s] / frames * 1e6:>14.1f}"
+            for s in ("push_frame", "gzip", "response", "parse", "encode")
+        )
+        print(f"{r['backend']:<8}{frames / elapsed:>10.0f}{msgs / elapsed:>10.0f}  {cols}")
+    print()
+    print(f"{'backend':<8}{'method':<32}{'parse us':>10}{'encode us':>11}")
+    for r in results:
+        if "error" in r:
+            continue
+        for method, m in sorted(r["methods"].items()):
+            print(
+                f"{r['backend']:<8}{method:<32}"
+                f"{m['parse'] / m['count'] * 1e6:>10.1f}{m['encode'] / m['count'] * 1e6:>11.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="解码流水线基准测试")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--frames", type=int, default=500, help="处理的帧数")
+    parser.add_argument("--per-frame", type=int, default=8, help="每帧消息数")
+    parser.add_argument("--count", type=int, default=50, help="合成负载数量（每种类型）")
+    parser.add_argument("--payloads", help="录制的负载文件（JSONL）")
+    parser.add_argument("--json", action="store_true", help="输出 JSON 结果")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args)))
+        return
+
+    argv = ["--frames", str(args.frames), "--per-frame", str(args.per_frame),
+            "--count", str(args.count)]
+    if args.payloads:
+        argv += ["--payloads", args.payloads]
+    results = [_spawn(b.strip(), argv) for b in args.backends.split(",") if b.strip()]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_report(results)
+
+
+if __name__ == "__main__":
+    main()
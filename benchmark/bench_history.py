@@ -0,0 +1,108 @@
+"""
+消息历史库基准测试
+
+用法（在项目根目录执行）:
+    python -m benchmark.bench_history
+    python -m benchmark.bench_history --rows 2000000 --rooms 200 --users 100000
+
+在临时目录中建库，按模拟时钟写入 hours 小时内均匀分布的弹幕 / 礼物消息，报告：
+批量写入吞吐（行/秒）、房间最近 1 小时与单用户查询的 p50 / p99 延迟、
+按保留时长清理一半数据的耗时与库文件大小。
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from sinks.history import HistoryStore
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def timed(func, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000
+
+
+async def run(args, path: str):
+    store = HistoryStore(path, batch_size=args.batch_size, max_buffer=args.rows, retention=0)
+    rng = random.Random(0)
+    end = time.time()
+    start_ts = end - args.hours * 3600
+    step = args.hours * 3600 / args.rows
+    for i in range(args.rows):
+        user_id = str(7000000000000000000 + rng.randrange(args.users))
+        user = {"id": user_id, "nickname": f"用户_{user_id[-5:]}"}
+        room_id = str(7514168917980400000 + rng.randrange(args.rooms))
+        if i % 10:
+            data = {"user": user, "content": f"弹幕内容 {i}"}
+            store.offer(room_id, "WebcastChatMessage", data, start_ts + i * step)
+        else:
+            data = {"user": user, "gift": {"name": "Rose"}, "repeat_count": "3"}
+            store.offer(room_id, "WebcastGiftMessage", data, start_ts + i * step)
+
+    start = time.perf_counter()
+    await store.flush()
+    insert_elapsed = time.perf_counter() - start
+
+    now_ms = int(end * 1000)
+    hour_ago = now_ms - 3600 * 1000
+    room_ms = [
+        timed(
+            store.query,
+            room_id=str(7514168917980400000 + rng.randrange(args.rooms)),
+            since=hour_ago,
+            limit=100,
+        )
+        for _ in range(args.queries)
+    ]
+    user_ms = [
+        timed(
+            store.query,
+            user_id=str(7000000000000000000 + rng.randrange(args.users)),
+            since=now_ms - args.hours * 3600 * 1000,
+            limit=100,
+        )
+        for _ in range(args.queries)
+    ]
+
+    size = store.stats()["file_bytes"]
+    store.retention = args.hours * 3600 / 2
+    start = time.perf_counter()
+    deleted = await store.compact()
+    compact_elapsed = time.perf_counter() - start
+    await store.close()
+    return insert_elapsed, room_ms, user_ms, size, deleted, compact_elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="消息历史库基准测试")
+    parser.add_argument("--rows", type=int, default=500000, help="写入的消息数")
+    parser.add_argument("--rooms", type=int, default=100, help="房间数")
+    parser.add_argument("--users", type=int, default=50000, help="不同用户数")
+    parser.add_argument("--hours", type=float, default=24, help="消息覆盖的时长（小时）")
+    parser.add_argument("--batch-size", type=int, default=5000, help="每个写入事务的行数")
+    parser.add_argument("--queries", type=int, default=200, help="每类查询的次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "history.db")
+        insert_elapsed, room_ms, user_ms, size, deleted, compact_elapsed = asyncio.run(run(args, path))
+
+    print(f"消息: {args.rows} | 房间: {args.rooms} | 用户: {args.users} | 时长: {args.hours}h")
+    print(f"批量写入: {args.rows / insert_elapsed:,.0f} 行/秒（每事务 {args.batch_size} 行）")
+    print(f"房间最近 1 小时: p50 {percentile(room_ms, 0.5):.2f} ms | p99 {percentile(room_ms, 0.99):.2f} ms")
+    print(f"单用户查询: p50 {percentile(user_ms, 0.5):.2f} ms | p99 {percentile(user_ms, 0.99):.2f} ms")
+    print(f"库文件: {size / 1e6:.1f} MB（{size / args.rows:.0f} 字节/行）")
+    print(f"清理一半数据: {deleted} 行 | {compact_elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Parquet 归档基准测试（需安装 pyarrow）
+
+用法（在项目根目录执行）:
+    python -m benchmark.bench_parquet
+    python -m benchmark.bench_parquet --rows 500000 --batch-rows 100000 --compression snappy
+
+合成负载经 MESSAGE_REGISTRY 解析后输入 ParquetSink（写到临时目录），分别报告：
+事件循环中的缓冲耗时（µs/行）、线程池中的写出吞吐（行/秒）、每行的缓冲内存与文件大小。
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmark.payloads import synthetic_payloads
+from crawler.projection import parse_projection_config
+from crawler.registry import MESSAGE_REGISTRY
+from sinks.parquet import ParquetSink
+from utils.config import Config
+
+
+def _dir_size(root: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(path, name))
+        for path, _, names in os.walk(root)
+        for name in names
+    )
+
+
+async def run(args, payloads, messages, root: str):
+    sink = ParquetSink(
+        root,
+        parse_projection_config(Config.PARQUET_COLUMNS),
+        batch_rows=args.batch_rows,
+        max_pending=args.rows // args.batch_rows + 8,
+        compression=args.compression,
+    )
+    now = time.time()
+
+    # 单个批次的缓冲内存（每行重新解析，列值不与其它行共享对象）
+    tracemalloc.start()
+    sample = min(args.batch_rows - 1, 20000)
+    for i in range(sample):
+        item = payloads[i % len(payloads)]
+        data = MESSAGE_REGISTRY[item["method"]].decode(item["payload"])
+        sink.offer("7514168917980400426", item["method"], data, now)
+    buffered, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await sink.flush(force=True)
+
+    start = time.perf_counter()
+    for i in range(args.rows):
+        method, data = messages[i % len(messages)]
+        sink.offer("7514168917980400426", method, data, now)
+    offer_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await sink.flush(force=True)
+    write_elapsed = time.perf_counter() - start
+    return sink, sample, buffered, offer_elapsed, write_elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parquet 归档基准测试")
+    parser.add_argument("--rows", type=int, default=200000, help="写入的消息数")
+    parser.add_argument("--batch-rows", type=int, default=50000, help="每个批次的行数上限")
+    parser.add_argument("--compression", default="zstd", help="snappy / zstd / gzip / none")
+    args = parser.parse_args()
+
+    payloads = synthetic_payloads(200)
+    messages = [
+        (item["method"], MESSAGE_REGISTRY[item["method"]].decode(item["payload"]))
+        for item in payloads
+    ]
+
+    with tempfile.TemporaryDirectory() as root:
+        sink, sample, buffered, offer_elapsed, write_elapsed = asyncio.run(
+            run(args, payloads, messages, root)
+        )
+        size = _dir_size(root)
+
+    total = args.rows + sample
+    print(f"消息: {args.rows} | 批次行数: {args.batch_rows} | 压缩: {args.compression}")
+    print(f"缓冲耗时: {offer_elapsed / args.rows * 1e6:.2f} µs/行（事件循环）")
+    print(
+        f"写出吞吐: {args.rows / write_elapsed:,.0f} 行/秒（线程池）| "
+        f"文件数: {sink.written_files}"
+    )
+    print(
+        f"缓冲内存: {buffered / sample:.0f} 字节/行 | "
+        f"满批次约 {buffered / sample * args.batch_rows / 1e6:.1f} MB"
+    )
+    print(f"文件大小: {size / total:.1f} 字节/行")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+运行配置基准测试：事件循环 / HTTP 解析器 / JSON 后端
+
+用法（在项目根目录执行）:
+    python -m benchmark.bench_profiles
+    python -m benchmark.bench_profiles --clients 50 --rate 400 --seconds 10
+    python -m benchmark.bench_profiles --profiles baseline,production
+
+每个配置启动一个独立的服务进程：上游用合成负载替代（不访问 TikHub），
+按 --rate 帧/秒 推送到同一个房间，--clients 个 WebSocket 客户端以 ?ts=1 订阅。
+统计客户端实际收到的消息速率，以及从解析完成（_ts.decoded）到客户端收到的
+投递延迟 p50 / p99（同一台机器，时钟一致）。
+
+配置:
+    baseline    - asyncio + h11 + 标准库 json
+    production  - uvloop + httptools + orjson（未安装的组件自动回退，结果中注明）
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+PROFILES = {
+    "baseline": {"loop": "asyncio", "http": "h11", "json": "json"},
+    "production": {"loop": "uvloop", "http": "httptools", "json": "auto"},
+}
+
+
+def _build_frames(items, per_frame: int):
+    from proto.tiktok.tiktok_webcast_pb2 import PushFrame, Response
+
+    frames = []
+    now = int(time.time() * 1000)
+    for i in range(0, len(items), per_frame):
+        response = Response()
+        response.now = now
+        for item in items[i : i + per_frame]:
+            msg = response.messages.add()
+            msg.method = item["method"]
+            msg.payload = item["payload"]
+        frame = PushFrame()
+        frame.payload_encoding = "pb"
+        frame.payload = response.SerializeToString()
+        frames.append(frame.SerializeToString())
+    return frames
+
+
+def serve(args) -> None:
+    """服务进程：用合成负载替换上游后启动 uvicorn"""
+    import importlib.util
+    from unittest import mock
+
+    import uvicorn
+
+    import main
+    from benchmark.payloads import load_payloads
+
+    frames = _build_frames(load_payloads(args.payloads, args.count), args.per_frame)
+
+    async def fake_check_live_alive(room_id):
+        return {"live_room_status": {"data": [{"alive": True}]}}
+
+    async def fake_fetch_live_danmaku(crawler, params):
+        loop = asyncio.get_running_loop()
+        interval = 1 / args.rate
+        deadline = loop.time()
+        i = 0
+        while True:
+            await crawler.handle_wss_message(frames[i % len(frames)])
+            i += 1
+            deadline += interval
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+
+    loop = args.loop if importlib.util.find_spec(args.loop) or args.loop == "asyncio" else "asyncio"
+    http = args.http if importlib.util.find_spec(args.http) or args.http == "h11" else "h11"
+    with open(args.info_file, "w") as f:
+        json.dump({"loop": loop, "http": http}, f)
+
+    with mock.patch.object(main, "fetch_check_live_alive", fake_check_live_alive), mock.patch.object(
+        main.DouyinWebSocketCrawler, "fetch_live_danmaku", fake_fetch_live_danmaku
+    ):
+        uvicorn.run(
+            main.app, host="127.0.0.1", port=args.port, loop=loop, http=http,
+            log_level="warning", access_log=False,
+        )
+
+
+async def _client(url: str, seconds: float, warmup: float, latencies: list, counts: list):
+    import websockets
+
+    async with websockets.connect(url, max_size=None) as ws:
+        start = time.monotonic()
+        received = 0
+        while True:
+            remaining = start + warmup + seconds - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                raw = await asyncio.wait_for(ws.recv(), remaining)
+            except asyncio.TimeoutError:
+                break
+            now_ms = time.time() * 1000
+            data = json.loads(raw)
+            ts = data.get("_ts") if isinstance(data, dict) else None
+            if ts is None or time.monotonic() - start < warmup:
+                continue
+            latencies.append(now_ms - ts["decoded"])
+            received += 1
+        counts.append(received)
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_profile(name: str, args) -> dict:
+    profile = PROFILES[name]
+    port = _free_port()
+    env = dict(
+        os.environ,
+        JSON_BACKEND=profile["json"],
+        TIKHUB_API_KEY=os.getenv("TIKHUB_API_KEY") or "benchmark",
+        LATENCY_TRACING="true",
+        MAX_LOOP_LAG="0",
+    )
+    cmd = [
+        sys.executable, "-m", "benchmark.bench_profiles", "--serve",
+        "--port", str(port), "--loop", profile["loop"], "--http", profile["http"],
+        "--rate", str(args.rate), "--per-frame", str(args.per_frame), "--count", str(args.count),
+    ]
+    if args.payloads:
+        cmd += ["--payloads", args.payloads]
+    info_file = tempfile.NamedTemporaryFile(suffix=".json", delete=False).name
+    cmd += ["--info-file", info_file]
+    # 服务日志量很大，丢弃输出避免管道写满阻塞服务进程
+    server = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        # 等待端口就绪
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        with open(info_file) as f:
+            actual = json.load(f)
+
+        json_backend = "json" if profile["json"] == "json" else _json_backend()
+        latencies: list = []
+        counts: list = []
+        url = f"ws://127.0.0.1:{port}/ws/bench?ts=1"
+
+        async def run_clients():
+            await asyncio.gather(
+                *(_client(url, args.seconds, args.warmup, latencies, counts) for _ in range(args.clients))
+            )
+
+        asyncio.run(run_clients())
+        total = sum(counts)
+        return {
+            "profile": name,
+            "loop": actual.get("loop"),
+            "http": actual.get("http"),
+            "json": json_backend,
+            "clients": args.clients,
+            "msgs_per_sec": total / args.seconds,
+            "p50_ms": _percentile(latencies, 0.5),
+            "p99_ms": _percentile(latencies, 0.99),
+        }
+    finally:
+        server.terminate()
+        try:
+            server.wait(10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        os.unlink(info_file)
+
+
+def _json_backend() -> str:
+    try:
+        import orjson  # noqa: F401
+
+        return "orjson"
+    except ImportError:
+        return "json"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="运行配置基准测试")
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--clients", type=int, default=20, help="WebSocket 客户端数")
+    parser.add_argument("--rate", type=float, default=200, help="上游推送帧数 / 秒")
+    parser.add_argument("--per-frame", type=int, default=8, help="每帧消息数")
+    parser.add_argument("--count", type=int, default=50, help="合成负载数量（每种类型）")
+    parser.add_argument("--seconds", type=float, default=5, help="统计时长（秒）")
+    parser.add_argument("--warmup", type=float, default=1, help="预热时长（秒）")
+    parser.add_argument("--payloads", help="录制的负载文件（JSONL）")
+    parser.add_argument("--json", action="store_true", help="输出 JSON 结果")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--loop", default="asyncio", help=argparse.SUPPRESS)
+    parser.add_argument("--http", default="h11", help=argparse.SUPPRESS)
+    parser.add_argument("--info-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    results = [run_profile(p.strip(), args) for p in args.profiles.split(",") if p.strip()]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'profile':<12}{'loop':<10}{'http':<11}{'json':<8}{'msgs/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(
+            f"{r['profile']:<12}{r['loop']:<10}{r['http']:<11}{r['json']:<8}"
+            f"{r['msgs_per_sec']:>10.0f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+字段投影 vs 完整解析 基准测试
+
+用法（在项目根目录执行）:
+    python -m benchmark.bench_projection
+    python -m benchmark.bench_projection --payloads recorded.jsonl --rounds 5
+
+对比三种方式处理同一批负载的吞吐：
+    full   - 现有处理方式：ParseFromString + MessageToDict + json.dumps
+    scan   - FieldProjection 线格式扫描
+    parse  - FieldProjection 完整解析后按属性读取
+"""
+
+import argparse
+import json
+import time
+from collections import defaultdict
+
+from google.protobuf.internal import api_implementation
+
+from benchmark.payloads import load_payloads
+from crawler.projection import FieldProjection
+from crawler.registry import MESSAGE_REGISTRY, full_projection
+
+DEFAULT_PROJECTIONS = {
+    "WebcastChatMessage": "user.nickname,user.id,content",
+    "WebcastGiftMessage": "user.nickname,user.id,gift.describe,gift.diamond_count,repeat_count,repeat_end",
+    "WebcastMemberMessage": "user.nickname,user.id,member_count",
+    "WebcastSocialMessage": "user.nickname,user.id,follow_count",
+}
+
+
+def _run(items, decoders, rounds: int) -> dict:
+    per_method = defaultdict(float)
+    counts = defaultdict(int)
+    for _ in range(rounds):
+        for item in items:
+            decoder = decoders.get(item["method"])
+            if decoder is None:
+                continue
+            start = time.perf_counter()
+            json.dumps(decoder(item["payload"]))
+            per_method[item["method"]] += time.perf_counter() - start
+            counts[item["method"]] += 1
+    return {m: (counts[m], per_method[m]) for m in per_method}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="字段投影基准测试")
+    parser.add_argument("--payloads", help="录制的负载文件（JSONL）")
+    parser.add_argument("--count", type=int, default=200, help="合成负载数量（每种类型）")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    items = load_payloads(args.payloads, args.count)
+    print(f"protobuf 后端: {api_implementation.Type()} | 负载数: {len(items)}")
+
+    def full_decoder(spec):
+        def decode(data):
+            message = spec.message_cls()
+            message.ParseFromString(data)
+            return full_projection(message)
+
+        return decode
+
+    variants = {
+        "full": {m: full_decoder(MESSAGE_REGISTRY[m]) for m in DEFAULT_PROJECTIONS},
+        "scan": {
+            m: FieldProjection(MESSAGE_REGISTRY[m].message_cls, p, "scan")
+            for m, p in DEFAULT_PROJECTIONS.items()
+        },
+        "parse": {
+            m: FieldProjection(MESSAGE_REGISTRY[m].message_cls, p, "parse")
+            for m, p in DEFAULT_PROJECTIONS.items()
+        },
+    }
+
+    results = {name: _run(items, decoders, args.rounds) for name, decoders in variants.items()}
+    print(f"{'method':<24}{'variant':<8}{'msgs/s':>12}{'us/msg':>10}{'speedup':>10}")
+    for method in DEFAULT_PROJECTIONS:
+        if method not in results["full"]:
+            continue
+        base_count, base_time = results["full"][method]
+        for name in variants:
+            count, elapsed = results[name][method]
+            rate = count / elapsed if elapsed else 0
+            speedup = base_time / elapsed if elapsed else 0
+            print(
+                f"{method:<24}{name:<8}{rate:>12.0f}{elapsed / count * 1e6:>10.1f}{speedup:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
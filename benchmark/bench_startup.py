@@ -0,0 +1,115 @@
+"""
+冷启动基准测试：导入耗时分析与 time-to-first-accept
+
+用法（在项目根目录执行）:
+    python -m benchmark.bench_startup                    # 导入分析 + 启动到首个请求成功的耗时
+    python -m benchmark.bench_startup --runs 10 --top 20
+    python -m benchmark.bench_startup --env LOG_CONSOLE=plain
+
+导入分析基于 ``python -X importtime -c "import main"``，按顶层包汇总自身耗时，
+并列出累计耗时最高的模块。time-to-first-accept 从启动 uvicorn 进程开始计时，
+到 ``GET /`` 首次返回 200 为止（包含解释器启动、导入、lifespan 启动）。
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+
+def import_profile(env: dict, top: int):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    by_package = defaultdict(int)
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        by_package[name.split(".")[0]] += int(self_us)
+        modules.append((int(cumulative_us), depth, name))
+    total = sum(by_package.values())
+    packages = sorted(by_package.items(), key=lambda x: x[1], reverse=True)[:top]
+    heaviest = sorted(modules, reverse=True)[:top]
+    return total, packages, heaviest
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_accept(env: dict, timeout: float = 30) -> float:
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=0.5).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.005)
+        raise TimeoutError("服务未在超时时间内启动")
+    finally:
+        server.terminate()
+        try:
+            server.wait(10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动基准测试")
+    parser.add_argument("--runs", type=int, default=5, help="time-to-first-accept 测量次数")
+    parser.add_argument("--top", type=int, default=15, help="显示前 N 个包 / 模块")
+    parser.add_argument("--env", action="append", default=[], help="附加环境变量 KEY=VALUE")
+    parser.add_argument("--skip-import", action="store_true", help="不做导入分析")
+    args = parser.parse_args()
+
+    env = dict(os.environ, TIKHUB_API_KEY=os.getenv("TIKHUB_API_KEY") or "benchmark")
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    if not args.skip_import:
+        total, packages, heaviest = import_profile(env, args.top)
+        print(f"import main: {total / 1000:.1f} ms（各模块自身耗时之和）\n")
+        print(f"{'package':<28}{'self ms':>10}")
+        for name, us in packages:
+            print(f"{name:<28}{us / 1000:>10.1f}")
+        print()
+        print(f"{'module':<48}{'cumulative ms':>14}")
+        for cumulative, depth, name in heaviest:
+            print(f"{'  ' * depth + name:<48}{cumulative / 1000:>14.1f}")
+        print()
+
+    samples = [time_to_first_accept(env) for _ in range(args.runs)]
+    print(
+        f"time-to-first-accept: median {statistics.median(samples) * 1000:.0f} ms, "
+        f"min {min(samples) * 1000:.0f} ms, max {max(samples) * 1000:.0f} ms（{args.runs} 次）"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+基准测试用的消息负载
+
+优先读取录制文件（JSONL，每行 {"method": "...", "payload": "<base64>"}），
+没有录制文件时生成结构接近线上数据的合成负载（完整的 User / GiftStruct / Image / Common 子树）。
+"""
+
+import base64
+import json
+from typing import Dict, List, Optional
+
+from proto.tiktok.tiktok_webcast_pb2 import (
+    ChatMessage,
+    GiftMessage,
+    MemberMessage,
+    SocialMessage,
+)
+
+
+def _fill_image(image, name: str, urls: int = 3) -> None:
+    image.urlList.extend(
+        f"https://p16-webcast.tiktokcdn.com/img/{name}/{i}~tplv-obj.webp" for i in range(urls)
+    )
+    image.uri = f"webcast-va/{name}"
+    image.height = 100
+    image.width = 100
+    image.avgColor = "#A3A3A3"
+
+
+def _fill_common(common, method: str, room_id: int, msg_id: int) -> None:
+    common.method = method
+    common.msgId = msg_id
+    common.roomId = room_id
+    common.createTime = 1734000000000 + msg_id
+    common.isShowMsg = True
+    common.describe = "{0:user} 的描述文本"
+    common.displayText.content = "{0:user} 显示文本"
+    common.displayText.fontColor = "#FFFFFF"
+    common.logId = "20241212000000" + str(msg_id)
+    common.priorityScore = 10000
+    common.fromIdc = "maliva"
+    common.toIdc = "maliva"
+    common.filterMsgTagsList.extend(["tag_a", "tag_b"])
+
+
+def _fill_user(user, uid: int) -> None:
+    user.id = 7000000000000000000 + uid
+    user.nickname = f"用户_{uid}"
+    user.bioDescription = "这是一个很长的个人简介" * 4
+    _fill_image(user.avatarThumb, f"avatar_thumb_{uid}")
+    _fill_image(user.avatarMedium, f"avatar_medium_{uid}")
+    _fill_image(user.avatarLarge, f"avatar_large_{uid}")
+    user.verified = uid % 2 == 0
+    user.createTime = 1600000000
+    for i in range(4):
+        _fill_image(user.badgeImageList.add(), f"badge_{i}")
+    user.displayId = f"display_{uid}"
+    user.secUid = "MS4wLjABAAAA" + "x" * 60
+    for i in range(3):
+        fan = user.topFansList.add()
+        fan.id = 6000000000000000000 + i
+        fan.nickname = f"粉丝_{i}"
+        _fill_image(fan.avatarThumb, f"fan_{i}")
+
+
+def synthetic_payloads(count: int = 200) -> List[Dict]:
+    """生成 chat/gift/member/social 四类合成负载"""
+    items: List[Dict] = []
+    for i in range(count):
+        chat = ChatMessage()
+        _fill_common(chat.common, "WebcastChatMessage", 7514168917980400426, i)
+        _fill_user(chat.user, i)
+        chat.content = f"这是第 {i} 条弹幕消息 hello world"
+        chat.content_language = "zh"
+        items.append({"method": "WebcastChatMessage", "payload": chat.SerializeToString()})
+
+        gift = GiftMessage()
+        _fill_common(gift.common, "WebcastGiftMessage", 7514168917980400426, i)
+        _fill_user(gift.user, i)
+        gift.gift_id = 5655
+        gift.repeat_count = i % 30 + 1
+        gift.combo_count = i % 30 + 1
+        gift.group_id = 1734000000000 + i // 30
+        gift.repeat_end = 1 if i % 30 == 29 else 0
+        gift.gift.describe = "sent Rose"
+        gift.gift.name = "Rose"
+        gift.gift.id = 5655
+        gift.gift.diamond_count = 1
+        gift.gift.combo = True
+        _fill_image(gift.gift.image, "rose", urls=4)
+        _fill_image(gift.gift.icon, "rose_icon", urls=4)
+        items.append({"method": "WebcastGiftMessage", "payload": gift.SerializeToString()})
+
+        member = MemberMessage()
+        _fill_common(member.common, "WebcastMemberMessage", 7514168917980400426, i)
+        _fill_user(member.user, i)
+        member.member_count = 10000 + i
+        member.action = 1
+        items.append({"method": "WebcastMemberMessage", "payload": member.SerializeToString()})
+
+        social = SocialMessage()
+        _fill_common(social.common, "WebcastSocialMessage", 7514168917980400426, i)
+        _fill_user(social.user, i)
+        social.action = 1
+        social.follow_count = 5000 + i
+        items.append({"method": "WebcastSocialMessage", "payload": social.SerializeToString()})
+    return items
+
+
+def load_payloads(path: Optional[str] = None, count: int = 200) -> List[Dict]:
+    """读取录制的负载文件，未指定时返回合成负载"""
+    if not path:
+        return synthetic_payloads(count)
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            items.append(
+                {"method": record["method"], "payload": base64.b64decode(record["payload"])}
+            )
+    return items
@@ -0,0 +1,232 @@
+import heapq
+import math
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from crawler.combo import is_combo_gift
+from crawler.registry import as_int
+
+# 各统计序列与滚动窗口（秒）
+SERIES = ("messages", "chats", "gifts", "diamonds", "members", "follows")
+WINDOWS = {"1s": 1, "1m": 60, "5m": 300}
+_MASK64 = (1 << 64) - 1
+
+
+class RollingCounters:
+    """
+    按秒分桶的滚动计数
+
+    每个序列一个定长数组（horizon + 1 个桶）循环复用，内存与消息量无关。
+    窗口统计只计算已结束的整秒，当前秒仍在累加中不计入。
+    """
+
+    __slots__ = ("size", "second", "buckets")
+
+    def __init__(
+        self, series=SERIES, horizon: int = max(WINDOWS.values()), now: Optional[float] = None
+    ):
+        self.size = horizon + 1
+        self.second = int(time.monotonic() if now is None else now)
+        self.buckets: Dict[str, array] = {name: array("d", bytes(8 * self.size)) for name in series}
+
+    def _advance(self, second: int) -> None:
+        gap = second - self.second
+        if gap <= 0:
+            return
+        size = self.size
+        for buckets in self.buckets.values():
+            if gap >= size:
+                for i in range(size):
+                    buckets[i] = 0.0
+            else:
+                for s in range(self.second + 1, second + 1):
+                    buckets[s % size] = 0.0
+        self.second = second
+
+    def add(self, name: str, value: float, second: int) -> None:
+        self._advance(second)
+        self.buckets[name][self.second % self.size] += value
+
+    def window(self, seconds: int, now: Optional[float] = None) -> Dict[str, float]:
+        """最近 seconds 个整秒内各序列的合计"""
+        self._advance(int(time.monotonic() if now is None else now))
+        size = self.size
+        slots = [(self.second - i) % size for i in range(1, min(seconds, size - 1) + 1)]
+        return {name: sum(buckets[i] for i in slots) for name, buckets in self.buckets.items()}
+
+    def memory_bytes(self) -> int:
+        return sum(b.buffer_info()[1] * b.itemsize for b in self.buckets.values())
+
+
+class HyperLogLog:
+    """
+    近似去重计数（HyperLogLog）
+
+    2^p 个 1 字节寄存器，p=10 时占用 1 KB，标准误差约 1.04 / sqrt(2^p) ≈ 3%。
+    使用进程内 hash()，结果只在本进程内有意义。
+    """
+
+    __slots__ = ("p", "registers")
+
+    def __init__(self, p: int = 10):
+        self.p = p
+        self.registers = bytearray(1 << p)
+
+    def add(self, item: str) -> None:
+        x = hash(item) & _MASK64
+        rest_bits = 64 - self.p
+        index = x >> rest_bits
+        rest = x & ((1 << rest_bits) - 1)
+        rank = rest_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0**-r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # 小基数修正（线性计数）
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class TopGifters:
+    """
+    送礼排行（Space-Saving 近似 Top-K）
+
+    最多跟踪 capacity 个用户；已满时新用户替换钻石数最少的用户并继承其计数，
+    error 为可能多计的上限。排行用堆取前 N，真实排名靠前的用户不会被替换出去。
+    """
+
+    __slots__ = ("capacity", "_entries")
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = max(1, capacity)
+        # user_id -> [钻石数, 误差上限, 昵称]
+        self._entries: Dict[str, List[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, user_id: str, nickname: str, diamonds: int) -> None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            floor = 0
+            if len(self._entries) >= self.capacity:
+                victim = min(self._entries, key=lambda k: self._entries[k][0])
+                floor = self._entries.pop(victim)[0]
+            entry = [floor, floor, nickname]
+            self._entries[user_id] = entry
+        entry[0] += diamonds
+        if nickname:
+            entry[2] = nickname
+
+    def memory_bytes(self) -> int:
+        # 每个条目：键字符串 + 三元素列表 + 昵称，按 150 字节估算
+        return sys.getsizeof(self._entries) + len(self._entries) * 150
+
+    def top(self, n: int) -> List[Dict[str, Any]]:
+        items = heapq.nlargest(n, self._entries.items(), key=lambda kv: kv[1][0])
+        return [
+            {"id": user_id, "nickname": nickname, "diamonds": diamonds, "error": error}
+            for user_id, (diamonds, error, nickname) in items
+        ]
+
+
+class RoomAnalytics:
+    """
+    房间实时统计（每个房间一个实例，直接由解析后的消息驱动）
+
+    - 滚动窗口：1 秒 / 1 分钟 / 5 分钟内的消息、弹幕、礼物、钻石、进场、关注数
+    - 近似去重：发言用户数、出现过的用户数（HyperLogLog）
+    - 送礼排行：Space-Saving + 堆取前 N
+
+    连击礼物每条消息携带累计 repeat_count，按 (用户, 礼物, group_id) 记录最近 max_combos 个
+    连击的最大连击数，只计入增量，避免重复计算钻石数。所有结构都有固定上限，每个房间的内存占用恒定。
+    """
+
+    def __init__(self, top_n: int = 10, tracked_gifters: int = 200, max_combos: int = 1000):
+        self.top_n = top_n
+        self.max_combos = max(1, max_combos)
+        self.started = time.time()
+        self.pushed_at = 0.0  # 上次推送统计帧的时间（monotonic）
+        self.counters = RollingCounters()
+        self.totals: Dict[str, float] = dict.fromkeys(SERIES, 0)
+        self.users = HyperLogLog()
+        self.chatters = HyperLogLog()
+        self.gifters = TopGifters(tracked_gifters)
+        self._combos: "OrderedDict[Tuple[str, int, int], int]" = OrderedDict()
+
+    def _add(self, name: str, value: float, second: int) -> None:
+        self.counters.add(name, value, second)
+        self.totals[name] += value
+
+    def _gift_count(self, data: Dict[str, Any], user_id: str) -> int:
+        """本条礼物消息新增的礼物个数（连击礼物取 repeat_count 增量）"""
+        repeat_count = max(1, as_int(data.get("repeat_count")))
+        gift = data.get("gift") or {}
+        if not is_combo_gift(gift):
+            return repeat_count
+        key = (user_id, as_int(data.get("gift_id") or gift.get("id")), as_int(data.get("group_id")))
+        # 连击结束后仍保留记录（直到被淘汰），重复推送的 repeat_end 消息不会再次计入
+        previous = self._combos.pop(key, 0)
+        self._combos[key] = max(previous, repeat_count)
+        if len(self._combos) > self.max_combos:
+            self._combos.popitem(last=False)
+        return max(0, repeat_count - previous)
+
+    def feed(self, method: str, data: Dict[str, Any], now: Optional[float] = None) -> None:
+        second = int(time.monotonic() if now is None else now)
+        self._add("messages", 1, second)
+        user = data.get("user") or {}
+        user_id = str(user.get("id") or "")
+        if user_id:
+            self.users.add(user_id)
+
+        if method == "WebcastChatMessage":
+            self._add("chats", 1, second)
+            if user_id:
+                self.chatters.add(user_id)
+        elif method == "WebcastGiftMessage":
+            count = self._gift_count(data, user_id)
+            if count:
+                diamonds = count * as_int((data.get("gift") or {}).get("diamond_count"))
+                self._add("gifts", count, second)
+                self._add("diamonds", diamonds, second)
+                if user_id and diamonds:
+                    self.gifters.add(user_id, user.get("nickname", ""), diamonds)
+        elif method == "WebcastMemberMessage":
+            self._add("members", 1, second)
+        elif method == "WebcastSocialMessage":
+            self._add("follows", 1, second)
+
+    def memory_bytes(self) -> int:
+        return (
+            self.counters.memory_bytes()
+            + len(self.users.registers)
+            + len(self.chatters.registers)
+            + self.gifters.memory_bytes()
+            + sys.getsizeof(self._combos)
+        )
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.monotonic() if now is None else now
+        windows = {}
+        for label, seconds in WINDOWS.items():
+            window = {name: int(value) for name, value in self.counters.window(seconds, now).items()}
+            window["chat_rate"] = round(window["chats"] / seconds, 2)
+            windows[label] = window
+        return {
+            "started_at": self.started,
+            "windows": windows,
+            "totals": {name: int(value) for name, value in self.totals.items()},
+            "unique_users": self.users.count(),
+            "unique_chatters": self.chatters.count(),
+            "top_gifters": self.gifters.top(self.top_n),
+            "memory_bytes": self.memory_bytes(),
+        }
@@ -0,0 +1,127 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from crawler.registry import as_int, user_brief
+from utils import jsonlib
+from utils.metrics import metrics
+
+GIFT_COMBO_FRAMES = metrics.counter(
+    "gift_combo_frames_total", "连击礼物聚合的输入消息数与输出帧数", ["direction"]
+)
+_FRAMES_IN = GIFT_COMBO_FRAMES.labels("in")
+_FRAMES_OUT = GIFT_COMBO_FRAMES.labels("out")
+
+ComboKey = Tuple[str, int, int]
+
+
+class _Combo:
+    __slots__ = ("key", "user", "gift", "repeat_count", "started", "updated", "last_emit")
+
+    def __init__(self, key: ComboKey, user: Dict[str, Any], gift: Dict[str, Any], now: float):
+        self.key = key
+        self.user = user
+        self.gift = gift
+        self.repeat_count = 0
+        self.started = now
+        self.updated = now
+        self.last_emit = now
+
+
+def is_combo_gift(gift: Dict[str, Any]) -> bool:
+    # MessageToDict 省略 false / 0，gift.combo 或 gift.type == 1 均表示可连击；
+    # 投影未包含 gift 时按连击处理
+    return not gift or bool(gift.get("combo")) or as_int(gift.get("type")) == 1
+
+
+class GiftComboAggregator:
+    """
+    连击礼物聚合（每个房间一个实例）
+
+    连击礼物每次连击都会推送一条 GiftMessage，只有 repeat_count 变化。聚合后按
+    (用户, 礼物, group_id) 跟踪进行中的连击，只输出三类帧：
+    start（连击开始）、progress（每 progress_interval 秒最多一次）、end（repeat_end 或超时）。
+    非连击礼物直接输出一条 end。
+    进行中的连击数不超过 max_combos，超出时最早更新的连击提前结束；
+    超过 timeout 秒没有更新的连击由 expire() 结束。
+    """
+
+    def __init__(self, progress_interval: float = 1.0, timeout: float = 10.0, max_combos: int = 1000):
+        self.progress_interval = progress_interval
+        self.timeout = timeout
+        self.max_combos = max(1, max_combos)
+        # 按最后更新时间排序，超时和淘汰都从头部取
+        self._combos: "OrderedDict[ComboKey, _Combo]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._combos)
+
+    def _frame(self, combo: _Combo, phase: str, now: float, **extra) -> str:
+        gift = combo.gift
+        _FRAMES_OUT.inc()
+        return jsonlib.dumps(
+            {
+                "type": "gift_combo",
+                "phase": phase,
+                "user": combo.user,
+                "gift": gift,
+                "repeat_count": combo.repeat_count,
+                "diamonds": gift["diamond_count"] * combo.repeat_count,
+                "duration_ms": int((now - combo.started) * 1000),
+                **extra,
+            }
+        )
+
+    def feed(self, data: Dict[str, Any], now: Optional[float] = None) -> List[str]:
+        """输入一条解析后的 GiftMessage，返回需要下发的聚合帧（可能为空）"""
+        _FRAMES_IN.inc()
+        now = time.monotonic() if now is None else now
+        gift_data = data.get("gift") or {}
+        user = user_brief(data)
+        gift_id = as_int(data.get("gift_id") or gift_data.get("id"))
+        key: ComboKey = (user["id"], gift_id, as_int(data.get("group_id")))
+        repeat_count = max(1, as_int(data.get("repeat_count")))
+        repeat_end = as_int(data.get("repeat_end")) == 1
+
+        combo = self._combos.get(key)
+        frames: List[str] = []
+        if combo is None:
+            gift = {
+                "id": gift_id,
+                "name": gift_data.get("name") or gift_data.get("describe", ""),
+                "diamond_count": as_int(gift_data.get("diamond_count")),
+            }
+            combo = _Combo(key, user, gift, now)
+            combo.repeat_count = repeat_count
+            if repeat_end or not is_combo_gift(gift_data):
+                return [self._frame(combo, "end", now)]
+            self._combos[key] = combo
+            frames.append(self._frame(combo, "start", now))
+            if len(self._combos) > self.max_combos:
+                _, oldest = self._combos.popitem(last=False)
+                frames.append(self._frame(oldest, "end", now, evicted=True))
+            return frames
+
+        combo.repeat_count = max(combo.repeat_count, repeat_count)
+        combo.updated = now
+        if repeat_end:
+            del self._combos[key]
+            return [self._frame(combo, "end", now)]
+        self._combos.move_to_end(key)
+        if now - combo.last_emit >= self.progress_interval:
+            combo.last_emit = now
+            frames.append(self._frame(combo, "progress", now))
+        return frames
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        """结束超过 timeout 秒没有更新的连击"""
+        now = time.monotonic() if now is None else now
+        frames: List[str] = []
+        combos = self._combos
+        while combos:
+            combo = next(iter(combos.values()))
+            if now - combo.updated < self.timeout:
+                break
+            combos.popitem(last=False)
+            frames.append(self._frame(combo, "end", now, timed_out=True))
+        return frames
@@ -0,0 +1,84 @@
+import zlib
+from typing import Union
+
+from utils.metrics import SIZE_BUCKETS, metrics
+
+GZIP_MAGIC = b"\x1f\x8b"
+# wbits=31 表示 gzip 封装格式
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+FRAME_COMPRESSED_BYTES = metrics.histogram(
+    "webcast_frame_compressed_bytes", "PushFrame payload 压缩后大小（字节）", buckets=SIZE_BUCKETS
+)
+FRAME_DECOMPRESSED_BYTES = metrics.histogram(
+    "webcast_frame_decompressed_bytes", "PushFrame payload 解压后大小（字节）", buckets=SIZE_BUCKETS
+)
+FRAMES_BY_ENCODING = metrics.counter(
+    "webcast_frames_total", "按压缩方式统计的 PushFrame 数", ["compression"]
+)
+FRAMES_REJECTED = metrics.counter(
+    "webcast_frames_rejected_total", "解压失败或超过大小限制而丢弃的帧数", ["reason"]
+)
+
+_FRAMES_GZIP = FRAMES_BY_ENCODING.labels("gzip")
+_FRAMES_NONE = FRAMES_BY_ENCODING.labels("none")
+
+
+class PayloadTooLargeError(ValueError):
+    """解压后大小超过限制（疑似解压炸弹）"""
+
+
+def frame_compression(frame) -> str:
+    """
+    判断 PushFrame payload 的压缩方式
+
+    优先使用 headers 中声明的 compress_type，其次是 payload_encoding，
+    都未声明时检查 gzip 魔数，不再依赖捕获 BadGzipFile 异常。
+    """
+    for header in frame.headers:
+        if header.key == "compress_type":
+            return "gzip" if header.value == "gzip" else "none"
+    if frame.payload_encoding == "gzip":
+        return "gzip"
+    return "gzip" if frame.payload[:2] == GZIP_MAGIC else "none"
+
+
+def gunzip(data: Union[bytes, memoryview], max_size: int) -> bytes:
+    """
+    流式解压 gzip 数据，输出超过 max_size 时立即中止
+
+    Raises:
+        PayloadTooLargeError: 解压后大小超过 max_size
+        zlib.error: 数据损坏或被截断
+    """
+    decompressor = zlib.decompressobj(_GZIP_WBITS)
+    out = decompressor.decompress(data, max_size + 1)
+    if len(out) > max_size or decompressor.unconsumed_tail:
+        raise PayloadTooLargeError(f"解压后超过 {max_size} 字节")
+    if not decompressor.eof:
+        raise zlib.error("gzip 数据不完整")
+    return out
+
+
+def decompress_frame(frame, max_size: int) -> Union[bytes, memoryview]:
+    """
+    根据声明的编码或魔数解压 PushFrame payload，并记录大小直方图
+
+    未压缩的 payload 直接返回原始字节，不做复制。
+    """
+    payload = frame.payload
+    FRAME_COMPRESSED_BYTES.observe(len(payload))
+    if frame_compression(frame) == "gzip":
+        _FRAMES_GZIP.inc()
+        try:
+            payload = gunzip(memoryview(payload), max_size)
+        except PayloadTooLargeError:
+            FRAMES_REJECTED.labels("too_large").inc()
+            raise
+        except zlib.error:
+            FRAMES_REJECTED.labels("corrupt").inc()
+            raise
+    else:
+        _FRAMES_NONE.inc()
+    FRAME_DECOMPRESSED_BYTES.observe(len(payload))
+    return payload
@@ -0,0 +1,61 @@
+from utils.pool import PoolExhausted
+
+
+class UpstreamError(ConnectionError):
+    """
+    上游连接错误
+
+    retryable: 重连是否可能成功；trips_breaker: 是否计入进程级熔断器
+    （说明上游整体不可用，而不是单个凭据或代理的问题）。
+    """
+
+    retryable = True
+    trips_breaker = True
+
+
+class UpstreamNetworkError(UpstreamError):
+    """网络错误：连接被拒绝 / 重置、DNS 失败、代理隧道失败等"""
+
+
+class UpstreamTimeoutError(UpstreamNetworkError):
+    """连接或握手超时"""
+
+
+class UpstreamStatusError(UpstreamError):
+    """握手返回非 101 状态码"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def retryable(self) -> bool:  # type: ignore[override]
+        # 400 / 404 表示请求参数有误，重连也不会成功；401 / 403 换凭据后可能恢复
+        return self.status_code not in (400, 404)
+
+    @property
+    def trips_breaker(self) -> bool:  # type: ignore[override]
+        # 限流和服务端错误说明上游整体异常；401 / 403 只与当前凭据有关
+        return self.status_code == 429 or self.status_code >= 500
+
+
+class CircuitOpenError(UpstreamError):
+    """熔断器打开，暂不发起上游连接"""
+
+    trips_breaker = False
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """判断爬虫任务的异常是否值得重连"""
+    if isinstance(exc, UpstreamError):
+        return exc.retryable
+    # 资源池暂无可用成员（连接上限 / 隔离），稍后可能恢复
+    if isinstance(exc, PoolExhausted):
+        return True
+    # 其它连接错误不重试；非连接类异常（处理过程中的意外错误）重试
+    return not isinstance(exc, ConnectionError)
+
@@ -0,0 +1,322 @@
+import base64
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type, Union
+
+from google.protobuf import json_format, message_factory
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.internal import api_implementation
+from google.protobuf.message import DecodeError, Message
+
+_FD = FieldDescriptor
+
+# MessageToDict 将 64 位整数输出为字符串，投影结果保持一致
+_INT64_TYPES = {_FD.TYPE_INT64, _FD.TYPE_UINT64, _FD.TYPE_SINT64}
+_FIXED64_TYPES = {_FD.TYPE_FIXED64, _FD.TYPE_SFIXED64, _FD.TYPE_DOUBLE}
+_FIXED32_TYPES = {_FD.TYPE_FIXED32, _FD.TYPE_SFIXED32, _FD.TYPE_FLOAT}
+_STRUCT = {
+    _FD.TYPE_FIXED64: struct.Struct("<Q"),
+    _FD.TYPE_SFIXED64: struct.Struct("<q"),
+    _FD.TYPE_DOUBLE: struct.Struct("<d"),
+    _FD.TYPE_FIXED32: struct.Struct("<I"),
+    _FD.TYPE_SFIXED32: struct.Struct("<i"),
+    _FD.TYPE_FLOAT: struct.Struct("<f"),
+}
+
+
+def _read_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 70:
+            raise DecodeError("varint 过长")
+
+
+class _Node:
+    """投影树节点：field_number -> (字段描述, 子节点)；子节点为 None 表示取整个字段"""
+
+    __slots__ = ("fields",)
+
+    def __init__(self):
+        self.fields: Dict[int, Tuple[FieldDescriptor, Optional["_Node"]]] = {}
+
+
+class FieldProjection:
+    """
+    字段投影解码器
+
+    只提取指定路径（如 ``user.nickname,user.id,content``）的字段，输出与
+    ``MessageToDict(preserving_proto_field_name=True)`` 相同格式的字典，
+    不构建完整 JSON 树。
+
+    两种策略：
+        - ``scan``: 纯 Python 线格式扫描，未选中的子消息按长度直接跳过
+        - ``parse``: 使用 C 实现（upb/cpp）完整解析后按属性读取选中字段
+    ``auto`` 根据当前 protobuf 后端选择：python 后端用 scan，其余用 parse。
+    """
+
+    def __init__(
+        self,
+        message_cls: Type[Message],
+        paths: Union[str, Iterable[str]],
+        strategy: str = "auto",
+    ):
+        if isinstance(paths, str):
+            paths = [p for p in paths.split(",")]
+        self.message_cls = message_cls
+        self.paths: List[str] = [p.strip() for p in paths if p and p.strip()]
+        if not self.paths:
+            raise ValueError("投影路径为空")
+        self.root = self._compile(message_cls.DESCRIPTOR, self.paths)
+        if strategy == "auto":
+            strategy = "scan" if api_implementation.Type() == "python" else "parse"
+        if strategy not in ("scan", "parse"):
+            raise ValueError(f"未知的投影策略: {strategy}")
+        self.strategy = strategy
+        self.project = self.scan if strategy == "scan" else self.parse
+
+    @staticmethod
+    def _compile(descriptor, paths: List[str]) -> _Node:
+        root = _Node()
+        for path in paths:
+            node = root
+            desc = descriptor
+            parts = path.split(".")
+            for i, name in enumerate(parts):
+                field = desc.fields_by_name.get(name)
+                if field is None:
+                    raise ValueError(f"[{descriptor.name}] 字段不存在: {path}")
+                if field.message_type is not None and (
+                    field.message_type.GetOptions().map_entry
+                ):
+                    raise ValueError(f"[{descriptor.name}] 不支持投影 map 字段: {path}")
+                is_last = i == len(parts) - 1
+                existing = node.fields.get(field.number)
+                if is_last:
+                    # 取整个字段，覆盖更细的子路径
+                    node.fields[field.number] = (field, None)
+                    break
+                if field.message_type is None:
+                    raise ValueError(f"[{descriptor.name}] 标量字段不能有子路径: {path}")
+                if existing is not None and existing[1] is None:
+                    break  # 已选取整个子消息
+                if existing is None:
+                    existing = (field, _Node())
+                    node.fields[field.number] = existing
+                node = existing[1]
+                desc = field.message_type
+        return root
+
+    def __call__(self, data: bytes) -> Dict[str, Any]:
+        return self.project(data)
+
+    # ------------------------------------------------------------------
+    # scan 策略
+    # ------------------------------------------------------------------
+    def scan(self, data: bytes) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        try:
+            self._scan(data, 0, len(data), self.root, out)
+        except IndexError:
+            raise DecodeError("数据被截断")
+        return out
+
+    def _scan(self, buf, pos: int, end: int, node: _Node, out: Dict[str, Any]) -> None:
+        fields = node.fields
+        while pos < end:
+            tag, pos = _read_varint(buf, pos)
+            wire_type = tag & 7
+            entry = fields.get(tag >> 3)
+            if wire_type == 0:
+                value, pos = _read_varint(buf, pos)
+            elif wire_type == 2:
+                length, pos = _read_varint(buf, pos)
+                start = pos
+                pos += length
+                if pos > end:
+                    raise DecodeError("长度越界")
+                if entry is None:
+                    continue
+                field, child = entry
+                ftype = field.type
+                if ftype == _FD.TYPE_MESSAGE:
+                    if child is None:
+                        sub = message_factory.GetMessageClass(field.message_type)()
+                        sub.ParseFromString(bytes(buf[start:pos]))
+                        value = json_format.MessageToDict(
+                            sub, preserving_proto_field_name=True
+                        )
+                    else:
+                        value = {}
+                        self._scan(buf, start, pos, child, value)
+                elif ftype == _FD.TYPE_STRING:
+                    value = bytes(buf[start:pos]).decode("utf-8")
+                elif ftype == _FD.TYPE_BYTES:
+                    value = base64.b64encode(bytes(buf[start:pos])).decode("ascii")
+                else:
+                    # packed repeated 标量
+                    out.setdefault(field.name, []).extend(
+                        self._unpack(buf, start, pos, field)
+                    )
+                    continue
+                self._store(out, field, value)
+                continue
+            elif wire_type == 1:
+                value = buf[pos : pos + 8]
+                pos += 8
+            elif wire_type == 5:
+                value = buf[pos : pos + 4]
+                pos += 4
+            else:
+                raise DecodeError(f"不支持的 wire type: {wire_type}")
+            if entry is None:
+                continue
+            field = entry[0]
+            self._store(out, field, self._convert(field, value))
+
+    @staticmethod
+    def _store(out: Dict[str, Any], field: FieldDescriptor, value: Any) -> None:
+        if field.label == _FD.LABEL_REPEATED:
+            out.setdefault(field.name, []).append(value)
+        else:
+            out[field.name] = value
+
+    @staticmethod
+    def _convert(field: FieldDescriptor, raw) -> Any:
+        ftype = field.type
+        if ftype in _FIXED64_TYPES or ftype in _FIXED32_TYPES:
+            value = _STRUCT[ftype].unpack(bytes(raw))[0]
+            return str(value) if ftype in (_FD.TYPE_FIXED64, _FD.TYPE_SFIXED64) else value
+        if ftype == _FD.TYPE_BOOL:
+            return bool(raw)
+        if ftype == _FD.TYPE_SINT32 or ftype == _FD.TYPE_SINT64:
+            value = (raw >> 1) ^ -(raw & 1)
+            return str(value) if ftype == _FD.TYPE_SINT64 else value
+        if ftype == _FD.TYPE_INT64:
+            return str(raw - (1 << 64) if raw >= 1 << 63 else raw)
+        if ftype == _FD.TYPE_UINT64:
+            return str(raw)
+        if ftype == _FD.TYPE_INT32:
+            raw &= 0xFFFFFFFF
+            return raw - (1 << 32) if raw >= 1 << 31 else raw
+        if ftype == _FD.TYPE_ENUM:
+            value = field.enum_type.values_by_number.get(raw)
+            return value.name if value is not None else raw
+        return raw
+
+    def _unpack(self, buf, pos: int, end: int, field: FieldDescriptor) -> List[Any]:
+        values = []
+        ftype = field.type
+        if ftype in _FIXED64_TYPES or ftype in _FIXED32_TYPES:
+            size = 8 if ftype in _FIXED64_TYPES else 4
+            while pos < end:
+                values.append(self._convert(field, buf[pos : pos + size]))
+                pos += size
+            return values
+        while pos < end:
+            raw, pos = _read_varint(buf, pos)
+            values.append(self._convert(field, raw))
+        return values
+
+    # ------------------------------------------------------------------
+    # parse 策略
+    # ------------------------------------------------------------------
+    def parse(self, data: bytes) -> Dict[str, Any]:
+        message = self.message_cls()
+        message.ParseFromString(data)
+        return self._pick(message, self.root)
+
+    def _pick(self, message: Message, node: _Node) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for field, child in node.fields.values():
+            value = getattr(message, field.name)
+            if field.label == _FD.LABEL_REPEATED:
+                if not len(value):
+                    continue
+                out[field.name] = [self._pick_value(field, child, v) for v in value]
+            elif field.type == _FD.TYPE_MESSAGE:
+                if message.HasField(field.name):
+                    out[field.name] = self._pick_value(field, child, value)
+            elif value != field.default_value:
+                out[field.name] = self._pick_value(field, child, value)
+        return out
+
+    def _pick_value(self, field: FieldDescriptor, child: Optional[_Node], value) -> Any:
+        ftype = field.type
+        if ftype == _FD.TYPE_MESSAGE:
+            if child is None:
+                return json_format.MessageToDict(value, preserving_proto_field_name=True)
+            return self._pick(value, child)
+        if ftype in _INT64_TYPES or ftype in (_FD.TYPE_FIXED64, _FD.TYPE_SFIXED64):
+            return str(value)
+        if ftype == _FD.TYPE_BYTES:
+            return base64.b64encode(value).decode("ascii")
+        if ftype == _FD.TYPE_ENUM:
+            enum_value = field.enum_type.values_by_number.get(value)
+            return enum_value.name if enum_value is not None else value
+        return value
+
+
+def _skip_field(buf, pos: int, wire_type: int) -> int:
+    if wire_type == 0:
+        return _read_varint(buf, pos)[1]
+    if wire_type == 2:
+        length, pos = _read_varint(buf, pos)
+        return pos + length
+    if wire_type == 1:
+        return pos + 8
+    if wire_type == 5:
+        return pos + 4
+    raise DecodeError(f"不支持的 wire type: {wire_type}")
+
+
+def peek_common(data: bytes) -> Tuple[int, int]:
+    """
+    从任意 Webcast 消息中读取 Common（字段 1）的 roomId 和 createTime（毫秒）
+
+    只扫描 Common 子消息，不解析消息其余部分；读取失败时返回 (0, 0)。
+    """
+    room_id = create_time = 0
+    try:
+        pos, end = 0, len(data)
+        while pos < end:
+            tag, pos = _read_varint(data, pos)
+            if tag != 0x0A:  # field 1, wire type 2
+                pos = _skip_field(data, pos, tag & 7)
+                continue
+            length, pos = _read_varint(data, pos)
+            common_end = pos + length
+            while pos < common_end:
+                tag, pos = _read_varint(data, pos)
+                if tag == 0x18:  # roomId = 3
+                    room_id, pos = _read_varint(data, pos)
+                elif tag == 0x20:  # createTime = 4
+                    create_time, pos = _read_varint(data, pos)
+                else:
+                    pos = _skip_field(data, pos, tag & 7)
+            break
+    except (IndexError, DecodeError):
+        pass
+    return room_id, create_time
+
+
+def parse_projection_config(value: str) -> Dict[str, str]:
+    """
+    解析投影配置
+
+    格式: ``Method=path1,path2;Method2=path3``，例如
+    ``WebcastChatMessage=user.nickname,user.id,content``
+    """
+    result: Dict[str, str] = {}
+    for item in (value or "").split(";"):
+        if "=" not in item:
+            continue
+        method, paths = item.split("=", 1)
+        if method.strip() and paths.strip():
+            result[method.strip()] = paths.strip()
+    return result
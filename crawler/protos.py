@@ -0,0 +1,40 @@
+"""
+Webcast protobuf 类型的延迟加载
+
+tiktok_webcast_pb2 在导入时构建包含数百个消息类型的描述符池，
+通过模块级 __getattr__ 推迟到首次访问（首个房间建立连接或启动后的
+后台预加载）时再导入，缩短工作进程启动到可以接受连接的时间。
+
+    from crawler import protos
+    frame = protos.PushFrame()
+"""
+
+import importlib
+import time
+from typing import Any, Optional
+
+from log.logger import logger
+
+_MODULE = "proto.tiktok.tiktok_webcast_pb2"
+_module: Optional[Any] = None
+
+
+def load() -> Any:
+    """导入 protobuf 模块（已导入时直接返回）"""
+    global _module
+    if _module is None:
+        start = time.perf_counter()
+        _module = importlib.import_module(_MODULE)
+        logger.info(
+            f"[Protos] [📦 加载 protobuf 描述符] | [耗时: {(time.perf_counter() - start) * 1000:.1f}ms]"
+        )
+    return _module
+
+
+def __getattr__(name: str) -> Any:
+    if name.startswith("__"):
+        raise AttributeError(name)
+    value = getattr(load(), name)
+    # 缓存到模块命名空间，之后的访问不再经过 __getattr__
+    globals()[name] = value
+    return value
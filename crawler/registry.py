@@ -0,0 +1,237 @@
+from typing import Any, Callable, Dict, Optional, Type, Union
+
+from google.protobuf import json_format
+from google.protobuf.message import Message
+
+from crawler import protos
+from crawler.projection import FieldProjection, parse_projection_config
+from log.logger import logger
+from utils import jsonlib
+from utils.config import Config
+
+Projection = Callable[[Message], Dict[str, Any]]
+Encoder = Callable[[Dict[str, Any]], str]
+Summary = Callable[[Dict[str, Any]], str]
+
+
+def full_projection(message: Message) -> Dict[str, Any]:
+    """完整投影：输出与 MessageToJson 相同的字段结构，但不经过 JSON 字符串往返"""
+    return json_format.MessageToDict(message, preserving_proto_field_name=True)
+
+
+def json_encoder(data: Dict[str, Any]) -> str:
+    return jsonlib.dumps(data)
+
+
+class DecodedMessage:
+    """
+    一条已处理的消息：方法名、投影后的字典与编码后的待广播帧
+
+    data 供聚合、统计、落盘等下游阶段直接使用，避免再次解析 JSON；
+    解析失败或由自定义回调处理的消息 data 为 None。
+    """
+
+    __slots__ = ("method", "data", "frame")
+
+    def __init__(self, method: str, data: Optional[Dict[str, Any]], frame: str):
+        self.method = method
+        self.data = data
+        self.frame = frame
+
+
+class MessageSpec:
+    """
+    单个 Webcast 消息类型的解析规则：protobuf 类 + 投影 + 编码器
+
+    配置了 fields（FieldProjection）时直接从字节中提取选中字段，跳过完整解析。
+    """
+
+    __slots__ = (
+        "method",
+        "message_type",
+        "_message_cls",
+        "projection",
+        "encoder",
+        "summary",
+        "fields",
+    )
+
+    def __init__(
+        self,
+        method: str,
+        message_cls: Union[str, Type[Message]],
+        projection: Projection = full_projection,
+        encoder: Encoder = json_encoder,
+        summary: Optional[Summary] = None,
+    ):
+        self.method = method
+        # 以类型名注册时延迟到首次解析才从 crawler.protos 取类
+        self.message_type = message_cls if isinstance(message_cls, str) else message_cls.__name__
+        self._message_cls = None if isinstance(message_cls, str) else message_cls
+        self.projection = projection
+        self.encoder = encoder
+        self.summary = summary
+        self.fields: Optional[FieldProjection] = None
+
+    @property
+    def message_cls(self) -> Type[Message]:
+        if self._message_cls is None:
+            self._message_cls = getattr(protos, self.message_type)
+        return self._message_cls
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        """解析 protobuf 并投影为字典"""
+        if self.fields is not None:
+            return self.fields.project(data)
+        message = self.message_cls()
+        message.ParseFromString(data)
+        return self.projection(message)
+
+    async def handle_message(self, data: bytes) -> DecodedMessage:
+        """解析、记录日志并编码，同时保留解析后的字典"""
+        if not data:
+            logger.warning(f"[{self.method}] [⚠️ 空数据] | [无消息内容]")
+            return DecodedMessage(self.method, None, self.encoder({"error": "Empty message data"}))
+        try:
+            data_json = self.decode(data)
+            if self.summary is not None:
+                logger.info(f"[{self.method}] {self.summary(data_json)}")
+            return DecodedMessage(self.method, data_json, self.encoder(data_json))
+        except Exception as e:
+            logger.error(f"[{self.method}] [⚠️ 解析失败] | [错误: {str(e)}]")
+            return DecodedMessage(
+                self.method,
+                None,
+                self.encoder({"error": "Failed to parse message", "details": str(e)}),
+            )
+
+    async def handle(self, data: bytes) -> str:
+        """解析、记录日志并编码为待广播的 JSON 字符串"""
+        return (await self.handle_message(data)).frame
+
+
+# method -> MessageSpec，导入时构建一次
+MESSAGE_REGISTRY: Dict[str, MessageSpec] = {}
+
+
+def register(
+    method: str,
+    message_cls: Union[str, Type[Message]],
+    projection: Projection = full_projection,
+    encoder: Encoder = json_encoder,
+    summary: Optional[Summary] = None,
+) -> MessageSpec:
+    """注册（或覆盖）一个消息类型的解析规则，message_cls 可以是类或 protos 中的类型名"""
+    spec = MessageSpec(method, message_cls, projection, encoder, summary)
+    MESSAGE_REGISTRY[method] = spec
+    return spec
+
+
+def build_dispatch_table(callbacks: Optional[dict] = None) -> Dict[str, Callable]:
+    """
+    构建 method -> 异步处理函数 的分发表
+
+    注册表中的类型使用 MessageSpec.handle_message（返回 DecodedMessage），
+    callbacks 中的同名处理函数优先（返回编码后的字符串）。
+    "broadcast" 为广播回调，不参与消息分发。
+    """
+    table: Dict[str, Callable] = {
+        method: spec.handle_message for method, spec in MESSAGE_REGISTRY.items()
+    }
+    for method, handler in (callbacks or {}).items():
+        if method != "broadcast" and callable(handler):
+            table[method] = handler
+    return table
+
+
+def set_projection(method: str, paths: Optional[str], strategy: str = "auto") -> None:
+    """
+    为某个消息类型设置字段投影，paths 为空时恢复完整输出
+
+    Example:
+        set_projection("WebcastChatMessage", "user.nickname,user.id,content")
+    """
+    spec = MESSAGE_REGISTRY[method]
+    spec.fields = FieldProjection(spec.message_cls, paths, strategy) if paths else None
+
+
+def configure_projections(value: str) -> None:
+    """按 Config.MESSAGE_PROJECTIONS 格式批量设置投影，配置错误的条目记录日志后跳过"""
+    for method, paths in parse_projection_config(value).items():
+        if method not in MESSAGE_REGISTRY:
+            logger.warning(f"[Registry] [⚠️ 未注册的消息类型] | [方法: {method}]")
+            continue
+        try:
+            set_projection(method, paths)
+            logger.info(f"[Registry] [✂️ 启用字段投影] | [方法: {method}] | [字段: {paths}]")
+        except ValueError as e:
+            logger.error(f"[Registry] [❌ 投影配置错误] | [方法: {method}] | [错误: {str(e)}]")
+
+
+def as_int(value: Any) -> int:
+    """读取解析结果中的整数字段（MessageToDict 将 int64 输出为字符串），缺失或非法时为 0"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def user_brief(data_json: Dict[str, Any], field: str = "user") -> Dict[str, Any]:
+    """从解析结果中取用户 id 与昵称（下游聚合帧只携带这两个字段）"""
+    user = data_json.get(field) or {}
+    return {"id": str(user.get("id", "")), "nickname": user.get("nickname", "")}
+
+
+def _nickname(data_json: Dict[str, Any]) -> str:
+    return (data_json.get("user") or {}).get("nickname", "N/A")
+
+
+def _gift_summary(data_json: Dict[str, Any]) -> str:
+    gift = data_json.get("gift") or {}
+    return (
+        f"[🎁直播间礼物] [用户：{_nickname(data_json)} 送出了 "
+        f"{gift.get('describe', 'N/A')} 价值 {gift.get('diamond_count', 'N/A')} 钻石]"
+    )
+
+
+register(
+    "WebcastChatMessage",
+    "ChatMessage",
+    summary=lambda d: f"[💬直播间消息] [用户：{_nickname(d)} 说：{d.get('content')}]",
+)
+register("WebcastGiftMessage", "GiftMessage", summary=_gift_summary)
+register(
+    "WebcastMemberMessage",
+    "MemberMessage",
+    summary=lambda d: f"[👥直播间成员消息] [用户：{_nickname(d)} 加入了直播间]",
+)
+register(
+    "WebcastSocialMessage",
+    "SocialMessage",
+    summary=lambda d: f"[➕观众关注] [用户：{_nickname(d)} 关注了主播]",
+)
+register(
+    "WebcastLinkMicFanTicketMethod",
+    "LinkMicFanTicketMethod",
+    summary=lambda d: f"[🎟️连麦粉丝票] {d}",
+)
+register(
+    "WebcastRoomMessage",
+    "RoomMessage",
+    summary=lambda d: f"[📢直播间公告] [内容：{d.get('content')}]",
+)
+register(
+    "WebcastControlMessage",
+    "ControlMessage",
+    summary=lambda d: f"[🎛️直播间控制] [状态：{d.get('status')}]",
+)
+register(
+    "WebcastLinkMicBattle",
+    "LinkMicBattle",
+    summary=lambda d: (
+        f"[⚔️连麦PK] [battle_id：{d.get('battle_id')}] [action：{d.get('action')}]"
+    ),
+)
+register("WebcastLinkMicMethod", "LinkMicMethod")
+
+configure_projections(Config.MESSAGE_PROJECTIONS)
@@ -0,0 +1,132 @@
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from crawler.registry import as_int
+
+MAX_FAN_TICKET_USERS = 20
+MAX_BATTLE_CONTRIBUTORS = 5
+
+
+def _map_entries(value: Any) -> Dict[str, Any]:
+    """map 字段（MessageToDict 输出为字典）与 key / value 重复字段（输出为列表）统一为字典"""
+    if isinstance(value, dict):
+        return {str(k): v for k, v in value.items()}
+    if isinstance(value, list):
+        return {str(item.get("key")): item.get("value") or {} for item in value}
+    return {}
+
+
+class RoomState:
+    """
+    房间当前状态（每个房间一个实例）
+
+    由 RoomMessage / ControlMessage / LinkMicBattle / LinkMicFanTicketMethod /
+    MemberMessage 增量更新，新加入的客户端立即收到当前快照，不需要额外请求上游。
+    所有字段只保留最新值，连麦粉丝票、PK 贡献者列表有条数上限。
+    """
+
+    def __init__(self):
+        self.updated_at: Optional[float] = None
+        self.announcement: Optional[Dict[str, Any]] = None
+        self.control_status: Optional[int] = None
+        self.member_count: Optional[int] = None
+        self.battle: Optional[Dict[str, Any]] = None
+        self.fan_tickets: Optional[Dict[str, Any]] = None
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {
+            "WebcastRoomMessage": self._room_message,
+            "WebcastControlMessage": self._control_message,
+            "WebcastMemberMessage": self._member_message,
+            "WebcastLinkMicBattle": self._battle,
+            "WebcastLinkMicFanTicketMethod": self._fan_ticket,
+        }
+
+    def apply(self, method: str, data: Dict[str, Any]) -> bool:
+        """按消息更新状态，返回该消息类型是否参与状态维护"""
+        handler = self._handlers.get(method)
+        if handler is None:
+            return False
+        handler(data)
+        self.updated_at = time.time()
+        return True
+
+    def _room_message(self, data: Dict[str, Any]) -> None:
+        content = data.get("content")
+        if content:
+            self.announcement = {"content": content, "scene": data.get("scene", "")}
+
+    def _control_message(self, data: Dict[str, Any]) -> None:
+        self.control_status = as_int(data.get("status"))
+
+    def _member_message(self, data: Dict[str, Any]) -> None:
+        if "member_count" in data:
+            self.member_count = as_int(data["member_count"])
+
+    def _battle(self, data: Dict[str, Any]) -> None:
+        settings = data.get("battle_settings") or {}
+        battle_id = str(data.get("battle_id") or settings.get("battle_id") or "")
+        battle = self.battle
+        if battle is None or (battle_id and battle["battle_id"] != battle_id):
+            battle = {"battle_id": battle_id, "anchors": {}}
+            self.battle = battle
+        battle["action"] = as_int(data.get("action"))
+        if settings:
+            battle["start_time_ms"] = as_int(settings.get("start_time_ms"))
+            battle["duration"] = as_int(settings.get("duration"))
+
+        anchors: Dict[str, Dict[str, Any]] = battle["anchors"]
+        for anchor_id, info in _map_entries(data.get("anchors_info_list")).items():
+            user = info.get("user") or {}
+            anchors.setdefault(anchor_id, {})["nickname"] = user.get("nickName", "")
+        for anchor_id, result in _map_entries(data.get("battle_result_map")).items():
+            anchor = anchors.setdefault(anchor_id, {})
+            anchor["score"] = as_int(result.get("score"))
+            anchor["diamond_score"] = as_int(result.get("diamond_score"))
+            anchor["result"] = as_int(result.get("result"))
+        for anchor_id, armies in _map_entries(data.get("armies_list")).items():
+            contributors = sorted(
+                armies.get("user_armies_list") or [],
+                key=lambda army: as_int(army.get("score")),
+                reverse=True,
+            )[:MAX_BATTLE_CONTRIBUTORS]
+            anchor = anchors.setdefault(anchor_id, {})
+            anchor["host_score"] = as_int(armies.get("hostscore"))
+            anchor["top_contributors"] = [
+                {
+                    "id": str(army.get("user_id_str") or army.get("user_id", "")),
+                    "nickname": army.get("nickname", ""),
+                    "score": as_int(army.get("score")),
+                }
+                for army in contributors
+            ]
+
+    def _fan_ticket(self, data: Dict[str, Any]) -> None:
+        notice = data.get("fan_ticket_room_notice") or {}
+        version = as_int(notice.get("version"))
+        # 乱序到达的旧版本不覆盖新数据
+        if self.fan_tickets is not None and version and version < self.fan_tickets["version"]:
+            return
+        users: List[Dict[str, Any]] = [
+            {
+                "user_id": str(u.get("user_id", "")),
+                "fan_ticket": as_int(u.get("fan_ticket")),
+                "match_rank": as_int(u.get("match_rank")),
+            }
+            for u in notice.get("user_fan_ticket") or []
+        ]
+        users.sort(key=lambda u: u["fan_ticket"], reverse=True)
+        self.fan_tickets = {
+            "version": version,
+            "match_id": str(notice.get("match_id", "")),
+            "total": as_int(notice.get("total_linkmic_fan_ticket")),
+            "users": users[:MAX_FAN_TICKET_USERS],
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "updated_at": self.updated_at,
+            "announcement": self.announcement,
+            "control_status": self.control_status,
+            "member_count": self.member_count,
+            "battle": self.battle,
+            "fan_tickets": self.fan_tickets,
+        }
@@ -0,0 +1,175 @@
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from crawler.registry import as_int, user_brief
+from utils import jsonlib
+from utils.metrics import metrics
+
+SUMMARY_FRAMES = metrics.counter(
+    "summary_frames_total", "窗口汇总的输入消息数与输出帧数", ["direction"]
+)
+_FRAMES_IN = SUMMARY_FRAMES.labels("in")
+_FRAMES_OUT = SUMMARY_FRAMES.labels("out")
+
+# 可汇总的消息类型：简称 -> (方法, 汇总帧中携带最新值的字段)
+SUMMARY_TYPES: Dict[str, Tuple[str, str]] = {
+    "member": ("WebcastMemberMessage", "member_count"),
+    "social": ("WebcastSocialMessage", "follow_count"),
+}
+_METHOD_FIELDS = {method: field for method, field in SUMMARY_TYPES.values()}
+
+MIN_WINDOW = 1.0
+MAX_WINDOW = 300.0
+MAX_NAMES = 50
+
+# (方法, 窗口秒数, 昵称数)，策略相同的客户端共享一个窗口
+SummaryPolicy = Tuple[str, float, int]
+
+
+def parse_summary_spec(value: str, window: float = 2.0, names: int = 5) -> List[SummaryPolicy]:
+    """
+    解析客户端的汇总订阅参数
+
+    格式: type[:window[:names]]，多个类型以逗号分隔，type 为简称（member / social）
+    或完整方法名。例如 member:2,social:5:10。非法参数抛出 ValueError。
+    """
+    policies: Dict[str, SummaryPolicy] = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        parts = item.split(":")
+        if len(parts) > 3:
+            raise ValueError(f"格式应为 type[:window[:names]]: {item}")
+        name = parts[0]
+        if name in SUMMARY_TYPES:
+            method = SUMMARY_TYPES[name][0]
+        elif name in _METHOD_FIELDS:
+            method = name
+        else:
+            raise ValueError(f"不支持汇总的消息类型: {name}")
+        try:
+            seconds = float(parts[1]) if len(parts) > 1 and parts[1] else window
+            count = int(parts[2]) if len(parts) > 2 and parts[2] else names
+        except ValueError:
+            raise ValueError(f"窗口或昵称数不是数字: {item}") from None
+        if not MIN_WINDOW <= seconds <= MAX_WINDOW:
+            raise ValueError(f"窗口应在 {MIN_WINDOW:g}-{MAX_WINDOW:g} 秒之间: {item}")
+        if not 0 <= count <= MAX_NAMES:
+            raise ValueError(f"昵称数应在 0-{MAX_NAMES} 之间: {item}")
+        policies[method] = (method, seconds, count)
+    if not policies:
+        raise ValueError("未指定汇总的消息类型")
+    return list(policies.values())
+
+
+class _Window:
+    __slots__ = ("policy", "clients", "count", "users", "latest", "started")
+
+    def __init__(self, policy: SummaryPolicy, now: float):
+        self.policy = policy
+        self.clients: Set[Any] = set()
+        self.count = 0
+        self.users: List[Dict[str, Any]] = []
+        self.latest: Optional[int] = None
+        self.started = now
+
+
+class RoomSummarizer:
+    """
+    高频低价值消息（进场、关注）的窗口汇总（每个房间一个实例）
+
+    订阅了某类消息汇总的客户端不再逐条接收该类消息，改为每个窗口接收一条汇总帧：
+    窗口内的消息数、前 names 个用户和最新的在线人数 / 关注数。
+    窗口长度和昵称数按客户端设置，策略相同的客户端共享同一个窗口。
+    """
+
+    def __init__(self):
+        self._windows: Dict[SummaryPolicy, _Window] = {}
+        self._by_method: Dict[str, List[_Window]] = {}
+        # 方法 -> 汇总该方法的客户端（逐条广播时跳过）
+        self._skip: Dict[str, Set[Any]] = {}
+        self._clients: Dict[Any, List[SummaryPolicy]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._clients)
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def subscribe(self, client: Any, policies: List[SummaryPolicy], now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self.unsubscribe(client)
+        for policy in policies:
+            window = self._windows.get(policy)
+            if window is None:
+                window = _Window(policy, now)
+                self._windows[policy] = window
+                self._by_method.setdefault(policy[0], []).append(window)
+            window.clients.add(client)
+            self._skip.setdefault(policy[0], set()).add(client)
+        self._clients[client] = policies
+
+    def unsubscribe(self, client: Any) -> None:
+        for policy in self._clients.pop(client, ()):
+            method = policy[0]
+            window = self._windows[policy]
+            window.clients.discard(client)
+            if not window.clients:
+                del self._windows[policy]
+                self._by_method[method].remove(window)
+                if not self._by_method[method]:
+                    del self._by_method[method]
+            skip = self._skip[method]
+            skip.discard(client)
+            if not skip:
+                del self._skip[method]
+
+    def feed(self, method: str, data: Dict[str, Any]) -> Optional[Set[Any]]:
+        """
+        计入一条解析后的消息
+
+        返回汇总该类消息的客户端（逐条广播时应跳过），没有客户端汇总该类消息时返回 None。
+        """
+        windows = self._by_method.get(method)
+        if not windows:
+            return None
+        _FRAMES_IN.inc()
+        field = _METHOD_FIELDS[method]
+        latest = data.get(field)
+        user = None
+        for window in windows:
+            window.count += 1
+            if len(window.users) < window.policy[2]:
+                if user is None:
+                    user = user_brief(data)
+                window.users.append(user)
+            if latest is not None:
+                window.latest = as_int(latest)
+        return self._skip[method]
+
+    def flush(self, now: Optional[float] = None) -> List[Tuple[str, Set[Any]]]:
+        """结束到期的窗口，返回 (汇总帧, 接收的客户端)；窗口内没有消息时不发送"""
+        now = time.monotonic() if now is None else now
+        frames: List[Tuple[str, Set[Any]]] = []
+        for window in self._windows.values():
+            method, seconds, _ = window.policy
+            if now - window.started < seconds:
+                continue
+            if window.count:
+                frame = {
+                    "type": "summary",
+                    "method": method,
+                    "window_ms": int((now - window.started) * 1000),
+                    "count": window.count,
+                    "users": window.users,
+                }
+                if window.latest is not None:
+                    frame[_METHOD_FIELDS[method]] = window.latest
+                _FRAMES_OUT.inc()
+                frames.append((jsonlib.dumps(frame), set(window.clients)))
+            window.count = 0
+            window.users = []
+            window.latest = None
+            window.started = now
+        return frames
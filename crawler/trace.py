@@ -0,0 +1,67 @@
+import time
+from typing import Dict, Optional
+
+from utils import jsonlib
+
+# 阶段划分（时间均为 Unix 时间，秒）：
+#   upstream: Common.createTime -> Response.now   服务端排队（同一时钟）
+#   network:  Response.now -> 收到帧                网络传输（跨时钟，包含时钟偏差）
+#   decode:   收到帧 -> 解析编码完成
+#   queue:    解析完成 -> 开始向该客户端发送
+#   send:     开始发送 -> 写入 socket 完成
+#   end_to_end: Common.createTime -> 写入 socket 完成
+STAGES = ("upstream", "network", "decode", "queue", "send", "end_to_end")
+
+
+class MessageTrace:
+    """单条消息在处理管道中的时间戳"""
+
+    __slots__ = ("method", "created", "server_now", "received", "decoded")
+
+    def __init__(
+        self,
+        method: str,
+        created: Optional[float],
+        server_now: Optional[float],
+        received: float,
+    ):
+        self.method = method
+        self.created = created
+        self.server_now = server_now
+        self.received = received
+        self.decoded = received
+
+    def mark_decoded(self) -> None:
+        self.decoded = time.time()
+
+    def upstream_stages(self) -> Dict[str, float]:
+        """每条消息只计算一次的阶段耗时（秒）"""
+        stages = {"decode": self.decoded - self.received}
+        if self.server_now:
+            stages["network"] = self.received - self.server_now
+            if self.created:
+                stages["upstream"] = self.server_now - self.created
+        return stages
+
+    def envelope(self, sent: float) -> Dict[str, int]:
+        """下发给客户端的 _ts 字段（毫秒时间戳）"""
+        ts = {
+            "received": int(self.received * 1000),
+            "decoded": int(self.decoded * 1000),
+            "sent": int(sent * 1000),
+        }
+        if self.created:
+            ts["created"] = int(self.created * 1000)
+        if self.server_now:
+            ts["server_now"] = int(self.server_now * 1000)
+        return ts
+
+
+def with_envelope(frame: str, ts: Dict[str, int]) -> str:
+    """在已编码的 JSON 对象末尾追加 _ts 字段，不重新解析整条消息"""
+    if not frame.endswith("}"):
+        return frame
+    encoded = jsonlib.dumps(ts)
+    if frame[:-1].strip() == "{":
+        return '{"_ts":' + encoded + "}"
+    return frame[:-1] + ',"_ts":' + encoded + "}"
@@ -0,0 +1,281 @@
+import asyncio
+import itertools
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from crawler.errors import UpstreamNetworkError
+from crawler.websocket import DouyinWebSocketCrawler
+from log.logger import logger
+from utils.metrics import metrics
+from utils.reconnect import RECOVER_SECONDS
+
+MULTIPLEX_RESULTS = metrics.counter(
+    "upstream_multiplex_total", "房间加入共享上游连接的结果（accepted / fallback）", ["result"]
+)
+
+
+class RoomSubscription:
+    """
+    单个房间对上游的订阅
+
+    对 main.py 暴露与 DouyinWebSocketCrawler 相同的接口（websocket、broadcast_callback、
+    fetch_live_danmaku、close），实际连接由 UpstreamManager 分配：独占一条上游连接，
+    或加入其它房间的共享连接。
+    """
+
+    def __init__(self, manager: "UpstreamManager", room_id: str):
+        self.manager = manager
+        self.room_id = room_id
+        self.room_key = int(room_id)
+        self.session: Optional["UpstreamSession"] = None
+        self.broadcast_callback: Optional[Callable] = None
+        self.first_message = asyncio.Event()
+        self.closed = False
+        self.failed_at: Optional[float] = None  # 上游失败时间，重连后收到首条消息时计入恢复耗时
+
+    @property
+    def websocket(self):
+        return self.session.crawler.websocket if self.session is not None else None
+
+    async def deliver(self, data, trace=None, message=None) -> None:
+        if not self.first_message.is_set():
+            self.first_message.set()
+            if self.failed_at is not None:
+                RECOVER_SECONDS.observe(time.monotonic() - self.failed_at)
+                self.failed_at = None
+        if self.broadcast_callback is not None:
+            await self.broadcast_callback(data, trace, message)
+
+    async def fetch_live_danmaku(self, params) -> None:
+        try:
+            await self.manager.run(self, params)
+        except Exception:
+            if self.failed_at is None:
+                self.failed_at = time.monotonic()
+            self.first_message.clear()
+            raise
+
+    async def close(self) -> None:
+        await self.manager.release(self)
+
+
+class UpstreamSession:
+    """一条上游 WebSocket 连接及其承载的房间"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, crawler: DouyinWebSocketCrawler, primary_room: int, shared: bool):
+        self.id = next(self._ids)
+        self.crawler = crawler
+        self.primary_room = primary_room
+        self.shared = shared
+        # None: 未知；True: 已确认上游接受多房间；False: 上游不接受
+        self.capable: Optional[bool] = None
+        self.subscriptions: Dict[int, RoomSubscription] = {}
+        self.connected = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        crawler.broadcast_callback = self._default_route
+        crawler.on_connected = self._on_connected
+
+    async def _on_connected(self) -> None:
+        self.connected.set()
+
+    async def _default_route(self, data, trace=None, message=None) -> None:
+        # 没有 Common.roomId 的消息交给主房间（主房间已离开时交给任一房间）
+        sub = self.subscriptions.get(self.primary_room)
+        if sub is None:
+            sub = next(iter(self.subscriptions.values()), None)
+        if sub is not None:
+            await sub.deliver(data, trace, message)
+
+    @property
+    def done(self) -> bool:
+        return self.task is not None and self.task.done()
+
+    def add(self, sub: RoomSubscription) -> None:
+        self.subscriptions[sub.room_key] = sub
+        if self.shared:
+            # 独占连接不按 Common.roomId 过滤，所有消息交给唯一的房间
+            self.crawler.room_routes[sub.room_key] = sub.deliver
+        sub.session = self
+
+    def remove(self, sub: RoomSubscription) -> None:
+        self.subscriptions.pop(sub.room_key, None)
+        self.crawler.room_routes.pop(sub.room_key, None)
+        if sub.session is self:
+            sub.session = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "primary_room": str(self.primary_room),
+            "rooms": [str(r) for r in self.subscriptions],
+            "shared": self.shared,
+            "capable": self.capable,
+            "connected": self.connected.is_set() and self.crawler.websocket is not None,
+        }
+
+
+class UpstreamManager:
+    """
+    上游连接管理
+
+    未开启复用时每个房间独占一条上游连接（原有行为）。开启复用后新房间优先加入
+    已有的共享连接：连接建立后发送该房间的心跳和进入房间消息，并在 probe_timeout
+    内等待该房间的第一条消息（按 Common.roomId 路由）。收到即确认上游接受多房间；
+    超时则认为上游不接受，之后不再新建或加入共享连接，房间回退为独占连接。
+    """
+
+    def __init__(
+        self,
+        crawler_factory: Callable[[], DouyinWebSocketCrawler],
+        multiplex: bool = False,
+        rooms_per_session: int = 20,
+        probe_timeout: float = 15,
+    ):
+        self.crawler_factory = crawler_factory
+        self.multiplex = multiplex
+        self.rooms_per_session = max(1, rooms_per_session)
+        self.probe_timeout = probe_timeout
+        self.sessions: Set[UpstreamSession] = set()
+        # 任一共享连接探测失败后不再新建共享连接（同一上游的行为一致）
+        self.supported: Optional[bool] = None
+        metrics.gauge("upstream_sessions", "上游 WebSocket 连接数", func=lambda: len(self.sessions))
+        metrics.gauge(
+            "upstream_rooms_per_session",
+            "平均每条上游连接承载的房间数",
+            func=self._rooms_per_session,
+        )
+
+    def _rooms_per_session(self) -> float:
+        if not self.sessions:
+            return 0.0
+        return sum(len(s.subscriptions) for s in self.sessions) / len(self.sessions)
+
+    def subscribe(self, room_id: str) -> RoomSubscription:
+        return RoomSubscription(self, room_id)
+
+    def _place(self, sub: RoomSubscription, dedicated: bool) -> UpstreamSession:
+        shared = self.multiplex and not dedicated and self.supported is not False
+        if shared:
+            for session in self.sessions:
+                if (
+                    session.shared
+                    and session.capable is not False
+                    and not session.done
+                    and len(session.subscriptions) < self.rooms_per_session
+                ):
+                    session.add(sub)
+                    return session
+        session = UpstreamSession(
+            self.crawler_factory(), sub.room_key, shared=shared
+        )
+        session.add(sub)
+        self.sessions.add(session)
+        return session
+
+    def _start(self, session: UpstreamSession, params) -> None:
+        session.task = asyncio.create_task(session.crawler.fetch_live_danmaku(params))
+        session.task.add_done_callback(lambda _: self._finished(session))
+        logger.info(
+            f"[Upstream] [🔗 新建上游连接] | [会话: {session.id}] | "
+            f"[房间ID: {session.primary_room}] | [共享: {session.shared}]"
+        )
+
+    def _finished(self, session: UpstreamSession) -> None:
+        self.sessions.discard(session)
+        # 连接结束后归还代理等资源池成员，重连时按最新评分重新分配
+        session.crawler.release_leases()
+
+    async def _attach(self, sub: RoomSubscription, session: UpstreamSession) -> bool:
+        """在已有连接上进入房间，返回上游是否接受"""
+        waiter = asyncio.create_task(session.connected.wait())
+        await asyncio.wait({waiter, session.task}, return_when=asyncio.FIRST_COMPLETED)
+        if not waiter.done():
+            waiter.cancel()
+            return True  # 连接已结束，由 run() 按会话结果处理
+        sub.first_message.clear()
+        await session.crawler.send_heartbeat(sub.room_id)
+        await session.crawler.send_enter_room(sub.room_id)
+        if session.capable:
+            MULTIPLEX_RESULTS.labels("accepted").inc()
+            return True
+
+        try:
+            await asyncio.wait_for(sub.first_message.wait(), self.probe_timeout)
+        except asyncio.TimeoutError:
+            if session.capable is None:
+                session.capable = False
+                self.supported = False
+            MULTIPLEX_RESULTS.labels("fallback").inc()
+            logger.warning(
+                f"[Upstream] [↩️ 上游未接受共享连接，回退独占连接] | "
+                f"[会话: {session.id}] | [房间ID: {sub.room_id}]"
+            )
+            return False
+        session.capable = True
+        self.supported = True
+        MULTIPLEX_RESULTS.labels("accepted").inc()
+        logger.info(
+            f"[Upstream] [🔀 房间加入共享连接] | [会话: {session.id}] | "
+            f"[房间ID: {sub.room_id}] | [房间数: {len(session.subscriptions)}]"
+        )
+        return True
+
+    async def run(self, sub: RoomSubscription, params) -> None:
+        """分配连接并等待其结束：正常结束时返回，出错时抛出连接的异常"""
+        sub.closed = False
+        dedicated = False
+        while True:
+            if sub.session is not None and sub.session.done:
+                sub.session.remove(sub)
+            session = sub.session or self._place(sub, dedicated)
+            if session.task is None:
+                self._start(session, params)
+            elif session.primary_room != sub.room_key:
+                if not await self._attach(sub, session):
+                    session.remove(sub)
+                    dedicated = True
+                    continue
+
+            await asyncio.wait({session.task})
+            if sub.session is not session or sub.closed:
+                if sub.closed:
+                    return
+                continue  # 已被移到其它连接
+            if session.task.cancelled():
+                raise UpstreamNetworkError("[Upstream] [❌ 上游连接已取消]")
+            exc = session.task.exception()
+            if exc is not None:
+                raise exc
+            return
+
+    async def release(self, sub: RoomSubscription) -> None:
+        """房间不再需要上游；连接上没有其它房间时关闭连接"""
+        sub.closed = True
+        session = sub.session
+        if session is None:
+            return
+        session.remove(sub)
+        if session.subscriptions:
+            return
+        self.sessions.discard(session)
+        await session.crawler.close()
+        if session.task is not None and not session.task.done():
+            session.task.cancel()
+            try:
+                await session.task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        sessions: List[UpstreamSession] = sorted(self.sessions, key=lambda s: s.id)
+        return {
+            "multiplex": self.multiplex,
+            "supported": self.supported,
+            "rooms_per_session_limit": self.rooms_per_session,
+            "sessions": len(sessions),
+            "rooms": sum(len(s.subscriptions) for s in sessions),
+            "results": MULTIPLEX_RESULTS.snapshot(),
+            "items": [s.to_dict() for s in sessions],
+        }
@@ -1,15 +1,13 @@
 import asyncio
-import gzip
-import json
 import time
 import traceback
+import zlib
+from collections import Counter
 from datetime import datetime
-from typing import Any, Optional, Type, Union
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type, Union
 
 import httpx
 import websockets
-import websockets_proxy  # type: ignore[import-untyped]
-from google.protobuf import json_format
 from google.protobuf.message import DecodeError as ProtoDecodeError
 from websockets import (
     ConnectionClosedError,
@@ -19,20 +17,27 @@ from websockets import (
 )
 from websockets.client import WebSocketClientProtocol
 
+from crawler import protos
+from crawler.compression import PayloadTooLargeError, decompress_frame
+from crawler.errors import UpstreamNetworkError, UpstreamStatusError, UpstreamTimeoutError
+from crawler.projection import peek_common
+from crawler.registry import MESSAGE_REGISTRY, DecodedMessage, build_dispatch_table
+from crawler.trace import MessageTrace
 from log.logger import logger
 from model.tiktok import LiveWebcast
-from proto.tiktok.tiktok_webcast_pb2 import (
-    PushFrame,
-    Response,
-    GiftMessage,
-    ChatMessage,
-    MemberMessage,
-    SocialMessage,
-    LinkMicFanTicketMethod,
-    HeartBeat,
-    EnterRoom,
-)
+from utils.config import Config
 from utils.endpoint import BaseEndpointManager
+from utils.loop_monitor import slow_callbacks
+from utils.metrics import metrics
+from utils.pool import Lease
+from utils.reconnect import upstream_gate
+
+UNKNOWN_MESSAGES = metrics.counter(
+    "webcast_unknown_messages_total", "未注册（跳过解析）的消息数", ["method"]
+)
+UNROUTED_MESSAGES = metrics.counter(
+    "webcast_unrouted_messages_total", "共享上游会话中不属于任何已订阅房间的消息数"
+)
 
 
 class DouyinWebSocketCrawler:
@@ -46,146 +51,118 @@ class DouyinWebSocketCrawler:
         self.callbacks = callbacks or {}
         # 保留原始的broadcast回调，同时保留其他消息类型回调
         self.broadcast_callback = self.callbacks.get("broadcast", None)
+        # 按 Common.roomId 路由的广播回调（共享上游会话时使用），为空时全部交给 broadcast_callback
+        self.room_routes: Dict[int, Callable] = {}
+        # 连接成功并发送进入房间消息后调用（共享会话在此之后加入其它房间）
+        self.on_connected: Optional[Callable[[], Awaitable[None]]] = None
+        # 未注册的消息类型计数（跳过解析）
+        self.unknown_methods: Counter = Counter()
         self.timeout = kwargs.get("timeout", 20)  # 超时时间
+        self.connect_timeout = kwargs.get("connect_timeout", 30)  # 单次连接超时
         self.connected_clients: set[WebSocketServerProtocol] = set()  # 管理连接的客户端
         self.websocket: Optional[WebSocketClientProtocol] = None
         self.wss_headers = self.headers
         proxy = kwargs.get("proxies", {"http://": None, "https://": None}).get(
             "http://"
         )
-        self.proxy = websockets_proxy.Proxy.from_url(proxy) if proxy else None
+        self.proxy = None
+        if proxy:
+            # 仅在配置代理时导入 websockets_proxy
+            import websockets_proxy  # type: ignore[import-untyped]
+
+            self.proxy = websockets_proxy.Proxy.from_url(proxy)
+            self._proxy_connect = websockets_proxy.proxy_connect
+        # 占用的资源池成员（代理等），连接结果回报给资源池，连接结束后释放
+        self.leases: List[Lease] = list(kwargs.get("leases") or [])
+
+    def _report_failure(self, reason: str, status: Optional[int] = None) -> None:
+        """向资源池回报连接失败（被隔离的成员在重连时不会再被分配）"""
+        for lease in self.leases:
+            lease.failed(reason, status)
+
+    def release_leases(self) -> None:
+        for lease in self.leases:
+            lease.release()
+
+    @property
+    def callbacks(self) -> dict:
+        return self._callbacks
+
+    @callbacks.setter
+    def callbacks(self, value: Optional[dict]) -> None:
+        # 回调变更时重建分发表，热路径只需一次字典查找
+        self._callbacks = value or {}
+        self._dispatch = build_dispatch_table(self._callbacks)
 
     async def connect_websocket(
         self,
         websocket_uri: str,
     ):
         """
-        连接 WebSocket
+        连接 WebSocket（单次尝试）
+
+        连接经过进程级的 upstream_gate（熔断器 + 并发连接限制），失败时抛出
+        crawler/errors.py 中的类型化异常，重连与退避由调用方按 ReconnectPolicy 统一处理。
 
         Args:
             websocket_uri: WebSocket URI (ws:// or wss://)
         """
-        max_retries = 5
-        retry_count = 0
-        base_delay = 2
-
-        while retry_count < max_retries:
+        async with upstream_gate.attempt():
+            connect_start = time.monotonic()
             try:
-                # 设置更长的连接超时时间
-                connect_timeout = 30 + (retry_count * 10)  # 递增超时时间
-
                 if self.proxy:
-                    self.websocket = await asyncio.wait_for(
-                        websockets_proxy.proxy_connect(
-                            websocket_uri,
-                            extra_headers=self.wss_headers,
-                            proxy=self.proxy,
-                            ping_interval=None,
-                            ping_timeout=30,
-                        ),
-                        timeout=connect_timeout,
+                    connect = self._proxy_connect(
+                        websocket_uri,
+                        extra_headers=self.wss_headers,
+                        proxy=self.proxy,
+                        ping_interval=None,
+                        ping_timeout=30,
                     )
                 else:
-                    self.websocket = await asyncio.wait_for(
-                        websockets.connect(
-                            websocket_uri,
-                            extra_headers=self.wss_headers,
-                            ping_interval=None,
-                            ping_timeout=30,
-                        ),
-                        timeout=connect_timeout,
-                    )
-
-                logger.info(
-                    "[ConnectWebsocket] [🌐 已连接 WebSocket] | [服务器：{0}] | [重试次数: {1}]".format(
-                        websocket_uri, retry_count
-                    )
-                )
-                return  # 连接成功，退出重试循环
-
-            except (ConnectionResetError, ConnectionRefusedError, OSError) as exc:
-                retry_count += 1
-                # 使用指数退避算法计算延迟时间
-                delay = base_delay * (2**retry_count) + (retry_count * 2)
-
-                logger.warning(
-                    f"[ConnectWebSocket] [🔄 网络连接问题，准备重试] | "
-                    f"[尝试次数: {retry_count}/{max_retries}] | "
-                    f"[延迟: {delay}秒] | [错误：{type(exc).__name__}: {str(exc)}]"
-                )
-
-                if retry_count >= max_retries:
-                    logger.error(
-                        f"[ConnectWebSocket] [❌ 连接失败，已达最大重试次数] | "
-                        f"[最终错误：{type(exc).__name__}: {str(exc)}]"
-                    )
-                    raise ConnectionError(
-                        f"[ConnectWebSocket] [❌ WebSocket 连接失败] | "
-                        f"[网络问题，重试{max_retries}次后仍失败] | [错误：{str(exc)}]"
+                    connect = websockets.connect(
+                        websocket_uri,
+                        extra_headers=self.wss_headers,
+                        ping_interval=None,
+                        ping_timeout=30,
                     )
-
-                # 等待后重试
-                await asyncio.sleep(delay)
+                self.websocket = await asyncio.wait_for(connect, timeout=self.connect_timeout)
 
             except asyncio.TimeoutError as exc:
-                retry_count += 1
-                delay = base_delay * retry_count
-
+                self._report_failure("connect_timeout")
                 logger.warning(
-                    f"[ConnectWebSocket] [⏰ 连接超时，准备重试] | "
-                    f"[尝试次数: {retry_count}/{max_retries}] | [延迟: {delay}秒]"
+                    f"[ConnectWebSocket] [⏰ 连接超时] | [超时: {self.connect_timeout}秒]"
                 )
-
-                if retry_count >= max_retries:
-                    logger.error(f"[ConnectWebSocket] [❌ 连接超时，已达最大重试次数]")
-                    raise ConnectionError(
-                        f"[ConnectWebSocket] [❌ WebSocket 连接失败] | "
-                        f"[连接超时，重试{max_retries}次后仍失败]"
-                    )
-
-                await asyncio.sleep(delay)
+                raise UpstreamTimeoutError(
+                    f"[ConnectWebSocket] [❌ WebSocket 连接超时] | [超时: {self.connect_timeout}秒]"
+                ) from exc
 
             except websockets.InvalidStatusCode as exc:
-                retry_count += 1
-                delay = base_delay * retry_count
-
+                self._report_failure(f"status_{exc.status_code}", exc.status_code)
                 logger.warning(
-                    f"[ConnectWebSocket] [⚠️ 无效状态码，准备重试] | "
-                    f"[尝试次数: {retry_count}/{max_retries}] | "
-                    f"[状态码：{exc.status_code}] | [延迟: {delay}秒]"
+                    f"[ConnectWebSocket] [⚠️ 无效状态码] | [状态码：{exc.status_code}]"
                 )
-
-                if retry_count >= max_retries:
-                    logger.error(
-                        f"[ConnectWebSocket] [❌ 状态码错误，已达最大重试次数] | [状态码：{exc.status_code}]"
-                    )
-                    raise ConnectionError(
-                        f"[ConnectWebSocket] [❌ WebSocket 连接失败] | "
-                        f"[状态码错误：{exc.status_code}]"
-                    )
-
-                await asyncio.sleep(delay)
+                raise UpstreamStatusError(
+                    f"[ConnectWebSocket] [❌ WebSocket 连接失败] | [状态码错误：{exc.status_code}]",
+                    exc.status_code,
+                ) from exc
 
             except Exception as exc:
-                retry_count += 1
-                delay = base_delay * retry_count
-
+                # 连接被拒绝 / 重置、DNS 失败、代理隧道失败等都归为网络错误
+                self._report_failure(type(exc).__name__)
                 logger.warning(
-                    f"[ConnectWebSocket] [⚠️ 未知错误，准备重试] | "
-                    f"[尝试次数: {retry_count}/{max_retries}] | "
-                    f"[错误类型：{type(exc).__name__}] | [延迟: {delay}秒]"
+                    f"[ConnectWebSocket] [🔄 网络连接问题] | "
+                    f"[错误：{type(exc).__name__}: {str(exc)}]"
                 )
+                raise UpstreamNetworkError(
+                    f"[ConnectWebSocket] [❌ WebSocket 连接失败] | "
+                    f"[错误：{type(exc).__name__}: {str(exc)}]"
+                ) from exc
 
-                if retry_count >= max_retries:
-                    logger.error(traceback.format_exc())
-                    logger.error(
-                        f"[ConnectWebSocket] [❌ 连接失败，已达最大重试次数] | [错误：{str(exc)}]"
-                    )
-                    raise ConnectionError(
-                        f"[ConnectWebSocket] [❌ WebSocket 连接失败] | [错误：{str(exc)}]"
-                    )
-
-                await asyncio.sleep(delay)
+            for lease in self.leases:
+                lease.connected(time.monotonic() - connect_start)
+            logger.info(
+                "[ConnectWebsocket] [🌐 已连接 WebSocket] | [服务器：{0}]".format(websocket_uri)
+            )
 
     async def receive_messages(self):
         """
@@ -215,6 +192,8 @@ class DouyinWebSocketCrawler:
 
             except asyncio.TimeoutError:
                 timeout_count += 1
+                for lease in self.leases:
+                    lease.timeout()
                 logger.warning(
                     "[ReceiveMessages] [⚠️ 超时] | [超时次数：{0} / 3]".format(
                         timeout_count
@@ -265,7 +244,7 @@ class DouyinWebSocketCrawler:
 
     async def fetch_live_danmaku(self, params: LiveWebcast) -> None:
         endpoint = BaseEndpointManager.model_2_endpoint(
-            "wss://webcast-ws.tiktok.com/webcast/im/ws_proxy/ws_reuse_supplement/",
+            Config.WEBCAST_WS_URL,
             params.model_dump(),
         )
         logger.info(
@@ -277,6 +256,8 @@ class DouyinWebSocketCrawler:
         # 连接成功后发送初始化消息
         await self.send_heartbeat(params.room_id)
         await self.send_enter_room(params.room_id)
+        if self.on_connected is not None:
+            await self.on_connected()
 
         await self.receive_messages()
 
@@ -290,11 +271,11 @@ class DouyinWebSocketCrawler:
 
         try:
             # 创建心跳消息 - 实际传的是 room_id
-            heartbeat = HeartBeat()
+            heartbeat = protos.HeartBeat()
             heartbeat.room_id = int(room_id)
 
             # 创建 PushFrame
-            frame = PushFrame()
+            frame = protos.PushFrame()
             frame.payload_encoding = "pb"
             frame.payload_type = "hb"
             frame.payload = heartbeat.SerializeToString()
@@ -319,7 +300,7 @@ class DouyinWebSocketCrawler:
             payload = self._build_enter_room_payload(int(room_id))
 
             # 创建 PushFrame
-            frame = PushFrame()
+            frame = protos.PushFrame()
             frame.payload_encoding = "pb"
             frame.payload_type = "im_enter_room"
             frame.payload = payload
@@ -389,18 +370,17 @@ class DouyinWebSocketCrawler:
 
     async def handle_wss_message(self, message: bytes) -> None:
         """处理 WebSocket 消息"""
+        received = time.time()
         try:
-            wss_package = PushFrame()
+            wss_package = protos.PushFrame()
             wss_package.ParseFromString(message)
 
             logger.debug("[WssPackage] [📦Wss包] | [{0}]".format(wss_package))
 
-            try:
-                decompressed = gzip.decompress(wss_package.payload)
-            except gzip.BadGzipFile:
-                decompressed = wss_package.payload
+            # 按声明的编码/魔数解压，限制解压后大小
+            decompressed = decompress_frame(wss_package, Config.MAX_DECOMPRESSED_BYTES)
 
-            payload_package = Response()
+            payload_package = protos.Response()
             payload_package.ParseFromString(decompressed)
 
             logger.debug(
@@ -413,6 +393,9 @@ class DouyinWebSocketCrawler:
 
             # 消息处理任务
             tasks = []
+            tracing = Config.LATENCY_TRACING
+            server_now = payload_package.now / 1000 if payload_package.now else None
+            routes = self.room_routes
             for msg in payload_package.messages:
                 method = msg.method
                 payload = msg.payload
@@ -420,13 +403,36 @@ class DouyinWebSocketCrawler:
                 # 添加调试日志
                 logger.debug(f"[HandleWssMessage] [📩收到消息类型] | [方法：{method}]")
 
+                callback = self.broadcast_callback
+                created = 0
+                if routes:
+                    # 共享会话：先按 Common.roomId 找到所属房间，无人订阅的房间不解析
+                    room_id, created = peek_common(payload)
+                    if room_id:
+                        callback = routes.get(room_id)
+                        if callback is None:
+                            UNROUTED_MESSAGES.inc()
+                            continue
+
                 # 消息处理管道
-                processed_data = await self.process_message(method, payload)
+                message = await self.process_message(method, payload)
 
                 # 如果有消息需要广播且存在广播回调
-                if processed_data is not None and self.broadcast_callback:
-                    # 检查是否还有活跃连接，如果没有则跳过广播
-                    tasks.append(self.broadcast_callback(processed_data))
+                if message is not None and callback:
+                    trace = None
+                    if tracing:
+                        if not routes:
+                            created = peek_common(payload)[1]
+                        trace = MessageTrace(
+                            method, created / 1000 if created else None, server_now, received
+                        )
+                        trace.mark_decoded()
+                    tasks.append(
+                        slow_callbacks.track(
+                            callback(message.frame, trace, message),
+                            "broadcast_callback",
+                        )
+                    )
 
             # 并发运行所有广播任务
             if tasks:
@@ -444,37 +450,37 @@ class DouyinWebSocketCrawler:
             # 增加保活机制
             # await self.send_ack(wss_package.LogID, payload_package.internal_ext)
 
+        except (PayloadTooLargeError, zlib.error) as e:
+            logger.warning(f"[HandleWssMessage] [⚠️ 丢弃异常帧] | [原因: {str(e)}]")
         except Exception:
             logger.error(traceback.format_exc())
 
-    async def process_message(self, method: str, payload: bytes) -> Optional[str]:
+    async def process_message(self, method: str, payload: bytes) -> Optional[DecodedMessage]:
         """
-        处理各种类型的消息
+        处理各种类型的消息，返回解析后的字典与编码后的帧
         """
         if not method or not payload:
             logger.warning("[ProcessMessage] [⚠️ 无效参数] | [方法或数据为空]")
             return None
 
-        try:
-            # 首先检查callbacks中是否有对应的处理函数
-            if method in self.callbacks and callable(self.callbacks[method]):
-                # 通过回调字典调用对应的方法
-                result = await self.callbacks[method](payload)
-                return result
-            # 然后尝试调用对应类型的类方法
-            method_handler = getattr(self, method, None) if method else None
-            if method_handler and callable(method_handler):
-                # 如果存在对应方法，则调用
-                result = await method_handler(payload)
-                return result
-            else:
-                pass
+        handler = self._dispatch.get(method)
+        if handler is None:
+            # 未注册的类型只计数，不做任何解析
+            self.unknown_methods[method] += 1
+            UNKNOWN_MESSAGES.labels(method).inc()
             return None
+
+        try:
+            result = await slow_callbacks.track(handler(payload), method)
         except Exception as e:
             logger.error(
                 f"[ProcessMessage] [⚠️ 处理消息出错] | [方法: {method}] | [错误: {str(e)}]"
             )
             return None
+        if result is None or isinstance(result, DecodedMessage):
+            return result
+        # 自定义回调只返回编码后的字符串
+        return DecodedMessage(method, None, result)
 
     async def send_ack(self, log_id: int, internal_ext: str) -> None:
         """发送 ack 包"""
@@ -489,7 +495,7 @@ class DouyinWebSocketCrawler:
             return
 
         try:
-            ack = PushFrame()
+            ack = protos.PushFrame()
             ack.logid = log_id
             ack.payload_type = internal_ext
             data = ack.SerializeToString()
@@ -505,14 +511,14 @@ class DouyinWebSocketCrawler:
             logger.warning("[SendPing] [❌ 无法发送 ping 包] | [WebSocket 未连接]")
             return
 
-        ping = PushFrame()
+        ping = protos.PushFrame()
         ping.payload_type = "hb"
         data = ping.SerializeToString()
         logger.info("[SendPing] [📤 发送 ping 包]")
         await self.websocket.ping(data)
 
     async def on_message(self, message):
-        await self.handle_wss_message(message)
+        await slow_callbacks.track(self.handle_wss_message(message), "handle_wss_message")
 
     async def on_error(self, message):
         return await super().on_error(message)
@@ -524,35 +530,12 @@ class DouyinWebSocketCrawler:
         return await super().on_open()
 
     @classmethod
-    async def WebcastGiftMessage(cls, data: bytes) -> dict:
+    async def WebcastGiftMessage(cls, data: bytes) -> str:
         """处理直播间礼物消息"""
-        if not data:
-            logger.warning("[WebcastGiftMessage] [⚠️ 空数据] | [无消息内容]")
-            return json.dumps({"error": "Empty message data"})
-        try:
-            giftMessage = GiftMessage()
-            giftMessage.ParseFromString(data)
-            data_json = json.loads(
-                json_format.MessageToJson(
-                    giftMessage,
-                    preserving_proto_field_name=True,
-                    ensure_ascii=False,
-                )
-            )
-            nick_name = data_json.get("user").get("nickname", "N/A")
-            gift_name = data_json.get("gift").get("describe", "N/A")
-            gift_price = data_json.get("gift").get("diamond_count", "N/A")
-
-            logger.info(
-                f"[WebcastGiftMessage] [🎁直播间礼物] [用户：{nick_name} 送出了 {gift_name} 价值 {gift_price} 钻石]"
-            )
-            return json.dumps(data_json)
-        except Exception as e:
-            logger.error(f"[WebcastGiftMessage] [⚠️ 解析失败] | [错误: {str(e)}]")
-            return json.dumps({"error": "Failed to parse message", "details": str(e)})
+        return await MESSAGE_REGISTRY["WebcastGiftMessage"].handle(data)
 
     @classmethod
-    async def WebcastChatMessage(cls, data: bytes) -> dict:
+    async def WebcastChatMessage(cls, data: bytes) -> str:
         """
         处理直播间消息
 
@@ -560,35 +543,12 @@ class DouyinWebSocketCrawler:
             data (bytes): 直播间消息的字节数据
 
         Returns:
-            dict: 直播间消息的 JSON 数据
+            str: 直播间消息的 JSON 数据
         """
-        if not data:
-            logger.warning("[WebcastChatMessage] [⚠️ 空数据] | [无消息内容]")
-            return json.dumps({"error": "Empty message data"})
-        try:
-            chatMessage = ChatMessage()
-            chatMessage.ParseFromString(data)
-            data_json = json.loads(
-                json_format.MessageToJson(
-                    chatMessage,
-                    preserving_proto_field_name=True,
-                    ensure_ascii=False,
-                )
-            )
-
-            nick_name = data_json.get("user").get("nickname")
-            content = data_json.get("content")
-
-            logger.info(
-                f"[WebcastChatMessage] [💬直播间消息] [用户：{nick_name} 说：{content}]"
-            )
-            return json.dumps(data_json)
-        except Exception as e:
-            logger.error(f"[WebcastChatMessage] [⚠️ 解析失败] | [错误: {str(e)}]")
-            return json.dumps({"error": "Failed to parse message", "details": str(e)})
+        return await MESSAGE_REGISTRY["WebcastChatMessage"].handle(data)
 
     @classmethod
-    async def WebcastMemberMessage(cls, data: bytes) -> dict:
+    async def WebcastMemberMessage(cls, data: bytes) -> str:
         """
         处理直播间成员消息
 
@@ -596,34 +556,12 @@ class DouyinWebSocketCrawler:
             data (bytes): 直播间成员消息的字节数据
 
         Returns:
-            dict: 直播间成员消息的 JSON 数据
+            str: 直播间成员消息的 JSON 数据
         """
-        if not data:
-            logger.warning("[WebcastMemberMessage] [⚠️ 空数据] | [无消息内容]")
-            return json.dumps({"error": "Empty message data"})
-        try:
-            memberMessage = MemberMessage()
-            memberMessage.ParseFromString(data)
-            data_json = json.loads(
-                json_format.MessageToJson(
-                    memberMessage,
-                    preserving_proto_field_name=True,
-                    ensure_ascii=False,
-                )
-            )
-
-            nick_name = data_json.get("user").get("nickname")
-
-            logger.info(
-                f"[WebcastMemberMessage] [👥直播间成员消息] [用户：{nick_name} 加入了直播间]"
-            )
-            return json.dumps(data_json)
-        except Exception as e:
-            logger.error(f"[WebcastMemberMessage] [⚠️ 解析失败] | [错误: {str(e)}]")
-            return json.dumps({"error": "Failed to parse message", "details": str(e)})
+        return await MESSAGE_REGISTRY["WebcastMemberMessage"].handle(data)
 
     @classmethod
-    async def WebcastSocialMessage(cls, data: bytes) -> dict:
+    async def WebcastSocialMessage(cls, data: bytes) -> str:
         """
         处理直播间社交消息
 
@@ -631,33 +569,12 @@ class DouyinWebSocketCrawler:
             data (bytes): 直播间社交消息的字节数据
 
         Returns:
-            dict: 直播间社交消息的 JSON 数据
+            str: 直播间社交消息的 JSON 数据
         """
-        if not data:
-            logger.warning("[WebcastSocialMessage] [⚠️ 空数据] | [无消息内容]")
-            return json.dumps({"error": "Empty message data"})
-        try:
-            socialMessage = SocialMessage()
-            socialMessage.ParseFromString(data)
-            data_json = json.loads(
-                json_format.MessageToJson(
-                    socialMessage,
-                    preserving_proto_field_name=True,
-                    ensure_ascii=False,
-                )
-            )
-            nick_name = data_json.get("user").get("nickname")
-
-            logger.info(
-                f"[WebcastSocialMessage] [➕观众关注] [用户：{nick_name} 关注了主播]"
-            )
-            return json.dumps(data_json)
-        except Exception as e:
-            logger.error(f"[WebcastSocialMessage] [⚠️ 解析失败] | [错误: {str(e)}]")
-            return json.dumps({"error": "Failed to parse message", "details": str(e)})
+        return await MESSAGE_REGISTRY["WebcastSocialMessage"].handle(data)
 
     @classmethod
-    async def WebcastLinkMicFanTicketMethod(cls, data: bytes) -> dict:
+    async def WebcastLinkMicFanTicketMethod(cls, data: bytes) -> str:
         """
         处理直播间连麦粉丝票消息
 
@@ -665,29 +582,9 @@ class DouyinWebSocketCrawler:
             data (bytes): 直播间连麦粉丝票消息的字节数据
 
         Returns:
-            dict: 直播间连麦粉丝票消息的 JSON 数据
+            str: 直播间连麦粉丝票消息的 JSON 数据
         """
-        if not data:
-            logger.warning("[WebcastLinkMicFanTicketMethod] [⚠️ 空数据] | [无消息内容]")
-            return json.dumps({"error": "Empty message data"})
-        try:
-            linkMicFanTicketMethod = LinkMicFanTicketMethod()
-            linkMicFanTicketMethod.ParseFromString(data)
-            data_json = json.loads(
-                json_format.MessageToJson(
-                    linkMicFanTicketMethod,
-                    preserving_proto_field_name=True,
-                    ensure_ascii=False,
-                )
-            )
-
-            logger.info(f"[WebcastLinkMicFanTicketMethod] [🎟️连麦粉丝票] {data_json}")
-            return json.dumps(data_json)
-        except Exception as e:
-            logger.error(
-                f"[WebcastLinkMicFanTicketMethod] [⚠️ 解析失败] | [错误: {str(e)}]"
-            )
-            return json.dumps({"error": "Failed to parse message", "details": str(e)})
+        return await MESSAGE_REGISTRY["WebcastLinkMicFanTicketMethod"].handle(data)
 
     async def close(self):
         """主动关闭WebSocket连接"""
@@ -1,10 +1,9 @@
 import datetime
 import logging
+import os
 from logging.handlers import TimedRotatingFileHandler
 from pathlib import Path
 
-from rich.logging import RichHandler
-
 
 class LogManager:
 
@@ -23,7 +22,16 @@ class LogManager:
         self.logger.handlers.clear()
         self.logger.setLevel(level)
 
-        if log_to_console:
+        if log_to_console == "plain":
+            # 纯文本控制台输出，不导入 rich（生产环境启动更快、每行开销更低）
+            ch = logging.StreamHandler()
+            ch.setFormatter(
+                logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+            )
+            self.logger.addHandler(ch)
+        elif log_to_console:
+            from rich.logging import RichHandler
+
             ch = RichHandler(
                 show_time=False,
                 show_level=True,
@@ -93,5 +101,11 @@ def log_setup(
     return logger
 
 
+# 控制台日志格式：rich（默认）/ plain / off
+_console = os.getenv("LOG_CONSOLE", "rich").lower()
+
 # 主日志记录器（包含所有日志级别）
-logger = log_setup(log_to_console=True, log_name="douyin-webcast")
+logger = log_setup(
+    log_to_console={"off": False, "plain": "plain"}.get(_console, True),
+    log_name="douyin-webcast",
+)
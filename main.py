@@ -1,37 +1,276 @@
 import asyncio
-import json
+import sqlite3
 import time
 from contextlib import asynccontextmanager
-
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-
+from typing import Any, Awaitable, Callable, List, Optional, Set
+
+from fastapi import Depends, FastAPI, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from crawler import protos
+from crawler.analytics import RoomAnalytics
+from crawler.combo import GiftComboAggregator
+from crawler.errors import CircuitOpenError, UpstreamNetworkError, is_retryable
+from crawler.projection import parse_projection_config
+from crawler.registry import DecodedMessage
+from crawler.room_state import RoomState
+from crawler.summary import RoomSummarizer, parse_summary_spec
+from crawler.trace import MessageTrace, with_envelope
+from crawler.upstream import UpstreamManager
 from crawler.websocket import DouyinWebSocketCrawler
 from log.logger import logger
 from model.tiktok import LiveWebcast
+from sinks.base import MessageSink
+from sinks.history import HistoryStore
+from sinks.webhook import WebhookSink, parse_destinations
+from utils import jsonlib
+from utils.admission import REJECT_MESSAGES, AdmissionController
 from utils.config import Config
+from utils.credential_pool import CredentialPool
+from utils.drain import DrainController, decode_resume_token
+from utils.lifecycle import RoomLifecycleManager
+from utils.loop_monitor import LoopLagMonitor, slow_callbacks
+from utils.metrics import metrics
+from utils.mux import MuxConnection
+from utils.pool import PoolExhausted
+from utils.proxy_pool import ProxyPool
+from utils.reconnect import reconnect_policy, upstream_gate
+from utils.room_registry import Room, RoomRegistry
+from utils.runtime import protobuf_backend, report_runtime, server_stack
+from utils.stream import NDJSON, SSE, StreamClient, parse_last_event_id, run_keepalive
 from utils.token import fetch_check_live_alive
 
 
+def log_preload_error(future: asyncio.Future) -> None:
+    """后台预加载失败时记录错误（首次解码时会再次加载）"""
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"[Protos] [❌ 预加载 protobuf 描述符失败] | [错误: {future.exception()}]")
+
+
 # 创建 lifespan 上下文管理器
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 启动时执行，相当于原来的 @app.on_event("startup")
-    cleanup_task = asyncio.create_task(check_inactive_rooms())
+    report_runtime()
+    # 启动后在后台线程预加载 protobuf 描述符，不阻塞接受连接
+    preload = asyncio.get_running_loop().run_in_executor(None, protos.load)
+    preload.add_done_callback(log_preload_error)
+    background_tasks = [
+        asyncio.create_task(room_lifecycle.run()),
+        asyncio.create_task(loop_monitor.run()),
+        asyncio.create_task(admission.run()),
+        asyncio.create_task(run_room_timers()),
+        asyncio.create_task(run_keepalive(Config.STREAM_KEEPALIVE)),
+        *(asyncio.create_task(sink.run()) for sink in message_sinks),
+    ]
+    if Config.CREDENTIAL_GEN_TTWID:
+        # 生成 ttwid 凭据并定期补充被移出的凭据
+        background_tasks.append(asyncio.create_task(credential_pool.run()))
     yield
     # 关闭时执行，相当于原来的 @app.on_event("shutdown")
-    cleanup_task.cancel()
-    try:
-        await cleanup_task
-    except asyncio.CancelledError:
-        pass
+    # 先排空：通知客户端带续传令牌重连，并发关闭上游连接
+    await drain_controller.drain(Config.DRAIN_TIMEOUT)
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    # 写出落地目标中剩余的缓冲
+    for sink in message_sinks:
+        await sink.close()
 
 
 # 使用 lifespan 参数创建 FastAPI 实例
 app = FastAPI(lifespan=lifespan)
-room_connections = {}  # room_id: set of WebSocket
-room_crawlers = {}  # room_id: DouyinWebSocketCrawler
-crawler_tasks = {}  # room_id: asyncio.Task 跟踪爬虫任务
-room_last_active = {}  # room_id: last_active_time 记录房间最后活跃时间
+# 房间注册表：room_id -> Room（爬虫、任务、客户端、计数器、最近消息缓冲）
+rooms = RoomRegistry(ring_size=Config.ROOM_RING_BUFFER_SIZE)
+
+metrics.gauge("rooms_active", "当前房间数", func=lambda: len(rooms))
+metrics.gauge("clients_connected", "当前下游客户端连接数", func=lambda: rooms.total_clients)
+
+
+def room_has_clients(room_id: str) -> bool:
+    room = rooms.get(room_id)
+    return bool(room and room.clients)
+
+
+def room_last_active(room_id: str):
+    room = rooms.get(room_id)
+    return room.last_active if room is not None else None
+
+
+# 房间空闲过期管理（最小堆调度到期关闭）
+room_lifecycle = RoomLifecycleManager(
+    close_room=rooms.teardown,
+    has_clients=room_has_clients,
+    last_active=room_last_active,
+    idle_timeout=Config.ROOM_IDLE_TIMEOUT,
+    max_concurrent_shutdowns=Config.ROOM_SHUTDOWN_CONCURRENCY,
+    shutdown_timeout=Config.ROOM_SHUTDOWN_TIMEOUT,
+)
+
+# 节点排空（滚动发布时迁移房间）
+drain_controller = DrainController(
+    rooms,
+    peer_url=Config.DRAIN_PEER_URL,
+    redirect_url=Config.DRAIN_REDIRECT_URL,
+    secret=Config.RESUME_TOKEN_SECRET,
+    admin_token=Config.ADMIN_TOKEN,
+)
+
+
+# 上游代理池（未配置代理时为空，所有连接直连）
+proxy_pool = ProxyPool.from_config(
+    Config.PROXY_LIST,
+    Config.PROXY_FILE,
+    max_active=Config.PROXY_MAX_CONNECTIONS,
+    quarantine_failures=Config.PROXY_QUARANTINE_FAILURES,
+    quarantine_seconds=Config.PROXY_QUARANTINE_SECONDS,
+)
+
+
+# 上游连接凭据池（Cookie 来自环境变量、文件或 gen_ttwid 生成，均未配置时不带 Cookie）
+UPSTREAM_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36 Edg/143.0.0.0"
+credential_pool = CredentialPool.from_config(
+    Config.WSS_COOKIES,
+    Config.WSS_COOKIES_LIST,
+    Config.WSS_COOKIES_FILE,
+    max_active=Config.CREDENTIAL_MAX_CONNECTIONS,
+    quarantine_failures=Config.CREDENTIAL_QUARANTINE_FAILURES,
+    quarantine_seconds=Config.CREDENTIAL_QUARANTINE_SECONDS,
+    generate=Config.CREDENTIAL_GEN_TTWID,
+    user_agent=UPSTREAM_USER_AGENT,
+)
+
+
+def create_crawler() -> DouyinWebSocketCrawler:
+    """创建一条上游连接使用的爬虫实例（从代理池和凭据池分配代理与 Cookie）"""
+    leases = []
+    proxy = None
+    cookie = ""
+    if proxy_pool:
+        lease = proxy_pool.acquire()
+        if lease is not None:
+            leases.append(lease)
+            proxy = lease.value
+        elif not Config.PROXY_DIRECT_FALLBACK:
+            raise PoolExhausted("[ProxyPool] [❌ 没有可用代理] | [全部达到连接上限或处于隔离中]")
+        else:
+            logger.warning("[ProxyPool] [⚠️ 没有可用代理，使用直连]")
+    if credential_pool:
+        lease = credential_pool.acquire()
+        if lease is None:
+            for held in leases:
+                held.release()
+            raise PoolExhausted("[CredentialPool] [❌ 没有可用凭据] | [全部达到连接上限或处于隔离中]")
+        leases.append(lease)
+        cookie = lease.value
+    kwargs = {
+        "headers": {
+            "User-Agent": UPSTREAM_USER_AGENT,
+            "Origin": "https://www.tiktok.com",
+            "Cache-Control": "no-cache",
+            "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
+            "Pragma": "no-cache",
+        },
+        "proxies": proxy_pool.proxies_kwargs(proxy),
+        "timeout": 60,
+        "cookie": cookie,
+        "leases": leases,
+    }
+    # 消息类型由注册表（crawler/registry.py）解析，广播回调由 UpstreamManager 按房间路由
+    return DouyinWebSocketCrawler(kwargs=kwargs)
+
+
+# 上游连接管理（可选多个房间共享一条上游 WebSocket）
+upstream = UpstreamManager(
+    create_crawler,
+    multiplex=Config.UPSTREAM_MULTIPLEX,
+    rooms_per_session=Config.UPSTREAM_ROOMS_PER_SESSION,
+    probe_timeout=Config.UPSTREAM_PROBE_TIMEOUT,
+)
+
+
+def create_message_sinks() -> List[MessageSink]:
+    """按配置创建消息落地目标（可选依赖在启用时才导入）"""
+    sinks: List[MessageSink] = []
+    if Config.PARQUET_SINK_DIR:
+        from sinks.parquet import ParquetSink  # 导入 pyarrow 较慢，只在启用时导入
+
+        try:
+            sinks.append(
+                ParquetSink(
+                    Config.PARQUET_SINK_DIR,
+                    parse_projection_config(Config.PARQUET_COLUMNS),
+                    batch_rows=Config.PARQUET_BATCH_ROWS,
+                    flush_interval=Config.PARQUET_FLUSH_INTERVAL,
+                    max_pending=Config.PARQUET_MAX_PENDING,
+                    compression=Config.PARQUET_COMPRESSION,
+                )
+            )
+        except RuntimeError as e:
+            logger.error(f"[Parquet] [❌ 归档未启用] | [错误: {e}]")
+    if Config.HISTORY_DB_PATH:
+        try:
+            sinks.append(
+                HistoryStore(
+                    Config.HISTORY_DB_PATH,
+                    methods=[m.strip() for m in Config.HISTORY_METHODS.split(",") if m.strip()],
+                    store_data=Config.HISTORY_STORE_DATA,
+                    batch_size=Config.HISTORY_BATCH_SIZE,
+                    flush_interval=Config.HISTORY_FLUSH_INTERVAL,
+                    max_buffer=Config.HISTORY_MAX_BUFFER,
+                    retention=Config.HISTORY_RETENTION_HOURS * 3600,
+                    compact_interval=Config.HISTORY_COMPACT_INTERVAL,
+                )
+            )
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"[History] [❌ 历史库未启用] | [路径: {Config.HISTORY_DB_PATH}] | [错误: {e}]")
+    if Config.WEBHOOK_DESTINATIONS:
+        try:
+            sinks.append(
+                WebhookSink(
+                    parse_destinations(Config.WEBHOOK_DESTINATIONS),
+                    batch_size=Config.WEBHOOK_BATCH_SIZE,
+                    flush_interval=Config.WEBHOOK_FLUSH_INTERVAL,
+                    concurrency=Config.WEBHOOK_CONCURRENCY,
+                    max_inflight=Config.WEBHOOK_DESTINATION_CONCURRENCY,
+                    max_queue=Config.WEBHOOK_MAX_QUEUE,
+                    timeout=Config.WEBHOOK_TIMEOUT,
+                    max_retries=Config.WEBHOOK_MAX_RETRIES,
+                    retry_base=Config.WEBHOOK_RETRY_BASE,
+                    retry_cap=Config.WEBHOOK_RETRY_MAX,
+                    breaker_threshold=Config.WEBHOOK_BREAKER_THRESHOLD,
+                    breaker_reset=Config.WEBHOOK_BREAKER_RESET,
+                    spill_dir=Config.WEBHOOK_SPILL_DIR,
+                    spill_max_bytes=int(Config.WEBHOOK_SPILL_MAX_MB * 1024 * 1024),
+                    secret=Config.WEBHOOK_SECRET,
+                )
+            )
+        except (ValueError, OSError) as e:
+            logger.error(f"[Webhook] [❌ 推送未启用] | [错误: {e}]")
+    return sinks
+
+
+# 解析后消息的落地目标（Parquet 归档、历史库、Webhook 推送），在广播回调中按消息写入缓冲
+message_sinks = create_message_sinks()
+history_store = next((s for s in message_sinks if isinstance(s, HistoryStore)), None)
+
+# 准入控制：房间数 / 客户端数上限与实测负载
+loop_monitor = LoopLagMonitor()
+admission = AdmissionController(
+    rooms,
+    loop_monitor,
+    max_rooms=Config.MAX_ROOMS,
+    max_clients_per_room=Config.MAX_CLIENTS_PER_ROOM,
+    max_total_clients=Config.MAX_TOTAL_CLIENTS,
+    max_loop_lag=Config.MAX_LOOP_LAG,
+    max_decode_backlog=Config.MAX_DECODE_BACKLOG,
+)
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """配置了 ADMIN_TOKEN 时校验管理接口的 X-Admin-Token 请求头"""
+    if Config.ADMIN_TOKEN and x_admin_token != Config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="无效的管理令牌")
 
 
 @app.get("/")
@@ -39,329 +278,641 @@ async def root():
     return {"msg": "Hello, TikHubIO!"}
 
 
-@app.websocket("/ws/{room_id}")
-async def websocket_endpoint(websocket: WebSocket, room_id: str):
-    if not room_id:
-        logger.error("[WebSocket] [❌ 无效参数] | [房间ID为空]")
-        return
+@app.get("/capacity")
+async def capacity():
+    """节点容量与实测负载，供负载均衡和自动扩缩容使用"""
+    return {
+        **admission.snapshot(),
+        "draining": drain_controller.draining,
+        "accepting": not drain_controller.draining and admission.utilization() < 1,
+    }
 
-    await websocket.accept()
 
-    # 发送连接成功消息
+@app.get("/admin/rooms", dependencies=[Depends(require_admin)])
+async def list_rooms():
+    """列出所有房间及客户端数、消息速率、内存占用"""
+    return {**rooms.stats(), "items": [room.to_dict() for room in rooms]}
+
+
+@app.get("/admin/rooms/{room_id}", dependencies=[Depends(require_admin)])
+async def get_room(room_id: str):
+    room = rooms.get(room_id)
+    if room is None:
+        raise HTTPException(status_code=404, detail="房间不存在")
+    return {**room.to_dict(), "latency": room.latency()}
+
+
+@app.get("/rooms/{room_id}/stats")
+async def get_room_stats(room_id: str):
+    """房间实时统计：滚动窗口计数、近似去重用户数、送礼排行"""
+    room = rooms.get(room_id)
+    if room is None or room.analytics is None:
+        raise HTTPException(status_code=404, detail="房间不存在或未启用统计")
+    return {"room_id": room_id, **room.analytics.snapshot()}
+
+
+@app.get("/rooms/{room_id}/state")
+async def get_room_state(room_id: str):
+    """房间当前状态快照（与客户端加入时收到的 room_state 帧相同）"""
+    room = rooms.get(room_id)
+    if room is None or room.state is None:
+        raise HTTPException(status_code=404, detail="房间不存在")
+    return room_state_snapshot(room)
+
+
+@app.get("/admin/upstream", dependencies=[Depends(require_admin)])
+async def upstream_stats():
+    """上游连接及每条连接承载的房间"""
+    return upstream.stats()
+
+
+@app.get("/admin/sinks", dependencies=[Depends(require_admin)])
+async def sink_stats():
+    """消息落地目标的缓冲与写出情况"""
+    return {sink.name: sink.stats() for sink in message_sinks}
+
+
+async def query_history(
+    since: Optional[int], until: Optional[int], minutes: float, limit: int, **filters
+) -> dict:
+    """在线程池中查询历史库，未指定 since 时查询 until（默认当前时间）之前 minutes 分钟"""
+    if history_store is None:
+        raise HTTPException(status_code=404, detail="未启用消息历史库")
+    if since is None:
+        since = (until or int(time.time() * 1000)) - int(minutes * 60000)
+    start = time.perf_counter()
+    items = await asyncio.to_thread(
+        history_store.query, since=since, until=until, limit=max(1, min(limit, 1000)), **filters
+    )
+    return {
+        **filters,
+        "since": since,
+        "until": until,
+        "count": len(items),
+        "took_ms": round((time.perf_counter() - start) * 1000, 2),
+        "items": items,
+    }
+
+
+@app.get("/admin/history/rooms/{room_id}", dependencies=[Depends(require_admin)])
+async def room_history(
+    room_id: str,
+    user_id: Optional[str] = None,
+    method: Optional[str] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    minutes: float = 60,
+    limit: int = 100,
+):
+    """房间消息历史（新的在前），可按用户、消息类型过滤，时间为毫秒时间戳"""
+    return await query_history(
+        since, until, minutes, limit, room_id=room_id, user_id=user_id, method=method
+    )
+
+
+@app.get("/admin/history/users/{user_id}", dependencies=[Depends(require_admin)])
+async def user_history(
+    user_id: str,
+    room_id: Optional[str] = None,
+    method: Optional[str] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    minutes: float = 60,
+    limit: int = 100,
+):
+    """用户在所有房间（或指定房间）的消息历史"""
+    return await query_history(
+        since, until, minutes, limit, room_id=room_id, user_id=user_id, method=method
+    )
+
+
+@app.get("/admin/reconnect", dependencies=[Depends(require_admin)])
+async def reconnect_stats():
+    """上游熔断器状态、正在建立的连接数与连接尝试结果"""
+    return upstream_gate.snapshot()
+
+
+@app.get("/admin/proxies", dependencies=[Depends(require_admin)])
+async def proxy_stats():
+    """代理池成员的负载、评分与隔离状态"""
+    return proxy_pool.stats()
+
+
+@app.get("/admin/credentials", dependencies=[Depends(require_admin)])
+async def credential_stats():
+    """凭据池成员的负载、握手状态码、失败率与隔离状态（只显示脱敏名称）"""
+    return credential_pool.stats()
+
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_report(top: int = 10, sort: str = "max"):
+    """事件循环延迟与慢回调分析报告（sort: max / total / slow）"""
+    return {**loop_monitor.snapshot(), **slow_callbacks.report(top, sort)}
+
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def configure_profile(
+    enabled: Optional[bool] = None, threshold_ms: Optional[float] = None, reset: bool = False
+):
+    """运行时开启 / 关闭慢回调分析，调整阈值或清空统计"""
+    if reset:
+        slow_callbacks.reset()
+    slow_callbacks.configure(
+        enabled=enabled, threshold=threshold_ms / 1000 if threshold_ms is not None else None
+    )
+    return slow_callbacks.report(0)
+
+
+@app.post("/admin/rooms/{room_id}/warm", dependencies=[Depends(require_admin)])
+async def warm_room(room_id: str):
+    """预热房间上游连接（无客户端时也建立），供排空中的节点在迁移前调用"""
+    if drain_controller.draining:
+        raise HTTPException(status_code=503, detail="节点正在排空")
+    room = rooms.get(room_id)
+    if room is not None and room.crawler is not None:
+        return {"room_id": room_id, "status": "running"}
+    reason = admission.check(room_id)
+    if reason is not None:
+        raise HTTPException(status_code=503, detail=REJECT_MESSAGES[reason])
+    room = rooms.ensure(room_id)
+    error = await start_upstream(room)
+    if error is not None:
+        if not room.clients and rooms.get(room_id) is room:
+            rooms.remove(room_id)
+        raise HTTPException(status_code=409, detail=error["error"])
+    return {"room_id": room_id, "status": "warming"}
+
+
+@app.post("/admin/drain", dependencies=[Depends(require_admin)])
+async def drain_node():
+    """进入排空模式：拒绝新加入，通知客户端重连，关闭上游连接"""
+    return await drain_controller.drain(Config.DRAIN_TIMEOUT)
+
+
+async def reject_join(websocket: WebSocket, error: str, redirect: str):
     await websocket.send_text(
-        json.dumps(
+        jsonlib.dumps(
             {
-                "status": "connecting",
-                "message": "连接已建立，正在初始化...",
-                "step": 1,
-                "total_steps": 4,
+                "error": error,
+                "detail": "请重新连接到其它节点",
+                "redirect": redirect or None,
+                "reconnect": True,
             }
         )
     )
+    await websocket.close(code=1013)  # 1013: Try Again Later
 
-    room_connections.setdefault(room_id, set()).add(websocket)
-
-    # 检查是否需要创建新爬虫实例
-    crawler_exists = room_id in room_crawlers
-    crawler_valid = False
 
-    if crawler_exists:
-        crawler = room_crawlers[room_id]
-        crawler_valid = crawler.websocket is not None and not crawler.websocket.closed
+def status_frame(status: str, message: str, step: int) -> str:
+    return jsonlib.dumps(
+        {
+            "status": status,
+            "message": message,
+            "step": step,
+            "total_steps": 4,
+        }
+    )
 
-    if not crawler_exists or not crawler_valid:
-        # 如果之前的爬虫实例已失效，则删除
-        if crawler_exists and not crawler_valid:
-            logger.info(
-                f"[WebSocket] [🔄 重置爬虫] | [房间ID: {room_id}] [之前的连接已关闭]"
-            )
-            del room_crawlers[room_id]
 
-        # 发送爬虫创建消息
-        await websocket.send_text(
-            json.dumps(
-                {
-                    "status": "creating_crawler",
-                    "message": "正在创建直播爬虫实例...",
-                    "step": 2,
-                    "total_steps": 4,
-                }
-            )
-        )
+async def fanout(
+    room: Room,
+    frame: str,
+    trace: Optional[MessageTrace] = None,
+    clients: Optional[Set[Any]] = None,
+    skip: Optional[Set[Any]] = None,
+    seq: Optional[int] = None,
+):
+    """
+    向房间客户端发送已编码的消息
+
+    clients 为空时发送给房间内所有客户端，skip 中的客户端跳过（如已改收聚合帧的客户端）。
+    seq 为消息在房间环形缓冲中的序号，作为流客户端的事件 id；不在缓冲中的帧不传。
+    """
+    targets = list(room.clients if clients is None else clients)
+    if skip:
+        targets = [ws for ws in targets if ws not in skip]
+    if not targets:
+        return
 
-        # 创建新的爬虫实例
-        async def broadcast_callback(data):
-            if not data:
-                return
+    # 创建一个需要移除的连接列表，避免在遍历过程中修改集合
+    disconnected_clients = []
+    ts_clients = room.ts_clients
+    ts_frame = None
 
-            clients = list(room_connections.get(room_id, []))
-            if not clients:
-                return
+    for ws in targets:
+        try:
+            # 更严格地检查WebSocket状态
+            if ws.client_state.name != "CONNECTED" or getattr(
+                ws, "_closed", False
+            ):
+                disconnected_clients.append(ws)
+                continue
+
+            # 使用尝试发送，如果失败则捕获特定异常
+            out = frame
+            if trace is not None:
+                start = time.time()
+                if ws in ts_clients:
+                    if ts_frame is None:
+                        ts_frame = with_envelope(frame, trace.envelope(start))
+                    out = ts_frame
+            if seq is not None and type(ws) is StreamClient:
+                await ws.send_text(out, seq)
+            else:
+                await ws.send_text(out)
+            room.record_send(len(out))
+            if trace is not None:
+                room.observe_delivery(trace, start, time.time())
+        except RuntimeError as e:
+            if "already completed" in str(e) or "was closed" in str(e):
+                logger.warning(f"[Broadcast] [❗ 连接已关闭] | [无法发送消息]")
+                disconnected_clients.append(ws)
+            else:
+                logger.error(f"[Broadcast] [⚠️ 发送消息失败] | [错误: {str(e)}]")
+                disconnected_clients.append(ws)
+        except Exception as e:
+            logger.error(f"[Broadcast] [⚠️ 发送消息失败] | [错误: {str(e)}]")
+            disconnected_clients.append(ws)
 
-            # 创建一个需要移除的连接列表，避免在遍历过程中修改集合
-            disconnected_clients = []
+    # 批量移除断开的连接
+    for ws in disconnected_clients:
+        rooms.leave(room.room_id, ws)
 
-            for ws in clients:
-                try:
-                    # 更严格地检查WebSocket状态
-                    if ws.client_state.name != "CONNECTED" or getattr(
-                        ws, "_closed", False
-                    ):
-                        disconnected_clients.append(ws)
-                        continue
 
-                    # 使用尝试发送，如果失败则捕获特定异常
-                    await ws.send_text(data if isinstance(data, str) else str(data))
-                except RuntimeError as e:
-                    if "already completed" in str(e) or "was closed" in str(e):
-                        logger.warning(f"[Broadcast] [❗ 连接已关闭] | [无法发送消息]")
-                        disconnected_clients.append(ws)
-                    else:
-                        logger.error(f"[Broadcast] [⚠️ 发送消息失败] | [错误: {str(e)}]")
-                        disconnected_clients.append(ws)
-                except Exception as e:
-                    logger.error(f"[Broadcast] [⚠️ 发送消息失败] | [错误: {str(e)}]")
-                    disconnected_clients.append(ws)
-
-            # 批量移除断开的连接
-            for ws in disconnected_clients:
-                if room_id in room_connections and ws in room_connections[room_id]:
-                    room_connections[room_id].discard(ws)
-
-        # 获取必要参数，检查空值
-        await websocket.send_text(
-            json.dumps(
-                {
-                    "status": "getting_token",
-                    "message": "正在获取访问令牌...",
-                    "step": 3,
-                    "total_steps": 4,
-                }
-            )
-        )
+def create_combo_aggregator() -> GiftComboAggregator:
+    return GiftComboAggregator(
+        progress_interval=Config.GIFT_COMBO_PROGRESS_INTERVAL,
+        timeout=Config.GIFT_COMBO_TIMEOUT,
+        max_combos=Config.GIFT_COMBO_MAX,
+    )
 
-        kwargs = {
-            "headers": {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36 Edg/143.0.0.0",
-                "Origin": "https://www.tiktok.com",
-                "Cache-Control": "no-cache",
-                "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
-                "Pragma": "no-cache",
-            },
-            "proxies": {"http://": None, "https://": None},
-            "timeout": 60,
-            "cookie": Config.WSS_COOKIES,
-        }
 
-        # 创建爬虫实例
-        crawler = DouyinWebSocketCrawler(kwargs=kwargs)
+def create_room_analytics() -> RoomAnalytics:
+    return RoomAnalytics(
+        top_n=Config.ANALYTICS_TOP_N, tracked_gifters=Config.ANALYTICS_TRACKED_GIFTERS
+    )
 
-        # 设置消息类型回调字典
-        wss_callbacks = {
-            "WebcastChatMessage": crawler.WebcastChatMessage,
-            # 最后添加广播回调
-            "broadcast": broadcast_callback,
-        }
 
-        # 更新爬虫的回调
-        crawler.callbacks = wss_callbacks
-        crawler.broadcast_callback = broadcast_callback
+def stats_frame(room: Room) -> str:
+    return jsonlib.dumps({"type": "stats", "room_id": room.room_id, **room.analytics.snapshot()})
 
-        room_crawlers[room_id] = crawler
 
-        # 检查直播状态
-        await websocket.send_text(
-            json.dumps(
-                {
-                    "status": "checking_live",
-                    "message": "正在检查直播状态...",
-                    "step": 4,
-                    "total_steps": 4,
-                }
-            )
-        )
+def room_state_snapshot(room: Room) -> dict:
+    """房间当前状态（PK 比分、连麦粉丝票、公告、在线人数）及实时统计"""
+    return {
+        "room_id": room.room_id,
+        **room.state.snapshot(),
+        "stats": room.analytics.snapshot() if room.analytics is not None else None,
+    }
 
-        check_live_alive = await fetch_check_live_alive(room_id=room_id)
 
-        if not check_live_alive:
-            logger.error(f"[WebSocket] [❌ 检查直播状态失败] | [房间ID: {room_id}]")
-            await websocket.send_text(
-                json.dumps(
-                    {
-                        "error": "无法检查直播状态",
-                        "detail": "请确认房间ID正确且主播正在直播中",
-                    }
+async def run_room_timers(interval: float = 0.5):
+    """房间的定时任务：结束超时的连击、下发到期的汇总窗口、推送统计帧"""
+    while True:
+        await asyncio.sleep(interval)
+        now = time.monotonic()
+        for room in rooms:
+            try:
+                analytics = room.analytics
+                if (
+                    analytics is not None
+                    and room.stats_clients
+                    and now - analytics.pushed_at >= Config.ANALYTICS_PUSH_INTERVAL
+                ):
+                    analytics.pushed_at = now
+                    await fanout(room, stats_frame(room), clients=room.stats_clients)
+                if room.combos is not None:
+                    for frame in room.combos.expire():
+                        await fanout(room, frame, clients=room.combo_clients)
+                if room.summaries is not None:
+                    for frame, clients in room.summaries.flush():
+                        await fanout(room, frame, clients=clients)
+            except Exception as e:
+                logger.error(
+                    f"[RoomTimers] [⚠️ 房间定时任务出错] | [房间ID: {room.room_id}] | [错误: {str(e)}]"
                 )
-            )
-            # 主动断开连接
-            await websocket.close()
-            return
 
-        # 安全地检查直播状态
-        live_data = check_live_alive.get("live_room_status", {}).get("data", [])
 
-        if not live_data or not live_data[0].get("alive", False):
-            logger.error(f"[WebSocket] [❌ 房间不在直播状态] | [房间ID: {room_id}]")
-            await websocket.send_text(
-                json.dumps(
-                    {
-                        "error": "房间不在直播状态",
-                        "detail": "请确认房间ID正确且主播正在直播中",
-                    }
+def join_room(
+    room_id: str,
+    client: Any,
+    ts: bool = False,
+    combo: bool = False,
+    stats: bool = False,
+    summary_policies: Optional[list] = None,
+) -> Room:
+    """客户端加入房间，并按订阅选项创建连击聚合 / 窗口汇总"""
+    room = rooms.join(room_id, client, timestamps=ts, combo=combo, stats=stats)
+    if combo and room.combos is None:
+        room.combos = create_combo_aggregator()
+    if summary_policies:
+        if room.summaries is None:
+            room.summaries = RoomSummarizer()
+        room.summaries.subscribe(client, summary_policies)
+    return room
+
+
+async def leave_room(room_id: str, client: Any):
+    """客户端离开房间，房间没有其它客户端时清理爬虫实例"""
+    try:
+        current = rooms.leave(room_id, client)
+        if current is not None:
+            logger.info(f"[WebSocket] [🔌 移除客户端连接] | [房间ID: {room_id}]")
+
+            # 检查房间是否还有其他连接，如果没有，清理爬虫实例
+            if not current.clients and rooms.get(room_id) is current:
+                logger.info(
+                    f"[WebSocket] [🧹 清理资源] | [房间ID: {room_id}] [爬虫实例已移除]"
                 )
-            )
-            # 主动断开连接
-            await websocket.close()
-            return
+                await rooms.teardown(room_id)
+    except Exception as e:
+        logger.error(f"[WebSocket] [⚠️ 清理资源时发生错误] | [错误: {str(e)}]")
 
-        # 构建WebSocket连接参数 (webcast-ws 接口)
-        params = LiveWebcast(room_id=room_id)
 
-        # 发送连接成功消息
-        await websocket.send_text(
-            json.dumps(
-                {
-                    "status": "connected",
-                    "message": "🎉 连接成功！等待接收直播弹幕消息...",
-                    "step": 4,
-                    "total_steps": 4,
-                }
-            )
-        )
+def upstream_running(room: Room) -> bool:
+    return room.crawler is not None and not (room.task is not None and room.task.done())
 
-        # 在参数设置后，创建并跟踪爬虫任务
-        async def run_crawler():
-            max_crawler_retries = 3
-            crawler_retry_count = 0
 
-            while crawler_retry_count < max_crawler_retries:
-                try:
-                    await crawler.fetch_live_danmaku(params)
-                    break  # 如果成功运行，跳出重试循环
+async def restart_upstream(
+    room: Room, notify: Optional[Callable[[str], Awaitable[None]]] = None
+) -> Optional[dict]:
+    """启动房间上游，之前的爬虫实例已失效时先清理"""
+    if room.crawler is not None:
+        logger.info(f"[WebSocket] [🔄 重置爬虫] | [房间ID: {room.room_id}] [之前的连接已关闭]")
+        await rooms.stop_upstream(room)
+    return await start_upstream(room, notify=notify)
 
-                except ConnectionError as e:
-                    crawler_retry_count += 1
 
-                    if "网络问题" in str(e) or "ConnectionResetError" in str(e):
-                        logger.warning(
-                            f"[WebSocket] [🔄 网络连接问题，爬虫重试] | "
-                            f"[房间ID: {room_id}] | [重试次数: {crawler_retry_count}/{max_crawler_retries}] | "
-                            f"[错误: {str(e)}]"
-                        )
+async def start_upstream(
+    room: Room, notify: Optional[Callable[[str], Awaitable[None]]] = None
+) -> Optional[dict]:
+    """
+    为房间创建爬虫、检查直播状态并启动爬虫任务
 
-                        if crawler_retry_count < max_crawler_retries:
-                            # 等待后重试
-                            await asyncio.sleep(5 * crawler_retry_count)
-                            continue
+    Args:
+        room: 目标房间
+        notify: 发送进度消息的回调（加入的客户端），预热时为 None
 
-                    # 达到最大重试次数或其他连接错误
-                    logger.error(
-                        f"[WebSocket] [❌ 爬虫连接失败] | [房间ID: {room_id}] | [错误: {str(e)}]"
-                    )
+    Returns:
+        成功返回 None，直播状态检查失败时返回错误消息字典
+    """
+    room_id = room.room_id
 
-                    # 只向仍然连接的客户端发送错误消息
-                    if room_id in room_connections and room_connections[room_id]:
-                        if "网络问题" in str(e) or "ConnectionResetError" in str(e):
-                            error_message = json.dumps(
-                                {
-                                    "error": "网络连接不稳定",
-                                    "detail": "无法连接到TikTok服务器，请检查网络连接或稍后重试",
-                                    "suggestion": "建议使用更稳定的网络环境或考虑使用代理",
-                                    "reconnect": True,
-                                }
-                            )
-                        else:
-                            error_message = json.dumps(
-                                {
-                                    "error": "直播连接失败",
-                                    "detail": f"连接错误: {str(e)[:200]}",
-                                    "reconnect": True,
-                                }
-                            )
-                        await broadcast_callback(error_message)
-                    break
+    async def report(frame: str):
+        if notify is not None:
+            await notify(frame)
+
+    # 发送爬虫创建消息
+    await report(status_frame("creating_crawler", "正在创建直播爬虫实例...", 2))
+
+    # 重连时保留已有统计和房间状态
+    if Config.ANALYTICS_ENABLED and room.analytics is None:
+        room.analytics = create_room_analytics()
+    if room.state is None:
+        room.state = RoomState()
+
+    # 创建新的爬虫实例
+    async def broadcast_callback(
+        data, trace: Optional[MessageTrace] = None, message: Optional[DecodedMessage] = None
+    ):
+        if not data:
+            return
+        frame = data if isinstance(data, str) else str(data)
+        seq = room.record_message(frame)
+        if trace is not None:
+            room.observe_trace(trace)
+
+        # 连击礼物聚合：聚合客户端不接收逐条礼物消息，改为接收 start / progress / end 帧；
+        # 窗口汇总：汇总客户端不接收逐条进场 / 关注消息，改为由 run_room_timers 按窗口下发
+        combo_frames = None
+        skip = None
+        if message is not None and message.data is not None:
+            if room.analytics is not None:
+                room.analytics.feed(message.method, message.data)
+            if room.state is not None:
+                room.state.apply(message.method, message.data)
+            if message_sinks:
+                received = trace.received if trace is not None else time.time()
+                for sink in message_sinks:
+                    sink.offer(room.room_id, message.method, message.data, received)
+            if room.combos is not None and message.method == "WebcastGiftMessage":
+                skip = room.combo_clients
+                combo_frames = room.combos.feed(message.data)
+            elif room.summaries is not None:
+                skip = room.summaries.feed(message.method, message.data)
+
+        await fanout(room, frame, trace, skip=skip, seq=seq)
+        if combo_frames:
+            for combo_frame in combo_frames:
+                await fanout(room, combo_frame, clients=room.combo_clients)
+
+    # 获取必要参数，检查空值
+    await report(status_frame("getting_token", "正在获取访问令牌...", 3))
+
+    # 创建爬虫实例（上游连接由 UpstreamManager 分配：独占或共享）
+    crawler = upstream.subscribe(room_id)
+    crawler.broadcast_callback = broadcast_callback
+
+    rooms.attach(room, crawler)
+
+    # 检查直播状态
+    await report(status_frame("checking_live", "正在检查直播状态...", 4))
+
+    check_live_alive = await fetch_check_live_alive(room_id=room_id)
+
+    if not check_live_alive:
+        logger.error(f"[WebSocket] [❌ 检查直播状态失败] | [房间ID: {room_id}]")
+        await rooms.stop_upstream(room)
+        return {
+            "error": "无法检查直播状态",
+            "detail": "请确认房间ID正确且主播正在直播中",
+        }
+
+    # 安全地检查直播状态
+    live_data = check_live_alive.get("live_room_status", {}).get("data", [])
+
+    if not live_data or not live_data[0].get("alive", False):
+        logger.error(f"[WebSocket] [❌ 房间不在直播状态] | [房间ID: {room_id}]")
+        await rooms.stop_upstream(room)
+        return {
+            "error": "房间不在直播状态",
+            "detail": "请确认房间ID正确且主播正在直播中",
+        }
+
+    # 构建WebSocket连接参数 (webcast-ws 接口)
+    params = LiveWebcast(room_id=room_id)
 
-                except Exception as e:
-                    crawler_retry_count += 1
-                    logger.error(
-                        f"[WebSocket] [❌ 爬虫任务异常] | [房间ID: {room_id}] | "
-                        f"[重试次数: {crawler_retry_count}/{max_crawler_retries}] | [错误: {str(e)}]"
+    # 在参数设置后，创建并跟踪爬虫任务
+    async def run_crawler():
+        # 重连由统一的 ReconnectPolicy 控制（decorrelated jitter），错误按类型分类
+        backoff = reconnect_policy.new()
+
+        while True:
+            started = time.monotonic()
+            try:
+                await crawler.fetch_live_danmaku(params)
+                break  # 连接正常结束，跳出重连循环
+
+            except Exception as e:
+                if time.monotonic() - started > reconnect_policy.stable_after:
+                    backoff.reset()  # 连接稳定运行过一段时间，重新从最小退避开始
+
+                if isinstance(e, CircuitOpenError):
+                    # 熔断期间不计入重连次数，等到半开后随机错开再试
+                    delay = reconnect_policy.circuit_delay(e.retry_after)
+                elif is_retryable(e):
+                    delay = backoff.next_delay()
+                else:
+                    delay = None
+
+                if delay is not None:
+                    logger.warning(
+                        f"[WebSocket] [🔄 上游连接中断，准备重连] | [房间ID: {room_id}] | "
+                        f"[重试次数: {backoff.attempts}/{reconnect_policy.max_attempts or '不限'}] | "
+                        f"[延迟: {delay:.1f}秒] | [错误: {type(e).__name__}: {str(e)}]"
                     )
+                    await asyncio.sleep(delay)
+                    continue
 
-                    if crawler_retry_count >= max_crawler_retries:
-                        # 只向仍然连接的客户端发送错误消息
-                        if room_id in room_connections and room_connections[room_id]:
-                            error_message = json.dumps(
-                                {
-                                    "error": "直播连接异常",
-                                    "detail": f"连接中断: {str(e)[:200]}",
-                                    "reconnect": True,
-                                }
-                            )
-                            await broadcast_callback(error_message)
-                        break
+                # 不可重试的错误或达到最大重连次数
+                logger.error(
+                    f"[WebSocket] [❌ 爬虫连接失败] | [房间ID: {room_id}] | "
+                    f"[错误: {type(e).__name__}: {str(e)}]"
+                )
 
-                    await asyncio.sleep(3 * crawler_retry_count)
+                # 只向仍然连接的客户端发送错误消息
+                if room.clients:
+                    if isinstance(e, UpstreamNetworkError):
+                        error = {
+                            "error": "网络连接不稳定",
+                            "detail": "无法连接到TikTok服务器，请检查网络连接或稍后重试",
+                            "suggestion": "建议使用更稳定的网络环境或考虑使用代理",
+                            "reconnect": True,
+                        }
+                    elif isinstance(e, ConnectionError):
+                        error = {
+                            "error": "直播连接失败",
+                            "detail": f"连接错误: {str(e)[:200]}",
+                            "reconnect": True,
+                        }
+                    else:
+                        error = {
+                            "error": "直播连接异常",
+                            "detail": f"连接中断: {str(e)[:200]}",
+                            "reconnect": True,
+                        }
+                    await fanout(room, jsonlib.dumps(error))
+                break
 
-            # 清理爬虫实例
-            if room_id in room_crawlers:
-                await room_crawlers[room_id].close()
-                del room_crawlers[room_id]
-            if room_id in crawler_tasks:
-                del crawler_tasks[room_id]
-            if room_id in room_last_active:
-                del room_last_active[room_id]
+        # 清理爬虫实例（仅当仍是当前实例时）
+        if room.crawler is crawler:
+            await rooms.stop_upstream(room)
+            if not room.clients and rooms.get(room_id) is room:
+                rooms.remove(room_id)
 
-        danmaku_task = asyncio.create_task(run_crawler())
-        crawler_tasks[room_id] = danmaku_task
-        room_last_active[room_id] = asyncio.get_event_loop().time()
-    else:
-        # 如果爬虫已存在，直接发送连接成功消息
-        await websocket.send_text(
-            json.dumps(
-                {
-                    "status": "connected",
-                    "message": "🎉 连接成功！直播爬虫已在运行中...",
-                    "step": 4,
-                    "total_steps": 4,
-                }
+    rooms.attach(room, crawler, asyncio.create_task(run_crawler()))
+    room_lifecycle.track(room_id)
+    return None
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus 文本格式的运行指标"""
+    return metrics.render()
+
+
+@app.get("/runtime")
+async def get_runtime():
+    """运行时信息（protobuf 后端、事件循环、JSON 后端）"""
+    return {"protobuf": protobuf_backend(), "server": server_stack()}
+
+
+@app.websocket("/ws/{room_id}")
+async def websocket_endpoint(
+    websocket: WebSocket,
+    room_id: str,
+    resume: Optional[str] = None,
+    ts: bool = False,
+    combo: bool = False,
+    summary: Optional[str] = None,
+    stats: bool = False,
+    state: bool = True,
+):
+    if not room_id:
+        logger.error("[WebSocket] [❌ 无效参数] | [房间ID为空]")
+        return
+
+    await websocket.accept()
+
+    summary_policies = None
+    if summary:
+        try:
+            summary_policies = parse_summary_spec(
+                summary, Config.SUMMARY_WINDOW, Config.SUMMARY_NAMES
             )
-        )
+        except ValueError as e:
+            logger.warning(f"[WebSocket] [❌ 无效参数] | [summary: {summary}] | [错误: {str(e)}]")
+            await websocket.send_text(
+                jsonlib.dumps({"error": "无效的 summary 参数", "detail": str(e), "reconnect": False})
+            )
+            await websocket.close(code=1008)  # 1008: Policy Violation
+            return
+
+    # 排空中或超出容量的节点拒绝新的加入，提示客户端连接其它节点
+    if drain_controller.draining:
+        await reject_join(websocket, "服务节点正在下线", Config.DRAIN_REDIRECT_URL)
+        return
+    reason = admission.check(room_id)
+    if reason is not None:
+        logger.warning(f"[WebSocket] [🚫 拒绝加入] | [房间ID: {room_id}] | [原因: {reason}]")
+        await reject_join(websocket, REJECT_MESSAGES[reason], Config.CAPACITY_REDIRECT_URL)
+        return
+
+    # 发送连接成功消息
+    await websocket.send_text(status_frame("connecting", "连接已建立，正在初始化...", 1))
+
+    room = join_room(room_id, websocket, ts, combo, stats, summary_policies)
 
     # 定义清理函数
     async def cleanup_resources():
         """清理房间资源"""
-        try:
-            if room_id in room_connections and websocket in room_connections[room_id]:
-                room_connections[room_id].remove(websocket)
-                logger.info(f"[WebSocket] [🔌 移除客户端连接] | [房间ID: {room_id}]")
-
-                # 检查房间是否还有其他连接，如果没有，清理爬虫实例
-                if not room_connections[room_id]:
-                    if room_id in room_crawlers:
-                        logger.info(
-                            f"[WebSocket] [🧹 清理资源] | [房间ID: {room_id}] [爬虫实例已移除]"
-                        )
+        await leave_room(room_id, websocket)
 
-                        crawler = room_crawlers[room_id]
-                        await crawler.close()  # 主动关闭WebSocket连接
-
-                        # 取消任务
-                        if room_id in crawler_tasks:
-                            task = crawler_tasks[room_id]
-                            if not task.done() and not task.cancelled():
-                                task.cancel()
-                                try:
-                                    await task
-                                except asyncio.CancelledError:
-                                    pass
-                            del crawler_tasks[room_id]
-
-                        del room_crawlers[room_id]
-                        if room_id in room_last_active:
-                            del room_last_active[room_id]
-        except Exception as e:
-            logger.error(f"[WebSocket] [⚠️ 清理资源时发生错误] | [错误: {str(e)}]")
+    # 检查是否需要创建新爬虫实例（之前的爬虫实例已失效时先删除）
+    if not upstream_running(room):
+        error = await restart_upstream(room, notify=websocket.send_text)
+        if error is not None:
+            await websocket.send_text(jsonlib.dumps(error))
+            # 主动断开连接
+            await websocket.close()
+            await cleanup_resources()
+            return
+
+        # 发送连接成功消息
+        await websocket.send_text(
+            status_frame("connected", "🎉 连接成功！等待接收直播弹幕消息...", 4)
+        )
+    else:
+        # 房间已在运行：先发送当前状态快照，客户端不需要等待新消息或另行请求
+        if state and room.state is not None:
+            await websocket.send_text(
+                jsonlib.dumps({"type": "room_state", **room_state_snapshot(room)})
+            )
+        # 如果爬虫已存在，直接发送连接成功消息
+        await websocket.send_text(
+            status_frame("connected", "🎉 连接成功！直播爬虫已在运行中...", 4)
+        )
+
+    # 续传：补发令牌序号之后缓冲中的消息
+    if resume:
+        token = decode_resume_token(resume, Config.RESUME_TOKEN_SECRET)
+        if token is not None and token["room_id"] == room_id:
+            missed = room.replay_since(token["seq"])
+            logger.info(
+                f"[WebSocket] [⏩ 续传] | [房间ID: {room_id}] | [补发消息: {len(missed)}]"
+            )
+            for frame in missed:
+                await websocket.send_text(frame)
 
     try:
         while True:
@@ -370,7 +921,7 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
 
             try:
                 # 尝试解析JSON消息
-                data = json.loads(message)
+                data = jsonlib.loads(message)
 
                 # 检查是否是关闭消息
                 if data.get("action") == "close" or data.get("type") == "close":
@@ -381,7 +932,7 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
                     # 发送确认关闭消息
                     try:
                         await websocket.send_text(
-                            json.dumps(
+                            jsonlib.dumps(
                                 {
                                     "status": "closing",
                                     "message": "正在关闭连接...",
@@ -408,7 +959,7 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
                     # 处理心跳消息
                     try:
                         await websocket.send_text(
-                            json.dumps(
+                            jsonlib.dumps(
                                 {
                                     "type": "pong",
                                     "timestamp": int(time.time() * 1000),  # 毫秒时间戳
@@ -419,7 +970,7 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
                         # 连接已关闭
                         break
 
-            except json.JSONDecodeError:
+            except jsonlib.JSONDecodeError:
                 # 如果不是JSON格式，记录并继续
                 logger.warning(
                     f"[WebSocket] [⚠️ 收到非JSON消息] | [房间ID: {room_id}] | [消息: {message}]"
@@ -436,43 +987,226 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
         await cleanup_resources()
 
 
-# 定期检查并关闭无活跃连接的爬虫实例
-async def check_inactive_rooms():
-    """定期检查并关闭无活跃连接的房间爬虫"""
-    INACTIVE_TIMEOUT = 300  # 5分钟无活跃连接则关闭
-    CHECK_INTERVAL = 60  # 每分钟检查一次
+def _mux_room_ids(data: dict) -> list:
+    """控制消息中的房间列表：room_id 或 room_ids"""
+    room_ids = data.get("room_ids")
+    if not isinstance(room_ids, list):
+        room_ids = [data.get("room_id")]
+    return list(dict.fromkeys(str(r) for r in room_ids if r))
 
-    while True:
-        await asyncio.sleep(CHECK_INTERVAL)
-        current_time = asyncio.get_event_loop().time()
-        rooms_to_close = []
-
-        # 找出需要关闭的房间
-        for room_id, last_active in room_last_active.items():
-            if current_time - last_active > INACTIVE_TIMEOUT:
-                if room_id not in room_connections or not room_connections[room_id]:
-                    rooms_to_close.append(room_id)
-
-        # 关闭并清理资源
-        for room_id in rooms_to_close:
-            if room_id in room_crawlers:
-                logger.info(
-                    f"[AutoCleanup] [🧹 清理超时资源] | [房间ID: {room_id}] [无活跃连接超过5分钟]"
-                )
-                crawler = room_crawlers[room_id]
-                await crawler.close()  # 主动关闭WebSocket连接
-
-                # 取消任务
-                if room_id in crawler_tasks:
-                    task = crawler_tasks[room_id]
-                    if not task.done() and not task.cancelled():
-                        task.cancel()
-                        try:
-                            await task
-                        except asyncio.CancelledError:
-                            pass
-                    del crawler_tasks[room_id]
-
-                del room_crawlers[room_id]
-                if room_id in room_last_active:
-                    del room_last_active[room_id]
+
+async def mux_subscribe(conn: MuxConnection, room_id: str, options: dict):
+    """多房间连接订阅一个房间（流程同单房间连接，不发送逐步的状态消息）"""
+    channel = None
+    try:
+        # 先于任何等待完成检查和加入，之后的取消订阅由本任务结束时处理
+        error = None
+        summary_policies = None
+        if drain_controller.draining:
+            error = {"error": "服务节点正在下线", "redirect": Config.DRAIN_REDIRECT_URL or None}
+        elif conn.full:
+            error = {"error": "订阅房间数已达上限", "detail": f"最多 {conn.max_rooms} 个"}
+        else:
+            reason = admission.check(room_id)
+            if reason is not None:
+                error = {
+                    "error": REJECT_MESSAGES[reason],
+                    "redirect": Config.CAPACITY_REDIRECT_URL or None,
+                }
+            elif options.get("summary"):
+                try:
+                    summary_policies = parse_summary_spec(
+                        str(options["summary"]), Config.SUMMARY_WINDOW, Config.SUMMARY_NAMES
+                    )
+                except ValueError as e:
+                    error = {"error": "无效的 summary 参数", "detail": str(e)}
+        if error is not None:
+            logger.warning(
+                f"[MuxWebSocket] [🚫 拒绝订阅] | [房间ID: {room_id}] | [原因: {error['error']}]"
+            )
+            await conn.send({"type": "error", "room_id": room_id, **error})
+            return
+
+        channel = conn.open(room_id)
+        room = join_room(
+            room_id,
+            channel,
+            ts=bool(options.get("ts")),
+            combo=bool(options.get("combo")),
+            stats=bool(options.get("stats")),
+            summary_policies=summary_policies,
+        )
+        if not upstream_running(room):
+            error = await restart_upstream(room)
+            if error is not None:
+                await conn.send({"type": "error", "room_id": room_id, **error})
+                await conn.unsubscribe(room_id)
+                return
+        elif options.get("state", True) and room.state is not None:
+            await channel.send_text(jsonlib.dumps({"type": "room_state", **room_state_snapshot(room)}))
+        await conn.send({"type": "subscribed", "room_id": room_id})
+    except Exception as e:
+        logger.error(f"[MuxWebSocket] [⚠️ 订阅失败] | [房间ID: {room_id}] | [错误: {str(e)}]")
+        await conn.send({"type": "error", "room_id": room_id, "error": "订阅失败", "detail": str(e)})
+        await conn.unsubscribe(room_id)
+    finally:
+        conn.pending.pop(room_id, None)
+        # 启动上游期间已取消订阅（或连接已断开）
+        if channel is not None and channel.closed:
+            await leave_room(room_id, channel)
+
+
+@app.websocket("/ws")
+async def mux_websocket_endpoint(websocket: WebSocket):
+    """
+    多房间 WebSocket：一条连接通过控制消息订阅 / 取消订阅多个房间
+
+    房间消息以 {"room_id": ..., "data": <原消息>} 下发，与单房间连接共用同一次扇出。
+    """
+    await websocket.accept()
+    if drain_controller.draining:
+        await reject_join(websocket, "服务节点正在下线", Config.DRAIN_REDIRECT_URL)
+        return
+
+    conn = MuxConnection(websocket, leave_room, max_rooms=Config.MUX_MAX_ROOMS)
+    await conn.send({"type": "ready", "max_rooms": Config.MUX_MAX_ROOMS})
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                data = jsonlib.loads(message)
+            except jsonlib.JSONDecodeError:
+                logger.warning(f"[MuxWebSocket] [⚠️ 收到非JSON消息] | [消息: {message[:200]}]")
+                continue
+            if not isinstance(data, dict):
+                continue
+
+            action = data.get("action") or data.get("type")
+            if action == "subscribe":
+                for room_id in _mux_room_ids(data):
+                    if room_id in conn or room_id in conn.pending:
+                        continue
+                    conn.track(room_id, asyncio.create_task(mux_subscribe(conn, room_id, data)))
+            elif action == "unsubscribe":
+                for room_id in _mux_room_ids(data):
+                    if await conn.unsubscribe(room_id):
+                        await conn.send({"type": "unsubscribed", "room_id": room_id})
+            elif action == "list":
+                await conn.send({"type": "subscriptions", "room_ids": conn.room_ids()})
+            elif action == "ping":
+                await conn.send({"type": "pong", "timestamp": int(time.time() * 1000)})
+            elif action == "close":
+                await conn.send({"status": "closing", "message": "正在关闭连接..."})
+                try:
+                    await websocket.close()
+                except RuntimeError:
+                    pass
+                break
+
+    except WebSocketDisconnect:
+        logger.info(f"[MuxWebSocket] [🔌 客户端主动断开连接] | [订阅房间数: {len(conn.channels)}]")
+
+    except Exception as e:
+        logger.error(f"[MuxWebSocket] [⚠️ 连接异常] | [错误: {str(e)}]")
+
+    finally:
+        await conn.close()
+
+
+async def open_stream(
+    room_id: str,
+    fmt: str,
+    last_event_id: Optional[str],
+    ts: bool,
+    combo: bool,
+    summary: Optional[str],
+    stats: bool,
+    state: bool,
+) -> StreamingResponse:
+    """SSE / NDJSON 流：加入房间扇出，按 Last-Event-ID 续传后持续写出事件"""
+    if drain_controller.draining:
+        raise HTTPException(status_code=503, detail="服务节点正在下线")
+    reason = admission.check(room_id)
+    if reason is not None:
+        raise HTTPException(status_code=503, detail=REJECT_MESSAGES[reason])
+    summary_policies = None
+    if summary:
+        try:
+            summary_policies = parse_summary_spec(
+                summary, Config.SUMMARY_WINDOW, Config.SUMMARY_NAMES
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"无效的 summary 参数: {str(e)}")
+
+    room = rooms.ensure(room_id)
+    client = StreamClient(room, fmt, Config.STREAM_QUEUE_SIZE)
+    join_room(room_id, client, ts, combo, stats, summary_policies)
+    # 加入后立即取续传消息（之间没有等待），之后的消息由扇出写入队列，不丢不重
+    seq = parse_last_event_id(last_event_id)
+    backlog = room.entries_since(seq) if seq is not None else []
+
+    running = upstream_running(room)
+    if not running:
+        error = await restart_upstream(room)
+        if error is not None:
+            await leave_room(room_id, client)
+            raise HTTPException(status_code=409, detail=error["error"])
+    elif state and room.state is not None:
+        # 状态快照放在续传消息之后；不在环形缓冲中，不带事件 id
+        backlog.append(
+            (None, jsonlib.dumps({"type": "room_state", **room_state_snapshot(room)}))
+        )
+
+    async def body():
+        try:
+            async for chunk in client.events(backlog):
+                yield chunk
+        finally:
+            await leave_room(room_id, client)
+
+    logger.info(
+        f"[Stream] [📡 流客户端加入] | [房间ID: {room_id}] | [格式: {fmt}] | [续传: {len(backlog)}]"
+    )
+    media_type = "text/event-stream" if fmt == SSE else "application/x-ndjson"
+    # X-Accel-Buffering 关闭 nginx 的响应缓冲，事件立即到达客户端
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(body(), media_type=media_type, headers=headers)
+
+
+@app.get("/sse/{room_id}")
+async def sse_endpoint(
+    room_id: str,
+    last_event_id: Optional[str] = Header(default=None),
+    since: Optional[str] = None,
+    ts: bool = False,
+    combo: bool = False,
+    summary: Optional[str] = None,
+    stats: bool = False,
+    state: bool = True,
+):
+    """
+    Server-Sent Events：与 /ws/{room_id} 共用房间扇出，事件 id 为房间消息序号
+
+    浏览器 EventSource 重连时自动带 Last-Event-ID 请求头，补发缓冲中之后的消息；
+    首次连接可用 since 参数指定。
+    """
+    return await open_stream(
+        room_id, SSE, last_event_id or since, ts, combo, summary, stats, state
+    )
+
+
+@app.get("/stream/{room_id}")
+async def ndjson_endpoint(
+    room_id: str,
+    last_event_id: Optional[str] = Header(default=None),
+    since: Optional[str] = None,
+    ts: bool = False,
+    combo: bool = False,
+    summary: Optional[str] = None,
+    stats: bool = False,
+    state: bool = True,
+):
+    """NDJSON 分块流：每行 {"id": 序号, "data": 消息}，空行为保活，续传同 /sse/{room_id}"""
+    return await open_stream(
+        room_id, NDJSON, last_event_id or since, ts, combo, summary, stats, state
+    )
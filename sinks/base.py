@@ -0,0 +1,38 @@
+import asyncio
+from typing import Any, Dict
+
+from utils.metrics import metrics
+
+SINK_ROWS = metrics.counter(
+    "sink_rows_total", "落地目标接收 / 写出 / 丢弃的消息数", ["sink", "result"]
+)
+SINK_FLUSH_SECONDS = metrics.histogram("sink_flush_seconds", "落地目标单次写出耗时（秒）", ["sink"])
+
+
+class MessageSink:
+    """
+    解析后消息的落地目标（Parquet、SQLite、Webhook 等）
+
+    offer 在广播回调中同步调用，只把消息放入内存缓冲，不做 I/O；
+    run 为后台任务，按时间间隔写出缓冲；close 在关闭时写出剩余数据。
+    """
+
+    name = "sink"
+
+    def offer(self, room_id: str, method: str, data: Dict[str, Any], ts: float) -> None:
+        raise NotImplementedError
+
+    async def flush(self, force: bool = False) -> None:
+        """写出达到时间条件（force 时为全部）的缓冲"""
+        raise NotImplementedError
+
+    async def run(self, interval: float = 1.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        await self.flush(force=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
@@ -0,0 +1,326 @@
+"""
+消息历史库（SQLite）
+
+每个节点一个本地库文件，保存解析后的消息摘要，回答「某用户在某房间最近说了什么」
+这类查询，不需要翻查滚动日志。
+
+- 写入：广播回调只把行追加到内存缓冲；后台任务按批次在线程池中用单个事务批量插入
+- 索引：(room_id, ts)、(user_id, ts)、(method, ts)
+- 保留：定期删除超过保留时长的行，并增量回收空闲页（auto_vacuum=INCREMENTAL）
+- 查询：独立的只读连接（WAL 模式下与写入互不阻塞），在线程池中执行
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from crawler.registry import as_int
+from log.logger import logger
+from sinks.base import SINK_FLUSH_SECONDS, SINK_ROWS, MessageSink
+from utils import jsonlib
+from utils.metrics import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    room_id TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    user_id TEXT,
+    nickname TEXT,
+    content TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_messages_room_ts ON messages (room_id, ts);
+CREATE INDEX IF NOT EXISTS idx_messages_user_ts ON messages (user_id, ts);
+CREATE INDEX IF NOT EXISTS idx_messages_method_ts ON messages (method, ts);
+"""
+
+_INSERT = (
+    "INSERT INTO messages (room_id, ts, method, user_id, nickname, content, data) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+_COLUMNS = ("id", "room_id", "ts", "method", "user_id", "nickname", "content", "data")
+
+# 每个删除事务的行数上限，避免长事务阻塞批量写入
+_DELETE_CHUNK = 20000
+
+T = TypeVar("T")
+
+Row = Tuple[str, int, str, Optional[str], Optional[str], Optional[str], Optional[str]]
+
+HISTORY_COMPACTED = metrics.counter("history_compacted_rows_total", "历史库按保留时长删除的行数")
+
+
+def message_content(method: str, data: Dict[str, Any]) -> Optional[str]:
+    """消息的可读摘要：弹幕为内容，礼物为「礼物名 x数量」，其它类型为空"""
+    if method == "WebcastChatMessage":
+        return data.get("content")
+    if method == "WebcastGiftMessage":
+        gift = data.get("gift") or {}
+        name = gift.get("name") or gift.get("describe") or str(data.get("gift_id", ""))
+        return f"{name} x{max(1, as_int(data.get('repeat_count')))}"
+    return None
+
+
+def connect(path: str, readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # auto_vacuum 须在建表前设置；WAL 模式下读连接不阻塞写入
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.executescript(SCHEMA)
+    conn.execute("PRAGMA busy_timeout = 5000")
+    return conn
+
+
+class HistoryStore(MessageSink):
+    """
+    消息历史库
+
+    缓冲超过 max_buffer 行（写入跟不上）时丢弃新消息，计入
+    sink_rows_total{sink="history",result="dropped"}，内存有上限。
+    写入与保留清理共用一个写连接，由 asyncio 锁串行化；查询使用单独的只读连接。
+    """
+
+    name = "history"
+
+    def __init__(
+        self,
+        path: str,
+        methods: Sequence[str] = (),
+        store_data: bool = False,
+        batch_size: int = 5000,
+        flush_interval: float = 1.0,
+        max_buffer: int = 100000,
+        retention: float = 72 * 3600,
+        compact_interval: float = 600,
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.methods = frozenset(methods)  # 为空时保存所有类型
+        self.store_data = store_data
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_buffer = max(self.batch_size, max_buffer)
+        self.retention = retention
+        self.compact_interval = compact_interval
+        self._writer = connect(path)
+        self._reader = connect(path, readonly=True)
+        self._read_lock = threading.Lock()
+        self._buffer: List[Row] = []
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._inflight: Optional[asyncio.Future] = None
+        self.written_rows = 0
+        self.dropped_rows = 0
+        self.compacted_rows = 0
+        self.compacted_at: Optional[float] = None
+        metrics.gauge("history_buffered_rows", "历史库缓冲中的行数", func=lambda: len(self._buffer))
+
+    def offer(self, room_id: str, method: str, data: Dict[str, Any], ts: float) -> None:
+        if self.methods and method not in self.methods:
+            return
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped_rows += 1
+            SINK_ROWS.labels(self.name, "dropped").inc()
+            return
+        user = data.get("user") or {}
+        user_id = user.get("id")
+        self._buffer.append(
+            (
+                room_id,
+                int(ts * 1000),
+                method,
+                str(user_id) if user_id is not None else None,
+                user.get("nickname"),
+                message_content(method, data),
+                jsonlib.dumps(data) if self.store_data else None,
+            )
+        )
+        if len(self._buffer) == self.batch_size:
+            self._wake.set()
+
+    async def _run_writer(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        在线程池中执行写连接上的操作（调用方持有 _lock）
+
+        调用方被取消时线程中的操作仍会执行完，取消不会传进线程；记下该操作，
+        close 先等待它完成再写入剩余缓冲并关闭连接。
+        """
+        self._inflight = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        return await asyncio.shield(self._inflight)
+
+    def _insert(self, rows: List[Row]) -> None:
+        with self._writer:
+            self._writer.execute("BEGIN")
+            self._writer.executemany(_INSERT, rows)
+
+    async def flush(self, force: bool = False) -> None:
+        """把缓冲按批次写入（每批一个事务）"""
+        async with self._lock:
+            while self._buffer:
+                rows = self._buffer[: self.batch_size]
+                del self._buffer[: self.batch_size]
+                start = time.perf_counter()
+                try:
+                    await self._run_writer(self._insert, rows)
+                except sqlite3.Error as e:
+                    SINK_ROWS.labels(self.name, "failed").inc(len(rows))
+                    logger.error(f"[History] [❌ 写入失败] | [行数: {len(rows)}] | [错误: {e}]")
+                    continue
+                SINK_FLUSH_SECONDS.labels(self.name).observe(time.perf_counter() - start)
+                SINK_ROWS.labels(self.name, "written").inc(len(rows))
+                self.written_rows += len(rows)
+
+    def _methods(self) -> List[str]:
+        """库中的消息类型（沿 (method, ts) 索引逐个跳到下一个类型，不扫描全表）"""
+        methods: List[str] = []
+        row = self._writer.execute("SELECT MIN(method) FROM messages").fetchone()
+        while row[0] is not None:
+            methods.append(row[0])
+            row = self._writer.execute(
+                "SELECT MIN(method) FROM messages WHERE method > ?", (row[0],)
+            ).fetchone()
+        return methods
+
+    def _delete_chunk(self, method: str, cutoff_ms: int) -> int:
+        """
+        删除一种类型中最多 _DELETE_CHUNK 条过期的行
+
+        按 (method, ts) 索引的范围查找过期行，不依赖 id 与 ts 同序（系统时钟回拨时
+        后写入的行 ts 可能更小）。
+        """
+        with self._writer:
+            self._writer.execute("BEGIN")
+            cursor = self._writer.execute(
+                "DELETE FROM messages WHERE id IN "
+                "(SELECT id FROM messages WHERE method = ? AND ts < ? LIMIT ?)",
+                (method, cutoff_ms, _DELETE_CHUNK),
+            )
+        return cursor.rowcount
+
+    def _vacuum(self) -> None:
+        self._writer.execute("PRAGMA incremental_vacuum")
+        self._writer.execute("PRAGMA optimize")
+
+    async def compact(self) -> int:
+        """删除超过保留时长的行并回收空闲页；分块删除，块之间让出写连接给批量写入"""
+        cutoff_ms = int((time.time() - self.retention) * 1000)
+        async with self._lock:
+            methods = await self._run_writer(self._methods)
+        deleted = 0
+        for method in methods:
+            while True:
+                async with self._lock:
+                    count = await self._run_writer(self._delete_chunk, method, cutoff_ms)
+                deleted += count
+                if count < _DELETE_CHUNK:
+                    break
+        self.compacted_at = time.time()
+        if deleted:
+            async with self._lock:
+                await self._run_writer(self._vacuum)
+            self.compacted_rows += deleted
+            HISTORY_COMPACTED.inc(deleted)
+            logger.info(f"[History] [🧹 清理过期消息] | [行数: {deleted}]")
+        return deleted
+
+    async def run(self, interval: float = 1.0) -> None:
+        """缓冲满一批立即写入，否则每 flush_interval 秒写入一次；定期清理过期消息"""
+        last_compact = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+            if self.retention > 0 and time.monotonic() - last_compact >= self.compact_interval:
+                last_compact = time.monotonic()
+                try:
+                    await self.compact()
+                except sqlite3.Error as e:
+                    logger.error(f"[History] [❌ 清理失败] | [错误: {e}]")
+
+    async def close(self) -> None:
+        # run 被取消时可能仍有写入在线程中执行，等待其完成后才能复用并关闭写连接
+        if self._inflight is not None:
+            await asyncio.gather(self._inflight, return_exceptions=True)
+        await self.flush(force=True)
+        self._writer.close()
+        self._reader.close()
+
+    def _select(self, where: List[str], params: List[Any], limit: int) -> List[Dict[str, Any]]:
+        sql = (
+            f"SELECT {', '.join(_COLUMNS)} FROM messages WHERE {' AND '.join(where)} "
+            "ORDER BY ts DESC LIMIT ?"
+        )
+        with self._read_lock:
+            rows = self._reader.execute(sql, (*params, limit)).fetchall()
+        items = []
+        for row in rows:
+            item = dict(zip(_COLUMNS, row))
+            if item["data"] is None:
+                del item["data"]
+            else:
+                item["data"] = jsonlib.loads(item["data"])
+            items.append(item)
+        return items
+
+    def query(
+        self,
+        room_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        method: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        按房间或用户查询时间范围内的消息（新的在前），since / until 为毫秒时间戳
+
+        房间查询走 (room_id, ts) 索引，用户查询走 (user_id, ts) 索引。
+        在线程池中调用（asyncio.to_thread），不占用事件循环。
+        """
+        where: List[str] = []
+        params: List[Any] = []
+        if room_id is not None:
+            where.append("room_id = ?")
+            params.append(room_id)
+        if user_id is not None:
+            where.append("user_id = ?")
+            params.append(user_id)
+        if method is not None:
+            where.append("method = ?")
+            params.append(method)
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            params.append(until)
+        if room_id is None and user_id is None:
+            raise ValueError("需要指定 room_id 或 user_id")
+        return self._select(where, params, limit)
+
+    def stats(self) -> Dict[str, Any]:
+        files = (self.path, self.path + "-wal")
+        size = sum(os.path.getsize(f) for f in files if os.path.exists(f))
+        return {
+            "path": self.path,
+            "buffered_rows": len(self._buffer),
+            "written_rows": self.written_rows,
+            "dropped_rows": self.dropped_rows,
+            "compacted_rows": self.compacted_rows,
+            "compacted_at": self.compacted_at,
+            "file_bytes": size,
+        }
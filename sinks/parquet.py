@@ -0,0 +1,302 @@
+"""
+Parquet 归档
+
+按 (房间, UTC 日期, 消息类型) 把解析后的消息缓冲为列式批次，达到行数上限或缓冲时长后
+在线程池中写为 Parquet 文件，目录按 Hive 风格分区：
+
+    <PARQUET_SINK_DIR>/room_id=<房间ID>/date=<YYYY-MM-DD>/method=<消息类型>/part-*.parquet
+
+每种消息类型归档的列由配置指定（与 MESSAGE_PROJECTIONS 相同的路径格式），列类型按
+protobuf 字段类型确定，同一分区内所有文件的 schema 一致。pyarrow 为可选依赖，未安装时
+归档不启用。
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from google.protobuf.descriptor import FieldDescriptor
+
+from crawler.registry import MESSAGE_REGISTRY
+from log.logger import logger
+from sinks.base import SINK_FLUSH_SECONDS, SINK_ROWS, MessageSink
+from utils import jsonlib
+from utils.metrics import metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+_FD = FieldDescriptor
+_UNSIGNED_64 = {_FD.TYPE_UINT64, _FD.TYPE_FIXED64}
+_INTEGERS = {
+    _FD.TYPE_INT64,
+    _FD.TYPE_SINT64,
+    _FD.TYPE_SFIXED64,
+    _FD.TYPE_INT32,
+    _FD.TYPE_SINT32,
+    _FD.TYPE_SFIXED32,
+    _FD.TYPE_UINT32,
+    _FD.TYPE_FIXED32,
+}
+_FLOATS = {_FD.TYPE_DOUBLE, _FD.TYPE_FLOAT}
+
+_SECONDS_PER_DAY = 86400
+
+
+def _to_int(value: Any) -> Optional[int]:
+    # MessageToDict 将 64 位整数输出为字符串
+    return None if value is None else int(value)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+def _to_json(value: Any) -> Optional[str]:
+    return None if value is None else jsonlib.dumps(value)
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class Column:
+    """一个归档列：字段路径、Arrow 类型、字段缺失时的默认值与写出时的类型转换"""
+
+    __slots__ = ("name", "parts", "type", "default", "convert")
+
+    def __init__(self, path: str, field: FieldDescriptor):
+        self.name = path.replace(".", "_")
+        self.parts = tuple(path.split("."))
+        # proto3 标量字段为默认值时 MessageToDict 不输出，父消息存在时按默认值补齐
+        self.default: Any = None
+        self.convert: Callable[[Any], Any] = _identity
+        if field.label == _FD.LABEL_REPEATED or field.message_type is not None:
+            # 子消息与重复字段保存为 JSON 字符串
+            self.type = pa.string()
+            self.convert = _to_json
+        elif field.type in _UNSIGNED_64:
+            self.type, self.default, self.convert = pa.uint64(), 0, _to_int
+        elif field.type in _INTEGERS:
+            self.type, self.default, self.convert = pa.int64(), 0, _to_int
+        elif field.type in _FLOATS:
+            self.type, self.default, self.convert = pa.float64(), 0.0, _to_float
+        elif field.type == _FD.TYPE_BOOL:
+            self.type, self.default = pa.bool_(), False
+        else:
+            # 字符串、bytes（base64）与枚举（名称）
+            self.type = pa.string()
+            self.default = ""
+            if field.type == _FD.TYPE_ENUM:
+                zero = field.enum_type.values_by_number.get(0)
+                self.default = zero.name if zero is not None else None
+
+    def extract(self, data: Dict[str, Any]) -> Any:
+        value = data
+        parts = self.parts
+        for part in parts[:-1]:
+            value = value.get(part)
+            if not isinstance(value, dict):
+                return None
+        return value.get(parts[-1], self.default)
+
+
+def compile_columns(descriptor, paths: str) -> List[Column]:
+    """按字段路径（逗号分隔）生成归档列，路径不存在时抛出 ValueError"""
+    columns: List[Column] = []
+    for path in (p.strip() for p in paths.split(",")):
+        if not path:
+            continue
+        desc = descriptor
+        field = None
+        for part in path.split("."):
+            if desc is None:
+                raise ValueError(f"[{descriptor.name}] 标量字段不能有子路径: {path}")
+            field = desc.fields_by_name.get(part)
+            if field is None:
+                raise ValueError(f"[{descriptor.name}] 字段不存在: {path}")
+            desc = field.message_type if field.label != _FD.LABEL_REPEATED else None
+        columns.append(Column(path, field))
+    if not columns:
+        raise ValueError(f"[{descriptor.name}] 归档列为空")
+    return columns
+
+
+class _Batch:
+    """一个分区的缓冲批次：接收时间戳列 + 各归档列"""
+
+    __slots__ = ("room_id", "method", "day", "columns", "ts", "values", "opened")
+
+    def __init__(self, room_id: str, method: str, day: int, columns: List[Column]):
+        self.room_id = room_id
+        self.method = method
+        self.day = day
+        self.columns = columns
+        self.ts: List[float] = []
+        self.values: List[List[Any]] = [[] for _ in columns]
+        self.opened = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+
+class ParquetSink(MessageSink):
+    """
+    Parquet 归档目标
+
+    - offer 只在事件循环中追加列值，不做转换与 I/O
+    - 每个批次最多 batch_rows 行，满后封存等待写出；封存未写出的批次最多 max_pending 个，
+      磁盘跟不上时丢弃新封存的批次（计入 sink_rows_total{result="dropped"}），内存有上限
+    - 写出（类型转换、编码、压缩、落盘）在线程池中串行执行，先写临时文件再改名，
+      读取方不会看到写了一半的文件
+    """
+
+    name = "parquet"
+
+    def __init__(
+        self,
+        root: str,
+        columns: Dict[str, str],
+        batch_rows: int = 50000,
+        flush_interval: float = 60.0,
+        max_pending: int = 8,
+        compression: str = "zstd",
+    ):
+        if pa is None:
+            raise RuntimeError("未安装 pyarrow，无法启用 Parquet 归档")
+        self.root = root
+        self.paths = columns
+        self.batch_rows = max(1, batch_rows)
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self.compression = compression
+        # 列定义在首次收到该类型消息时生成（此时 protobuf 描述符已加载），配置错误的类型为 None
+        self._columns: Dict[str, Optional[List[Column]]] = {}
+        self._batches: Dict[Tuple[str, str, int], _Batch] = {}
+        self._pending: Deque[_Batch] = deque()
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._seq = 0
+        self.written_rows = 0
+        self.written_files = 0
+        self.dropped_rows = 0
+        metrics.gauge("parquet_buffered_rows", "Parquet 归档缓冲中的行数", func=self.buffered_rows)
+
+    def buffered_rows(self) -> int:
+        return sum(len(b) for b in self._batches.values()) + sum(len(b) for b in self._pending)
+
+    def _compile(self, method: str) -> Optional[List[Column]]:
+        try:
+            descriptor = MESSAGE_REGISTRY[method].message_cls.DESCRIPTOR
+            columns = compile_columns(descriptor, self.paths[method])
+        except (KeyError, ValueError) as e:
+            logger.error(f"[Parquet] [⚠️ 归档列配置无效，跳过该类型] | [类型: {method}] | [错误: {e}]")
+            columns = None
+        self._columns[method] = columns
+        return columns
+
+    def offer(self, room_id: str, method: str, data: Dict[str, Any], ts: float) -> None:
+        if method not in self.paths:
+            return
+        columns = self._columns[method] if method in self._columns else self._compile(method)
+        if columns is None:
+            return
+        key = (room_id, method, int(ts // _SECONDS_PER_DAY))
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch(room_id, method, key[2], columns)
+        batch.ts.append(ts)
+        for column, values in zip(columns, batch.values):
+            values.append(column.extract(data))
+        if len(batch.ts) >= self.batch_rows:
+            self._seal(key)
+            self._wake.set()
+
+    def _seal(self, key: Tuple[str, str, int]) -> None:
+        batch = self._batches.pop(key)
+        if len(self._pending) >= self.max_pending:
+            self.dropped_rows += len(batch)
+            SINK_ROWS.labels(self.name, "dropped").inc(len(batch))
+            logger.warning(
+                f"[Parquet] [⚠️ 写出积压，丢弃批次] | [房间ID: {batch.room_id}] | "
+                f"[类型: {batch.method}] | [行数: {len(batch)}]"
+            )
+            return
+        self._pending.append(batch)
+
+    def _partition_dir(self, batch: _Batch) -> str:
+        date = time.strftime("%Y-%m-%d", time.gmtime(batch.day * _SECONDS_PER_DAY))
+        return os.path.join(
+            self.root,
+            f"room_id={quote(batch.room_id, safe='')}",
+            f"date={date}",
+            f"method={batch.method}",
+        )
+
+    def _write(self, batch: _Batch, seq: int) -> str:
+        """在线程池中执行：转换列类型并写出一个 Parquet 文件"""
+        arrays = {"ts": pa.array([int(t * 1000) for t in batch.ts], pa.timestamp("ms", tz="UTC"))}
+        for column, values in zip(batch.columns, batch.values):
+            if column.convert is not _identity:
+                values = [column.convert(v) for v in values]
+            arrays[column.name] = pa.array(values, column.type)
+        directory = self._partition_dir(batch)
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{int(time.time() * 1000)}-{seq:06d}.parquet"
+        # 以 . 开头的临时文件会被 Arrow / Spark 等读取方忽略
+        tmp = os.path.join(directory, f".{name}.tmp")
+        pq.write_table(pa.table(arrays), tmp, compression=self.compression)
+        path = os.path.join(directory, name)
+        os.replace(tmp, path)
+        return path
+
+    async def flush(self, force: bool = False) -> None:
+        """封存到期（force 时为全部）的批次并写出所有已封存的批次"""
+        now = time.monotonic()
+        for key, batch in list(self._batches.items()):
+            if force or now - batch.opened >= self.flush_interval:
+                self._seal(key)
+        async with self._lock:
+            while self._pending:
+                batch = self._pending.popleft()
+                self._seq += 1
+                start = time.perf_counter()
+                try:
+                    await asyncio.to_thread(self._write, batch, self._seq)
+                except Exception as e:
+                    SINK_ROWS.labels(self.name, "failed").inc(len(batch))
+                    logger.error(
+                        f"[Parquet] [❌ 写出失败] | [房间ID: {batch.room_id}] | "
+                        f"[类型: {batch.method}] | [行数: {len(batch)}] | [错误: {e}]"
+                    )
+                    continue
+                SINK_FLUSH_SECONDS.labels(self.name).observe(time.perf_counter() - start)
+                SINK_ROWS.labels(self.name, "written").inc(len(batch))
+                self.written_rows += len(batch)
+                self.written_files += 1
+
+    async def run(self, interval: float = 1.0) -> None:
+        """满批次立即写出，其余批次每 interval 秒检查一次是否到期"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open_batches": len(self._batches),
+            "pending_batches": len(self._pending),
+            "buffered_rows": self.buffered_rows(),
+            "written_rows": self.written_rows,
+            "written_files": self.written_files,
+            "dropped_rows": self.dropped_rows,
+        }
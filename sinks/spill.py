@@ -0,0 +1,115 @@
+import os
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class SpillQueue:
+    """
+    有上限的磁盘溢出队列（每个目标一个目录）
+
+    记录追加写入段文件（每行一条，记录内不能有换行），当前段达到 segment_bytes 后换新段；
+    读取时从最早的段按条数分块读出，段文件在读完且读出的每条记录都确认（ack）之后才删除，
+    进程在确认前退出时，重启后从头重新读取该段（至少一次，可能重复）。
+    总大小（含已读出未确认的段）超过 max_bytes 时拒绝写入，由调用方计为丢弃。
+    所有方法都是阻塞 I/O，在线程池中调用。
+    """
+
+    def __init__(self, directory: str, max_bytes: int, segment_bytes: int = 4 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._segments: List[int] = sorted(
+            int(name[:-4]) for name in os.listdir(directory) if name.endswith(".seg")
+        )
+        self.bytes = sum(os.path.getsize(self._path(seq)) for seq in self._segments)
+        self._next_seq = self._segments[-1] + 1 if self._segments else 1
+        self._file = None
+        self._file_seq: Optional[int] = None
+        self._read_offset = 0  # 最早一段中已读出的字节数
+        self._unacked: Dict[int, int] = {}  # 段号 -> 已读出未确认的记录数
+        self._exhausted: Set[int] = set()  # 已读完、等待确认后删除的段
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:012d}.seg")
+
+    def __len__(self) -> int:
+        """还有未读记录的段数（为 0 时没有可重放的记录）"""
+        return len(self._segments)
+
+    def _close_current(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_seq = None
+
+    def _remove_if_done(self, seq: int) -> None:
+        if seq in self._exhausted and not self._unacked.get(seq):
+            self._exhausted.discard(seq)
+            self._unacked.pop(seq, None)
+            path = self._path(seq)
+            self.bytes -= os.path.getsize(path)
+            os.remove(path)
+
+    def put(self, record: bytes) -> bool:
+        """追加一条记录，超出容量上限时返回 False"""
+        size = len(record) + 1
+        with self._lock:
+            if self.bytes + size > self.max_bytes:
+                return False
+            if self._file is None:
+                seq = self._next_seq
+                self._next_seq += 1
+                self._segments.append(seq)
+                self._file = open(self._path(seq), "ab")
+                self._file_seq = seq
+            self._file.write(record + b"\n")
+            self._file.flush()
+            self.bytes += size
+            if self._file.tell() >= self.segment_bytes:
+                self._close_current()
+            return True
+
+    def take(self, limit: int) -> Tuple[int, List[bytes]]:
+        """
+        从最早的段读出最多 limit 条记录，返回 (段号, 记录)；没有可读记录时记录为空
+
+        读出的每条记录处理完（送达、拒绝或放弃）后须以段号调用 ack。
+        """
+        with self._lock:
+            if not self._segments or limit <= 0:
+                return 0, []
+            seq = self._segments[0]
+            if seq == self._file_seq:
+                # 正在读取的段不再追加，之后的记录写入新段
+                self._close_current()
+            path = self._path(seq)
+            records: List[bytes] = []
+            with open(path, "rb") as f:
+                f.seek(self._read_offset)
+                while len(records) < limit:
+                    line = f.readline()
+                    if not line:
+                        break
+                    if line != b"\n":
+                        records.append(line.rstrip(b"\n"))
+                self._read_offset = f.tell()
+            if self._read_offset >= os.path.getsize(path):
+                self._segments.pop(0)
+                self._read_offset = 0
+                self._exhausted.add(seq)
+            self._unacked[seq] = self._unacked.get(seq, 0) + len(records)
+            self._remove_if_done(seq)
+            return seq, records
+
+    def ack(self, seq: int) -> None:
+        """确认 take 读出的一条记录，段内记录都已确认且段已读完时删除段文件"""
+        with self._lock:
+            if self._unacked.get(seq):
+                self._unacked[seq] -= 1
+            self._remove_if_done(seq)
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_current()
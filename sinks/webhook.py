@@ -0,0 +1,403 @@
+"""
+Webhook 推送
+
+把选定房间、选定类型的消息按目标批量 POST 到合作方的 HTTP 接口，替代为每个房间
+保持一条 /ws 连接的桥接服务。
+
+    POST <url>
+    Content-Type: application/json
+    X-Webhook-Batch-Id: <批次 id，重试与重放时不变，接收方据此去重>
+    X-Webhook-Signature: sha256=<HMAC-SHA256(WEBHOOK_SECRET, body)>   # 配置了密钥时
+
+    {"destination": "partner_a", "batch_id": "...", "events": [
+        {"room_id": "...", "method": "WebcastGiftMessage", "ts": 1792377411973, "data": {...}}
+    ]}
+
+投递语义为至少一次：失败的批次按退避重试，仍失败或目标熔断时写入磁盘溢出队列，
+目标恢复后重放；重放的批次可能晚于新批次到达。
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, FrozenSet, List, Optional, Set, Tuple
+
+import httpx
+
+from log.logger import logger
+from sinks.base import SINK_FLUSH_SECONDS, MessageSink
+from sinks.spill import SpillQueue
+from utils import jsonlib
+from utils.metrics import metrics
+from utils.reconnect import OPEN, CircuitBreaker, ReconnectPolicy
+
+WEBHOOK_BATCHES = metrics.counter(
+    "webhook_batches_total",
+    "Webhook 批次结果（delivered / retried / rejected / spilled / replayed / dropped）",
+    ["destination", "result"],
+)
+WEBHOOK_CIRCUIT_STATE = metrics.gauge(
+    "webhook_circuit_state", "Webhook 目标熔断器状态（0 关闭 / 1 半开 / 2 打开）", ["destination"]
+)
+WEBHOOK_SPILL_BYTES = metrics.gauge(
+    "webhook_spill_bytes", "Webhook 磁盘溢出队列大小（字节）", ["destination"]
+)
+
+# 可重试的响应状态码，其余 4xx 视为目标拒绝该批次（不重试、不计入熔断）
+_RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+Batch = Tuple[str, bytes, Optional[int]]  # (batch_id, body, 重放时来源的溢出段号)
+
+
+class Destination:
+    """一个推送目标：地址、订阅的消息类型与房间、待发送批次与熔断器"""
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        methods: FrozenSet[str],
+        rooms: FrozenSet[str] = frozenset(),
+    ):
+        self.name = name
+        self.url = url
+        self.methods = methods
+        self.rooms = rooms  # 为空时订阅所有房间
+        self.events: List[Dict[str, Any]] = []
+        self.opened = time.monotonic()
+        self.queue: Deque[Batch] = deque()
+        self.inflight = 0
+        self.breaker: Optional[CircuitBreaker] = None
+        self.spill: Optional[SpillQueue] = None
+        self.counts: Dict[str, int] = {}
+
+    def count(self, result: str, n: int = 1) -> None:
+        self.counts[result] = self.counts.get(result, 0) + n
+        WEBHOOK_BATCHES.labels(self.name, result).inc(n)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "methods": sorted(self.methods),
+            "rooms": sorted(self.rooms) or "*",
+            "buffered_events": len(self.events),
+            "queued_batches": len(self.queue),
+            "inflight": self.inflight,
+            "spill_bytes": self.spill.bytes if self.spill is not None else 0,
+            "circuit": self.breaker.snapshot() if self.breaker is not None else None,
+            "batches": dict(self.counts),
+        }
+
+
+def parse_destinations(value: str) -> List[Destination]:
+    """
+    解析推送目标配置
+
+    格式: ``name=url|methods|rooms;name2=...``，methods 与 rooms 以逗号分隔，
+    rooms 为空或 ``*`` 时订阅所有房间，例如
+    ``partner_a=https://a.example.com/hook|WebcastGiftMessage|7514168917980400426``
+    """
+    destinations: List[Destination] = []
+    names: Set[str] = set()
+    for item in (value or "").split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, rest = item.partition("=")
+        parts = rest.split("|")
+        name = name.strip()
+        url = parts[0].strip()
+        if not sep or not name or not url.startswith(("http://", "https://")):
+            raise ValueError(f"无效的 Webhook 目标: {item}")
+        if name in names:
+            raise ValueError(f"Webhook 目标名称重复: {name}")
+        methods, rooms = (
+            frozenset(x.strip() for x in (parts[i] if len(parts) > i else "").split(",") if x.strip())
+            for i in (1, 2)
+        )
+        if not methods:
+            raise ValueError(f"Webhook 目标未指定消息类型: {name}")
+        destinations.append(Destination(name, url, methods, rooms - {"*"}))
+        names.add(name)
+    return destinations
+
+
+class WebhookSink(MessageSink):
+    """
+    Webhook 推送目标
+
+    - offer 只把事件追加到订阅该消息的目标的当前批次
+    - 批次满 batch_size 条或缓冲超过 flush_interval 秒时封存（编码为请求体）
+    - 所有目标共用一个 httpx 连接池，全局并发请求数 concurrency，每个目标同时最多
+      max_inflight 个请求
+    - 可重试的失败（网络错误、超时、408 / 429 / 5xx）按 decorrelated jitter 退避重试，
+      每次失败计入该目标的熔断器；熔断打开或重试用尽时批次写入磁盘溢出队列
+    - 目标较慢（内存中待发送批次达到 max_queue）或熔断时，新封存的批次直接写入溢出队列；
+      目标恢复且内存队列为空时，从溢出队列每次读回最多 max_queue 个批次重放，送达后才从
+      磁盘删除。溢出队列超过上限时丢弃批次
+    """
+
+    name = "webhook"
+
+    def __init__(
+        self,
+        destinations: List[Destination],
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        concurrency: int = 8,
+        max_inflight: int = 2,
+        max_queue: int = 20,
+        timeout: float = 5.0,
+        max_retries: int = 3,
+        retry_base: float = 0.5,
+        retry_cap: float = 10.0,
+        breaker_threshold: int = 5,
+        breaker_reset: float = 30.0,
+        spill_dir: str = "",
+        spill_max_bytes: int = 100 * 1024 * 1024,
+        secret: str = "",
+    ):
+        self.destinations = destinations
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.concurrency = max(1, concurrency)
+        self.max_inflight = max(1, max_inflight)
+        self.max_queue = max(1, max_queue)
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        # 重试次数由 max_retries 控制（ReconnectPolicy 的 max_attempts=0 表示不限制）
+        self.retry_policy = ReconnectPolicy(base=retry_base, cap=retry_cap, max_attempts=0)
+        self.secret = secret.encode()
+        for dest in destinations:
+            dest.breaker = CircuitBreaker(
+                breaker_threshold,
+                breaker_reset,
+                name=f"webhook:{dest.name}",
+                gauge=WEBHOOK_CIRCUIT_STATE.labels(dest.name),
+            )
+            if spill_dir:
+                dest.spill = SpillQueue(os.path.join(spill_dir, dest.name), spill_max_bytes)
+                WEBHOOK_SPILL_BYTES.labels(dest.name).set(dest.spill.bytes)
+        # 按消息类型索引目标，offer 中只遍历订阅了该类型的目标
+        self._by_method: Dict[str, List[Destination]] = {}
+        for dest in destinations:
+            for method in dest.methods:
+                self._by_method.setdefault(method, []).append(dest)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._replaying: Set[str] = set()
+        self._wake = asyncio.Event()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency, max_keepalive_connections=self.concurrency
+                ),
+            )
+        return self._client
+
+    def offer(self, room_id: str, method: str, data: Dict[str, Any], ts: float) -> None:
+        destinations = self._by_method.get(method)
+        if not destinations:
+            return
+        event = None
+        for dest in destinations:
+            if dest.rooms and room_id not in dest.rooms:
+                continue
+            if event is None:
+                event = {"room_id": room_id, "method": method, "ts": int(ts * 1000), "data": data}
+            if not dest.events:
+                dest.opened = time.monotonic()
+            dest.events.append(event)
+            if len(dest.events) == self.batch_size:
+                self._wake.set()
+
+    def _encode(self, dest: Destination) -> Batch:
+        batch_id = uuid.uuid4().hex
+        events, dest.events = dest.events, []
+        body = jsonlib.dumps({"destination": dest.name, "batch_id": batch_id, "events": events})
+        return batch_id, body.encode(), None
+
+    def _spill_sync(self, dest: Destination, batch: Batch) -> bool:
+        batch_id, body, _ = batch
+        if dest.spill is not None and dest.spill.put(batch_id.encode() + b" " + body):
+            WEBHOOK_SPILL_BYTES.labels(dest.name).set(dest.spill.bytes)
+            dest.count("spilled")
+            return True
+        dest.count("dropped")
+        logger.warning(
+            f"[Webhook] [⚠️ 溢出队列不可用或已满，丢弃批次] | [目标: {dest.name}] | [批次: {batch_id}]"
+        )
+        return False
+
+    async def _spill(self, dest: Destination, batch: Batch) -> None:
+        await asyncio.to_thread(self._spill_sync, dest, batch)
+
+    async def _ack(self, dest: Destination, batch: Batch) -> None:
+        """重放的批次送达或被拒绝后确认其溢出段（段内批次都确认后删除段文件）"""
+        if batch[2] is not None:
+            await asyncio.to_thread(dest.spill.ack, batch[2])
+            WEBHOOK_SPILL_BYTES.labels(dest.name).set(dest.spill.bytes)
+
+    async def _enqueue(self, dest: Destination, batch: Batch) -> None:
+        """目标正常时放入内存队列，目标较慢或熔断时写入溢出队列"""
+        if dest.breaker.state != OPEN and len(dest.queue) < self.max_queue:
+            dest.queue.append(batch)
+        else:
+            await self._spill(dest, batch)
+
+    def _sign(self, body: bytes) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.secret:
+            digest = hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+            headers["X-Webhook-Signature"] = f"sha256={digest}"
+        return headers
+
+    async def _post(self, dest: Destination, batch: Batch) -> Tuple[str, Optional[float]]:
+        """发送一次，返回 (ok / retry / reject, 服务端要求的重试等待秒数)"""
+        batch_id, body, _ = batch
+        headers = self._sign(body)
+        headers["X-Webhook-Batch-Id"] = batch_id
+        start = time.perf_counter()
+        try:
+            async with self._semaphore:
+                response = await self.client.post(dest.url, content=body, headers=headers)
+        except httpx.HTTPError as e:
+            logger.warning(f"[Webhook] [⚠️ 请求失败] | [目标: {dest.name}] | [错误: {type(e).__name__}]")
+            return "retry", None
+        SINK_FLUSH_SECONDS.labels(self.name).observe(time.perf_counter() - start)
+        if response.status_code < 300:
+            return "ok", None
+        if response.status_code in _RETRY_STATUS:
+            try:
+                retry_after = float(response.headers.get("Retry-After", ""))
+            except ValueError:
+                retry_after = None
+            return "retry", retry_after
+        logger.warning(
+            f"[Webhook] [⚠️ 目标拒绝批次] | [目标: {dest.name}] | [状态码: {response.status_code}]"
+        )
+        return "reject", None
+
+    async def _deliver(self, dest: Destination, batch: Batch) -> None:
+        backoff = self.retry_policy.new()
+        try:
+            while True:
+                result, retry_after = await self._post(dest, batch)
+                if result != "retry":
+                    # 目标有响应（包括拒绝）即视为可用
+                    dest.breaker.record_success()
+                    dest.count("delivered" if result == "ok" else "rejected")
+                    await self._ack(dest, batch)
+                    return
+                dest.breaker.record_failure()
+                if dest.breaker.state == OPEN or backoff.attempts >= self.max_retries:
+                    if batch[2] is None:
+                        await self._spill(dest, batch)
+                    else:
+                        # 重放的批次仍在溢出段中，放回内存队列，目标恢复后再发送
+                        dest.queue.appendleft(batch)
+                    return
+                delay = backoff.next_delay()
+                dest.count("retried")
+                await asyncio.sleep(min(retry_after, self.retry_policy.cap) if retry_after else delay)
+        except asyncio.CancelledError:
+            # 关闭时未完成的批次放回内存队列，由 close 写入溢出队列，重启后重放
+            dest.queue.appendleft(batch)
+            raise
+        finally:
+            dest.inflight -= 1
+            self._wake.set()
+
+    def _dispatch(self, dest: Destination) -> None:
+        while dest.queue and dest.inflight < self.max_inflight and dest.breaker.allow():
+            dest.inflight += 1
+            task = asyncio.create_task(self._deliver(dest, dest.queue.popleft()))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _replay(self, dest: Destination) -> None:
+        """
+        内存队列为空且未熔断时，从溢出队列读回最多 max_queue 个批次
+
+        读回的批次送达前仍保留在段文件中，进程在此期间退出时重启后再次重放（至少一次）。
+        """
+        self._replaying.add(dest.name)
+        try:
+            seq, records = await asyncio.to_thread(
+                dest.spill.take, self.max_queue - len(dest.queue)
+            )
+            WEBHOOK_SPILL_BYTES.labels(dest.name).set(dest.spill.bytes)
+            for record in records:
+                batch_id, _, body = record.partition(b" ")
+                dest.queue.append((batch_id.decode(), body, seq))
+            if records:
+                dest.count("replayed", len(records))
+                logger.info(f"[Webhook] [🔁 重放溢出批次] | [目标: {dest.name}] | [批次数: {len(records)}]")
+        finally:
+            self._replaying.discard(dest.name)
+
+    async def flush(self, force: bool = False) -> None:
+        """封存满批次与到期（force 时为全部）的批次，并发起发送"""
+        now = time.monotonic()
+        for dest in self.destinations:
+            while dest.events and (
+                force
+                or len(dest.events) >= self.batch_size
+                or now - dest.opened >= self.flush_interval
+            ):
+                # 超过 batch_size 的部分留给下一个批次
+                overflow = dest.events[self.batch_size :]
+                del dest.events[self.batch_size :]
+                batch = self._encode(dest)
+                dest.events = overflow
+                await self._enqueue(dest, batch)
+            # 熔断打开期间不重放；到期后由重放的批次作为半开探测
+            if (
+                not dest.queue
+                and dest.spill is not None
+                and len(dest.spill)
+                and (dest.breaker.state != OPEN or dest.breaker.retry_after() <= 0)
+                and dest.name not in self._replaying
+            ):
+                await self._replay(dest)
+            self._dispatch(dest)
+
+    async def run(self, interval: float = 1.0) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), min(interval, self.flush_interval))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def close(self) -> None:
+        """封存剩余事件并等待进行中的请求（最多 timeout 秒），未发出的批次写入溢出队列"""
+        await self.flush(force=True)
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=self.timeout)
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for dest in self.destinations:
+            while dest.queue:
+                batch = dest.queue.popleft()
+                # 重放的批次仍在溢出段中，重启后从该段重新读取
+                if batch[2] is None:
+                    await self._spill(dest, batch)
+            if dest.spill is not None:
+                dest.spill.close()
+        if self._client is not None:
+            await self._client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {dest.name: dest.stats() for dest in self.destinations}
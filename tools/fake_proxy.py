@@ -0,0 +1,197 @@
+"""
+本地代理替身（HTTP CONNECT 与 SOCKS5 共用一个端口），用于离线测试代理池
+
+用法（在项目根目录执行）:
+    python -m tools.fake_proxy --port 9200                    # 正常转发
+    python -m tools.fake_proxy --port 9201 --delay 0.5        # 每次建立隧道前延迟 0.5 秒
+    python -m tools.fake_proxy --port 9202 --fail-rate 1      # 拒绝所有隧道
+    python -m tools.fake_proxy --selftest                     # 模拟上游 + 三个代理，输出代理池分配结果
+
+配合服务使用时设置 PROXY_LIST=http://127.0.0.1:9200,socks5://127.0.0.1:9201 。
+"""
+
+import argparse
+import asyncio
+import random
+import socket
+import struct
+from typing import Optional, Tuple
+
+
+class FakeProxy:
+    def __init__(self, delay: float = 0.0, fail_rate: float = 0.0):
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.tunnels = 0
+        self.rejected = 0
+
+    async def _read_http_target(self, reader: asyncio.StreamReader, first: bytes) -> Tuple[str, int]:
+        head = first + await reader.readuntil(b"\r\n\r\n")
+        request_line = head.split(b"\r\n", 1)[0].decode()
+        method, target, _ = request_line.split(" ", 2)
+        if method.upper() != "CONNECT":
+            raise ValueError(f"unsupported method {method}")
+        host, _, port = target.rpartition(":")
+        return host.strip("[]"), int(port)
+
+    async def _read_socks5_target(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> Tuple[str, int]:
+        (n_methods,) = await reader.readexactly(1)
+        await reader.readexactly(n_methods)
+        writer.write(b"\x05\x00")  # 无认证
+        _, cmd, _, atyp = await reader.readexactly(4)
+        if cmd != 1:
+            raise ValueError("only CONNECT is supported")
+        if atyp == 1:
+            host = socket.inet_ntoa(await reader.readexactly(4))
+        elif atyp == 3:
+            (length,) = await reader.readexactly(1)
+            host = (await reader.readexactly(length)).decode()
+        elif atyp == 4:
+            host = socket.inet_ntop(socket.AF_INET6, await reader.readexactly(16))
+        else:
+            raise ValueError("bad address type")
+        (port,) = struct.unpack("!H", await reader.readexactly(2))
+        return host, port
+
+    async def handler(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        upstream_writer: Optional[asyncio.StreamWriter] = None
+        try:
+            first = await reader.readexactly(1)
+            socks = first == b"\x05"
+            if socks:
+                host, port = await self._read_socks5_target(reader, writer)
+            else:
+                host, port = await self._read_http_target(reader, first)
+
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if random.random() < self.fail_rate:
+                self.rejected += 1
+                writer.write(
+                    b"\x05\x05\x00\x01\x00\x00\x00\x00\x00\x00"
+                    if socks
+                    else b"HTTP/1.1 502 Bad Gateway\r\n\r\n"
+                )
+                await writer.drain()
+                return
+
+            upstream_reader, upstream_writer = await asyncio.open_connection(host, port)
+            writer.write(
+                b"\x05\x00\x00\x01\x00\x00\x00\x00\x00\x00"
+                if socks
+                else b"HTTP/1.1 200 Connection established\r\n\r\n"
+            )
+            await writer.drain()
+            self.tunnels += 1
+
+            async def pipe(src: asyncio.StreamReader, dst: asyncio.StreamWriter):
+                try:
+                    while data := await src.read(65536):
+                        dst.write(data)
+                        await dst.drain()
+                finally:
+                    dst.close()
+
+            await asyncio.gather(
+                pipe(reader, upstream_writer), pipe(upstream_reader, writer), return_exceptions=True
+            )
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, OSError):
+            pass
+        finally:
+            writer.close()
+            if upstream_writer is not None:
+                upstream_writer.close()
+
+
+async def serve(port: int, delay: float = 0.0, fail_rate: float = 0.0):
+    proxy = FakeProxy(delay, fail_rate)
+    server = await asyncio.start_server(proxy.handler, "127.0.0.1", port)
+    return proxy, server
+
+
+async def selftest(connections: int, max_active: int) -> None:
+    import time
+
+    import websockets_proxy
+
+    from tools.fake_upstream import serve as serve_upstream
+    from utils.proxy_pool import ProxyPool
+
+    _, upstream_server = await serve_upstream(0, multiplex=False, interval=1.0)
+    upstream_port = upstream_server.sockets[0].getsockname()[1]
+    uri = f"ws://127.0.0.1:{upstream_port}/webcast/im/?room_id=1"
+
+    proxies = {}
+    servers = []
+    for scheme, delay, fail_rate in (("http", 0.0, 0.0), ("socks5", 0.3, 0.0), ("http", 0.0, 1.0)):
+        proxy, server = await serve(0, delay, fail_rate)
+        url = f"{scheme}://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        proxies[url] = proxy
+        servers.append(server)
+
+    pool = ProxyPool(max_active=max_active, quarantine_failures=3, quarantine_seconds=60)
+    pool.load(proxies)
+
+    open_sockets = []
+    exhausted = 0
+    for _ in range(connections):
+        lease = pool.acquire()
+        if lease is None:
+            exhausted += 1
+            continue
+        start = time.monotonic()
+        try:
+            ws = await asyncio.wait_for(
+                websockets_proxy.proxy_connect(
+                    uri, proxy=websockets_proxy.Proxy.from_url(lease.value), ping_interval=None
+                ),
+                timeout=5,
+            )
+        except Exception as e:
+            lease.failed(type(e).__name__)
+            lease.release()
+            continue
+        lease.connected(time.monotonic() - start)
+        open_sockets.append((ws, lease))
+
+    stats = pool.stats()
+    print(f"连接尝试 {connections}，已建立 {len(open_sockets)}，无可用代理 {exhausted}")
+    for item in stats["items"]:
+        print(
+            f"  {item['member']:<28} 连接 {item['active']:>2}  失败 {item['failures']}  "
+            f"耗时 {item['latency_ms']}ms  隔离 {item['quarantined_seconds']}s  评分 {item['score']}"
+        )
+
+    for ws, lease in open_sockets:
+        await ws.close()
+        lease.release()
+    for server in servers + [upstream_server]:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地代理替身（HTTP CONNECT / SOCKS5）")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--delay", type=float, default=0.0, help="建立隧道前的延迟（秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="拒绝隧道的比例（0~1）")
+    parser.add_argument("--selftest", action="store_true", help="测试代理池的分配、上限与隔离")
+    parser.add_argument("--connections", type=int, default=20, help="自测连接数")
+    parser.add_argument("--max-active", type=int, default=8, help="自测单代理连接上限")
+    args = parser.parse_args()
+
+    if args.selftest:
+        asyncio.run(selftest(args.connections, args.max_active))
+        return
+
+    async def run_forever():
+        await serve(args.port, args.delay, args.fail_rate)
+        print(f"fake proxy: http://127.0.0.1:{args.port} / socks5://127.0.0.1:{args.port}")
+        await asyncio.Future()
+
+    asyncio.run(run_forever())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+本地模拟的 Webcast 上游（PushFrame 协议），用于在不访问 TikTok 的情况下测试上游连接复用
+
+用法（在项目根目录执行）:
+    python -m tools.fake_upstream --port 9100                 # 每条连接只服务 URL 中的房间
+    python -m tools.fake_upstream --port 9100 --multiplex     # 接受同一连接上的多个进入房间消息
+    python -m tools.fake_upstream --selftest                  # 两种模式下各启动若干房间并输出连接统计
+
+配合服务使用时设置 WEBCAST_WS_URL=ws://127.0.0.1:9100/webcast/im/ 。
+每个已进入的房间每隔 --interval 秒收到一条 ChatMessage，Common.roomId 为该房间。
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+from urllib.parse import parse_qs, urlparse
+
+import websockets
+
+from crawler import protos
+
+
+def _chat_frame(room_id: int, seq: int) -> bytes:
+    chat = protos.ChatMessage()
+    chat.common.roomId = room_id
+    chat.common.createTime = int(time.time() * 1000)
+    chat.common.method = "WebcastChatMessage"
+    chat.user.nickname = f"fake-user-{seq % 7}"
+    chat.content = f"room {room_id} message {seq}"
+    response = protos.Response()
+    response.now = int(time.time() * 1000)
+    msg = response.messages.add()
+    msg.method = "WebcastChatMessage"
+    msg.payload = chat.SerializeToString()
+    frame = protos.PushFrame()
+    frame.payload_encoding = "pb"
+    frame.payload_type = "msg"
+    frame.payload = response.SerializeToString()
+    return frame.SerializeToString()
+
+
+def _enter_room_id(payload: bytes) -> int:
+    # EnterRoom.room_id = 1 (varint)
+    enter = protos.EnterRoom()
+    enter.ParseFromString(payload)
+    return enter.room_id
+
+
+class FakeUpstream:
+    def __init__(self, multiplex: bool, interval: float):
+        self.multiplex = multiplex
+        self.interval = interval
+        self.connections = 0
+        self.rejected_enters = 0
+        self._seq = itertools.count()
+
+    async def handler(self, ws, path: str = "") -> None:
+        path = path or getattr(ws, "path", "")
+        query = parse_qs(urlparse(path).query)
+        url_room = int(query.get("room_id", ["0"])[0])
+        rooms = {url_room}
+        self.connections += 1
+
+        async def push():
+            while True:
+                await asyncio.sleep(self.interval)
+                for room_id in list(rooms):
+                    await ws.send(_chat_frame(room_id, next(self._seq)))
+
+        pusher = asyncio.create_task(push())
+        try:
+            async for raw in ws:
+                frame = protos.PushFrame()
+                frame.ParseFromString(raw)
+                if frame.payload_type == "im_enter_room":
+                    room_id = _enter_room_id(frame.payload)
+                    if self.multiplex or room_id == url_room:
+                        rooms.add(room_id)
+                    else:
+                        self.rejected_enters += 1
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            pusher.cancel()
+            self.connections -= 1
+
+
+async def serve(port: int, multiplex: bool, interval: float):
+    upstream = FakeUpstream(multiplex, interval)
+    server = await websockets.serve(upstream.handler, "127.0.0.1", port)
+    return upstream, server
+
+
+async def selftest(rooms: int, interval: float, probe_timeout: float) -> None:
+    from crawler.upstream import UpstreamManager
+    from crawler.websocket import DouyinWebSocketCrawler
+    from model.tiktok import LiveWebcast
+    from utils.config import Config
+
+    for multiplex in (True, False):
+        upstream, server = await serve(0, multiplex, interval)
+        port = server.sockets[0].getsockname()[1]
+        Config.WEBCAST_WS_URL = f"ws://127.0.0.1:{port}/webcast/im/"
+
+        manager = UpstreamManager(
+            lambda: DouyinWebSocketCrawler(kwargs={"timeout": 5}),
+            multiplex=True,
+            rooms_per_session=rooms,
+            probe_timeout=probe_timeout,
+        )
+        received = {}
+        subs, tasks = [], []
+        for i in range(rooms):
+            room_id = str(1000 + i)
+            received[room_id] = 0
+            sub = manager.subscribe(room_id)
+
+            async def on_message(data, trace=None, message=None, room_id=room_id):
+                received[room_id] += 1
+
+            sub.broadcast_callback = on_message
+            subs.append(sub)
+            tasks.append(asyncio.create_task(sub.fetch_live_danmaku(LiveWebcast(room_id=room_id))))
+            await asyncio.sleep(0.05)
+
+        await asyncio.sleep(probe_timeout + interval * 4)
+        stats = manager.stats()
+        print(
+            f"上游{'接受' if multiplex else '拒绝'}多房间: 房间 {rooms}，上游连接 {upstream.connections}，"
+            f"会话 {stats['sessions']}，结果 {stats['results']}，"
+            f"收到消息的房间 {sum(1 for n in received.values() if n)}/{rooms}"
+        )
+        for sub in subs:
+            await sub.close()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        server.close()
+        await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟 Webcast 上游")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--multiplex", action="store_true", help="接受同一连接上的多个房间")
+    parser.add_argument("--interval", type=float, default=0.5, help="每个房间的推送间隔（秒）")
+    parser.add_argument("--selftest", action="store_true", help="两种模式下测试 UpstreamManager")
+    parser.add_argument("--rooms", type=int, default=5, help="自测房间数")
+    parser.add_argument("--probe-timeout", type=float, default=2, help="自测探测超时（秒）")
+    args = parser.parse_args()
+
+    if args.selftest:
+        asyncio.run(selftest(args.rooms, args.interval, args.probe_timeout))
+        return
+
+    async def run_forever():
+        await serve(args.port, args.multiplex, args.interval)
+        print(f"fake upstream: ws://127.0.0.1:{args.port}/webcast/im/ (multiplex={args.multiplex})")
+        await asyncio.Future()
+
+    asyncio.run(run_forever())
+
+
+if __name__ == "__main__":
+    main()
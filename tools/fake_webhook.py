@@ -0,0 +1,213 @@
+"""
+本地 Webhook 接收端替身，用于离线测试 Webhook 推送（批量、重试、熔断、磁盘溢出与重放）
+
+用法（在项目根目录执行）:
+    python -m tools.fake_webhook --port 9300                  # 正常接收
+    python -m tools.fake_webhook --port 9301 --delay 0.5      # 每个请求延迟 0.5 秒响应
+    python -m tools.fake_webhook --port 9302 --fail-rate 1    # 所有请求返回 503
+    python -m tools.fake_webhook --selftest                   # 三个接收端 + WebhookSink，输出投递结果
+
+配合服务使用时设置 WEBHOOK_DESTINATIONS="local=http://127.0.0.1:9300/hook|WebcastGiftMessage" 。
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+from typing import Dict
+
+
+class FakeReceiver:
+    def __init__(
+        self, delay: float = 0.0, fail_rate: float = 0.0, status: int = 503, secret: str = ""
+    ):
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.status = status
+        self.secret = secret.encode()
+        self.batches: Dict[str, int] = {}  # batch_id -> 事件数
+        self.events: Dict[str, int] = {}  # method -> 事件数（按批次去重）
+        self.requests = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.bad_signatures = 0
+
+    def _accept(self, headers: Dict[str, str], body: bytes) -> int:
+        if self.secret:
+            expected = "sha256=" + hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+            if not hmac.compare_digest(headers.get("x-webhook-signature", ""), expected):
+                self.bad_signatures += 1
+                return 401
+        payload = json.loads(body)
+        batch_id = headers.get("x-webhook-batch-id") or payload["batch_id"]
+        if batch_id in self.batches:
+            self.duplicates += 1
+            return 200
+        self.batches[batch_id] = len(payload["events"])
+        for event in payload["events"]:
+            self.events[event["method"]] = self.events.get(event["method"], 0) + 1
+        return 200
+
+    async def handler(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                if random.random() < self.fail_rate:
+                    self.failed += 1
+                    status = self.status
+                else:
+                    status = self._accept(headers, body)
+                writer.write(
+                    f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: 2\r\n\r\n{{}}".encode()
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @property
+    def received(self) -> int:
+        return sum(self.batches.values())
+
+
+async def serve(port: int, delay: float = 0.0, fail_rate: float = 0.0, secret: str = ""):
+    receiver = FakeReceiver(delay, fail_rate, secret=secret)
+    server = await asyncio.start_server(receiver.handler, "127.0.0.1", port)
+    return receiver, server
+
+
+async def selftest(events: int, rate: float) -> bool:
+    import tempfile
+    import time
+
+    from sinks.webhook import WebhookSink, parse_destinations
+
+    secret = "selftest"
+    receivers = {}
+    servers = []
+    # healthy 正常；slow 每个请求 0.3 秒（内存队列满后溢出到磁盘）；down 先全部失败，之后恢复
+    for name, delay, fail_rate in (("healthy", 0.0, 0.0), ("slow", 0.3, 0.0), ("down", 0.0, 1.0)):
+        receiver, server = await serve(0, delay, fail_rate, secret)
+        receivers[name] = (receiver, server.sockets[0].getsockname()[1])
+        servers.append(server)
+
+    rooms = ["7514168917980400426", "7514168917980400427", "7514168917980400428"]
+    spec = ";".join(
+        [
+            f"healthy=http://127.0.0.1:{receivers['healthy'][1]}/hook|WebcastGiftMessage|*",
+            f"slow=http://127.0.0.1:{receivers['slow'][1]}/hook"
+            f"|WebcastGiftMessage,WebcastChatMessage|{rooms[0]}",
+            f"down=http://127.0.0.1:{receivers['down'][1]}/hook|WebcastGiftMessage",
+        ]
+    )
+    destinations = parse_destinations(spec)
+    expected = {d.name: 0 for d in destinations}
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        sink = WebhookSink(
+            destinations,
+            batch_size=50,
+            flush_interval=0.2,
+            concurrency=4,
+            max_inflight=1,
+            max_queue=2,
+            timeout=2,
+            max_retries=2,
+            retry_base=0.05,
+            retry_cap=0.2,
+            breaker_threshold=3,
+            breaker_reset=2,
+            spill_dir=spill_dir,
+            secret=secret,
+        )
+        task = asyncio.create_task(sink.run(0.1))
+        for i in range(events):
+            room_id = rooms[i % len(rooms)]
+            method = "WebcastGiftMessage" if i % 2 else "WebcastChatMessage"
+            data = {"user": {"id": str(i)}, "gift": {"name": "Rose"}, "repeat_count": "1"}
+            sink.offer(room_id, method, data, time.time())
+            for dest in destinations:
+                if method in dest.methods and (not dest.rooms or room_id in dest.rooms):
+                    expected[dest.name] += 1
+            if i % 100 == 99:
+                await asyncio.sleep(100 / rate)
+        await asyncio.sleep(1)
+
+        print("发送完成后：")
+        for name, stats in sink.stats().items():
+            print(
+                f"  {name:<8} 熔断 {stats['circuit']['state']:<9} "
+                f"溢出 {stats['spill_bytes']:>7} 字节  {stats['batches']}"
+            )
+
+        # down 恢复，等待熔断半开后重放溢出批次
+        receivers["down"][0].fail_rate = 0.0
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if all(receivers[name][0].received >= expected[name] for name in expected):
+                break
+            await asyncio.sleep(0.2)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await sink.close()
+
+        print("恢复后：")
+        ok = True
+        for name, stats in sink.stats().items():
+            receiver = receivers[name][0]
+            passed = receiver.received == expected[name] and not receiver.bad_signatures
+            ok = ok and passed
+            print(
+                f"  {name:<8} 期望 {expected[name]:>5}  收到 {receiver.received:>5}  "
+                f"请求 {receiver.requests:>4}  失败 {receiver.failed:>3}  重复 {receiver.duplicates}  "
+                f"{'✓' if passed else '✗'}  {stats['batches']}"
+            )
+
+    for server in servers:
+        server.close()
+    print("通过" if ok else "失败")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Webhook 接收端替身")
+    parser.add_argument("--port", type=int, default=9300)
+    parser.add_argument("--delay", type=float, default=0.0, help="响应前的延迟（秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="返回 503 的比例（0~1）")
+    parser.add_argument("--secret", default="", help="校验 X-Webhook-Signature 的密钥")
+    parser.add_argument("--selftest", action="store_true", help="测试批量推送、熔断、溢出与重放")
+    parser.add_argument("--events", type=int, default=3000, help="自测事件数")
+    parser.add_argument("--rate", type=float, default=2000, help="自测事件速率（条/秒）")
+    args = parser.parse_args()
+
+    if args.selftest:
+        raise SystemExit(0 if asyncio.run(selftest(args.events, args.rate)) else 1)
+
+    async def run_forever():
+        receiver, _ = await serve(args.port, args.delay, args.fail_rate, args.secret)
+        print(f"fake webhook: http://127.0.0.1:{args.port}/hook")
+        while True:
+            await asyncio.sleep(5)
+            print(f"requests {receiver.requests}  batches {len(receiver.batches)}  events {receiver.events}")
+
+    asyncio.run(run_forever())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from utils.loop_monitor import LoopLagMonitor
+from utils.metrics import metrics
+from utils.room_registry import EGRESS_BYTES, RoomRegistry
+
+ADMISSION_REJECTED = metrics.counter(
+    "admission_rejected_total", "因容量限制被拒绝的加入次数", ["reason"]
+)
+
+# 拒绝原因 -> 返回给客户端的说明
+REJECT_MESSAGES = {
+    "max_rooms": "节点房间数已达上限",
+    "max_total_clients": "节点连接数已达上限",
+    "max_clients_per_room": "房间连接数已达上限",
+    "overloaded": "节点负载过高",
+}
+
+
+class AdmissionController:
+    """
+    准入控制与节点容量
+
+    静态上限：房间数、单房间客户端数、总客户端数（0 表示不限制）；
+    实测负载：事件循环延迟、上游待解码帧数、下行字节速率。
+    负载超限时只拒绝新房间（新房间需要新的上游连接和解码开销），
+    已有房间的加入只受客户端数上限约束。
+    """
+
+    def __init__(
+        self,
+        rooms: RoomRegistry,
+        lag_monitor: LoopLagMonitor,
+        max_rooms: int = 0,
+        max_clients_per_room: int = 0,
+        max_total_clients: int = 0,
+        max_loop_lag: float = 0,
+        max_decode_backlog: int = 0,
+        sample_interval: float = 1.0,
+    ):
+        self.rooms = rooms
+        self.lag_monitor = lag_monitor
+        self.max_rooms = max_rooms
+        self.max_clients_per_room = max_clients_per_room
+        self.max_total_clients = max_total_clients
+        self.max_loop_lag = max_loop_lag
+        self.max_decode_backlog = max_decode_backlog
+        self.sample_interval = sample_interval
+        self.decode_backlog = 0
+        self.egress_bytes_per_sec = 0.0
+        self._last_egress = (time.monotonic(), EGRESS_BYTES.value)
+
+    def _measure_backlog(self) -> int:
+        """所有上游连接中已接收未处理的帧数（多路复用时多个房间共用一个连接，只计一次）"""
+        backlog = 0
+        seen = set()
+        for room in self.rooms:
+            ws = room.crawler.websocket if room.crawler is not None else None
+            messages = getattr(ws, "messages", None)
+            if messages is not None and id(ws) not in seen:
+                seen.add(id(ws))
+                backlog += len(messages)
+        return backlog
+
+    def sample(self) -> None:
+        now = time.monotonic()
+        total = EGRESS_BYTES.value
+        last_time, last_total = self._last_egress
+        if now > last_time:
+            self.egress_bytes_per_sec = (total - last_total) / (now - last_time)
+        self._last_egress = (now, total)
+        self.decode_backlog = self._measure_backlog()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            self.sample()
+
+    def overloaded(self) -> bool:
+        if self.max_loop_lag and self.lag_monitor.lag > self.max_loop_lag:
+            return True
+        if self.max_decode_backlog and self.decode_backlog > self.max_decode_backlog:
+            return True
+        return False
+
+    def check(self, room_id: str) -> Optional[str]:
+        """检查能否加入房间，可以加入返回 None，否则返回拒绝原因"""
+        room = self.rooms.get(room_id)
+        new_room = room is None or room.crawler is None
+        # 尚未启动上游的房间记录已计入房间数，不重复计算
+        other_rooms = len(self.rooms) - (room is not None)
+        reason = None
+        if self.max_total_clients and self.rooms.total_clients >= self.max_total_clients:
+            reason = "max_total_clients"
+        elif (
+            self.max_clients_per_room
+            and room is not None
+            and len(room.clients) >= self.max_clients_per_room
+        ):
+            reason = "max_clients_per_room"
+        elif new_room and self.max_rooms and other_rooms >= self.max_rooms:
+            reason = "max_rooms"
+        elif new_room and self.overloaded():
+            reason = "overloaded"
+        if reason is not None:
+            ADMISSION_REJECTED.labels(reason).inc()
+        return reason
+
+    def utilization(self) -> float:
+        """各项限制中占用比例的最大值，供自动扩缩容使用"""
+        ratios = [0.0]
+        if self.max_rooms:
+            ratios.append(len(self.rooms) / self.max_rooms)
+        if self.max_total_clients:
+            ratios.append(self.rooms.total_clients / self.max_total_clients)
+        if self.max_loop_lag:
+            ratios.append(self.lag_monitor.lag / self.max_loop_lag)
+        if self.max_decode_backlog:
+            ratios.append(self.decode_backlog / self.max_decode_backlog)
+        return max(ratios)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.rooms.stats(),
+            **self.lag_monitor.snapshot(),
+            "decode_backlog": self.decode_backlog,
+            "egress_bytes_per_sec": round(self.egress_bytes_per_sec, 1),
+            "utilization": round(self.utilization(), 4),
+            "overloaded": self.overloaded(),
+            "limits": {
+                "max_rooms": self.max_rooms,
+                "max_clients_per_room": self.max_clients_per_room,
+                "max_total_clients": self.max_total_clients,
+                "max_loop_lag_ms": self.max_loop_lag * 1000,
+                "max_decode_backlog": self.max_decode_backlog,
+            },
+        }
@@ -2,24 +2,40 @@ import traceback
 from typing import Any, Dict, Optional
 
 import httpx
-from tikhub import Client
 
 from log.logger import logger
 
 from .config import Config
+from .loop_monitor import profiled
 
-# 创建tikhub客户端
-tikhub_client = Client(
-    base_url=Config.TIKHUB_BASE_URL,
-    api_key=Config.TIKHUB_API_KEY,
-    proxy=None,
-    max_retries=Config.MAX_RETRIES,
-    max_connections=50,
-    timeout=Config.HTTP_TIMEOUT,
-    max_tasks=50,
-)
+_tikhub_client = None
 
-TikTokWeb = tikhub_client.TikTokWeb
+
+def get_tikhub_client():
+    """首次使用时才导入 tikhub SDK 并创建客户端，避免拖慢进程启动"""
+    global _tikhub_client
+    if _tikhub_client is None:
+        from tikhub import Client
+
+        _tikhub_client = Client(
+            base_url=Config.TIKHUB_BASE_URL,
+            api_key=Config.TIKHUB_API_KEY,
+            proxy=None,
+            max_retries=Config.MAX_RETRIES,
+            max_connections=50,
+            timeout=Config.HTTP_TIMEOUT,
+            max_tasks=50,
+        )
+    return _tikhub_client
+
+
+def __getattr__(name: str):
+    # 兼容原有的模块属性 tikhub_client / TikTokWeb
+    if name == "tikhub_client":
+        return get_tikhub_client()
+    if name == "TikTokWeb":
+        return get_tikhub_client().TikTokWeb
+    raise AttributeError(name)
 
 
 # 创建HTTP客户端类
@@ -27,6 +43,7 @@ class APIClient:
     """统一API调用客户端"""
 
     @classmethod
+    @profiled("APIClient.get")
     async def get(
         cls, endpoint: str, params: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
@@ -48,6 +65,7 @@ class APIClient:
             return {"code": 500, "message": str(e), "data": None}
 
     @classmethod
+    @profiled("APIClient.post")
     async def post(
         cls, endpoint: str, data: Any = None, json_data: Any = None
     ) -> Dict[str, Any]:
@@ -14,6 +14,8 @@ class Config:
     TIKHUB_API_KEY = os.getenv("TIKHUB_API_KEY")
     TIKHUB_BASE_URL = os.getenv("TIKHUB_BASE_URL", "")
     WSS_COOKIES = os.getenv("WSS_COOKIES", "")
+    WSS_COOKIES_LIST = os.getenv("WSS_COOKIES_LIST", "")  # 多组 Cookie，以 || 分隔
+    WSS_COOKIES_FILE = os.getenv("WSS_COOKIES_FILE", "")  # 每行一组 Cookie
 
     # HTTP客户端配置
     HTTP_TIMEOUT = 60
@@ -21,6 +23,137 @@ class Config:
 
     # WebSocket配置
     WS_TIMEOUT = 20
+    WEBCAST_WS_URL = os.getenv(
+        "WEBCAST_WS_URL",
+        "wss://webcast-ws.tiktok.com/webcast/im/ws_proxy/ws_reuse_supplement/",
+    )  # 上游弹幕 WebSocket 地址（可指向 tools/fake_upstream.py 做本地测试）
+    # 单帧解压后的最大字节数，防止解压炸弹
+    MAX_DECOMPRESSED_BYTES = int(os.getenv("MAX_DECOMPRESSED_BYTES", 8 * 1024 * 1024))
+
+    # 房间生命周期配置
+    ROOM_IDLE_TIMEOUT = float(os.getenv("ROOM_IDLE_TIMEOUT", 300))  # 无活动且无客户端多久后关闭（秒）
+    ROOM_SHUTDOWN_CONCURRENCY = int(os.getenv("ROOM_SHUTDOWN_CONCURRENCY", 16))  # 并发关闭房间数上限
+    ROOM_SHUTDOWN_TIMEOUT = float(os.getenv("ROOM_SHUTDOWN_TIMEOUT", 10))  # 单个房间关闭超时（秒）
+    ROOM_RING_BUFFER_SIZE = int(os.getenv("ROOM_RING_BUFFER_SIZE", 200))  # 每个房间缓存的最近消息数
+
+    # 上游连接复用：多个房间共享一条上游 WebSocket（上游拒绝时自动回退为每房间一条）
+    UPSTREAM_MULTIPLEX = os.getenv("UPSTREAM_MULTIPLEX", "").lower() in ("1", "true", "yes")
+    UPSTREAM_ROOMS_PER_SESSION = int(os.getenv("UPSTREAM_ROOMS_PER_SESSION", 20))  # 每条共享连接的房间数上限
+    UPSTREAM_PROBE_TIMEOUT = float(os.getenv("UPSTREAM_PROBE_TIMEOUT", 15))  # 加入共享连接后等待首条消息的时间（秒）
+
+    # 上游重连策略（decorrelated jitter 退避）、进程级熔断器与并发连接限制
+    RECONNECT_BASE_DELAY = float(os.getenv("RECONNECT_BASE_DELAY", 1))  # 最小退避（秒）
+    RECONNECT_MAX_DELAY = float(os.getenv("RECONNECT_MAX_DELAY", 60))  # 最大退避（秒）
+    RECONNECT_MAX_ATTEMPTS = int(os.getenv("RECONNECT_MAX_ATTEMPTS", 8))  # 单个房间连续重连次数上限（0 表示不限制）
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 10))  # 连续多少次上游连接失败后熔断
+    BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", 30))  # 熔断后多久放行探测连接（秒）
+    UPSTREAM_CONNECT_CONCURRENCY = int(os.getenv("UPSTREAM_CONNECT_CONCURRENCY", 10))  # 同时建立的上游连接数上限（0 表示不限制）
+
+    # 上游代理池（逗号或换行分隔，支持 http:// 与 socks5://，为空时直连）
+    PROXY_LIST = os.getenv("PROXY_LIST", "")
+    PROXY_FILE = os.getenv("PROXY_FILE", "")  # 每行一个代理地址
+    PROXY_MAX_CONNECTIONS = int(os.getenv("PROXY_MAX_CONNECTIONS", 50))  # 单个代理的上游连接数上限（0 表示不限制）
+    PROXY_QUARANTINE_FAILURES = int(os.getenv("PROXY_QUARANTINE_FAILURES", 3))  # 连续失败多少次后隔离
+    PROXY_QUARANTINE_SECONDS = float(os.getenv("PROXY_QUARANTINE_SECONDS", 60))  # 首次隔离时长（秒），再次隔离翻倍
+    PROXY_DIRECT_FALLBACK = os.getenv("PROXY_DIRECT_FALLBACK", "").lower() in ("1", "true", "yes")  # 无可用代理时直连
+
+    # 上游凭据池（WSS_COOKIES / WSS_COOKIES_LIST / WSS_COOKIES_FILE，另可自动生成 ttwid）
+    CREDENTIAL_GEN_TTWID = int(os.getenv("CREDENTIAL_GEN_TTWID", 0))  # 通过 gen_ttwid 生成并维持的凭据数
+    CREDENTIAL_MAX_CONNECTIONS = int(os.getenv("CREDENTIAL_MAX_CONNECTIONS", 0))  # 单个凭据的上游连接数上限（默认 0 不限制）
+    CREDENTIAL_QUARANTINE_FAILURES = int(os.getenv("CREDENTIAL_QUARANTINE_FAILURES", 3))  # 连续 401/403/429 多少次后隔离
+    CREDENTIAL_QUARANTINE_SECONDS = float(os.getenv("CREDENTIAL_QUARANTINE_SECONDS", 300))  # 首次隔离时长（秒），再次隔离翻倍
+
+    # 排空 / 迁移配置
+    DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", 15))  # 排空截止时间（秒）
+    DRAIN_PEER_URL = os.getenv("DRAIN_PEER_URL", "")  # 排空时预热房间的对端节点 HTTP 地址
+    DRAIN_REDIRECT_URL = os.getenv("DRAIN_REDIRECT_URL", "")  # 提示客户端重连的地址
+    RESUME_TOKEN_SECRET = os.getenv("RESUME_TOKEN_SECRET", "")  # 续传令牌签名密钥
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # 管理接口令牌（X-Admin-Token，所有 /admin/* 接口）
+
+    # 准入控制 / 节点容量（0 表示不限制）
+    MAX_ROOMS = int(os.getenv("MAX_ROOMS", 0))  # 节点最大房间数
+    MAX_CLIENTS_PER_ROOM = int(os.getenv("MAX_CLIENTS_PER_ROOM", 0))  # 单房间最大客户端数
+    MAX_TOTAL_CLIENTS = int(os.getenv("MAX_TOTAL_CLIENTS", 0))  # 节点最大客户端数
+    MAX_LOOP_LAG = float(os.getenv("MAX_LOOP_LAG", 0.5))  # 事件循环延迟超过该值（秒）时拒绝新房间
+    MAX_DECODE_BACKLOG = int(os.getenv("MAX_DECODE_BACKLOG", 0))  # 上游待解码帧数超过该值时拒绝新房间
+    CAPACITY_REDIRECT_URL = os.getenv("CAPACITY_REDIRECT_URL", DRAIN_REDIRECT_URL)  # 拒绝时提示的重连地址
+
+    # 消息端到端延迟追踪（按房间、按阶段的直方图）
+    LATENCY_TRACING = os.getenv("LATENCY_TRACING", "true").lower() in ("1", "true", "yes")
+
+    # 慢回调分析（默认关闭，也可通过 POST /admin/profile 运行时开启）
+    PROFILE_SLOW_CALLBACKS = os.getenv("PROFILE_SLOW_CALLBACKS", "").lower() in ("1", "true", "yes")
+    SLOW_CALLBACK_THRESHOLD = float(os.getenv("SLOW_CALLBACK_THRESHOLD", 0.05))  # 慢回调阈值（秒）
+
+    # 连击礼物聚合（客户端以 ?combo=true 订阅）
+    GIFT_COMBO_PROGRESS_INTERVAL = float(os.getenv("GIFT_COMBO_PROGRESS_INTERVAL", 1))  # 进行中连击的进度帧最小间隔（秒）
+    GIFT_COMBO_TIMEOUT = float(os.getenv("GIFT_COMBO_TIMEOUT", 10))  # 连击超过该时间没有更新视为结束（秒）
+    GIFT_COMBO_MAX = int(os.getenv("GIFT_COMBO_MAX", 1000))  # 每个房间同时跟踪的连击数上限
+
+    # 进场 / 关注消息窗口汇总（客户端以 ?summary=member:2,social:5 订阅，未指定时使用以下默认值）
+    SUMMARY_WINDOW = float(os.getenv("SUMMARY_WINDOW", 2))  # 汇总窗口长度（秒）
+    SUMMARY_NAMES = int(os.getenv("SUMMARY_NAMES", 5))  # 每个汇总帧携带的用户数
+
+    # 房间实时统计（/rooms/{room_id}/stats，客户端以 ?stats=true 订阅定期推送）
+    ANALYTICS_ENABLED = os.getenv("ANALYTICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    ANALYTICS_PUSH_INTERVAL = float(os.getenv("ANALYTICS_PUSH_INTERVAL", 5))  # 统计帧推送间隔（秒）
+    ANALYTICS_TOP_N = int(os.getenv("ANALYTICS_TOP_N", 10))  # 送礼排行返回的用户数
+    ANALYTICS_TRACKED_GIFTERS = int(os.getenv("ANALYTICS_TRACKED_GIFTERS", 200))  # 送礼排行跟踪的用户数上限
+
+    # 多房间 WebSocket（/ws）
+    MUX_MAX_ROOMS = int(os.getenv("MUX_MAX_ROOMS", 500))  # 每条连接最多订阅的房间数（0 表示不限制）
+
+    # SSE / NDJSON 流（/sse/{room_id}、/stream/{room_id}）
+    STREAM_KEEPALIVE = float(os.getenv("STREAM_KEEPALIVE", 15))  # 空闲保活间隔（秒）
+    STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", 1000))  # 每个客户端的发送队列上限，满时断开
+
+    # Parquet 归档（需安装 pyarrow，目录为空时不启用）
+    PARQUET_SINK_DIR = os.getenv("PARQUET_SINK_DIR", "")
+    # 每种消息类型归档的列，格式同 MESSAGE_PROJECTIONS
+    PARQUET_COLUMNS = os.getenv(
+        "PARQUET_COLUMNS",
+        "WebcastChatMessage=common.msgId,user.id,user.nickname,content;"
+        "WebcastGiftMessage=common.msgId,user.id,user.nickname,gift_id,gift.name,gift.diamond_count,repeat_count,repeat_end,group_id;"
+        "WebcastMemberMessage=common.msgId,user.id,user.nickname,member_count;"
+        "WebcastSocialMessage=common.msgId,user.id,user.nickname,action,follow_count",
+    )
+    PARQUET_BATCH_ROWS = int(os.getenv("PARQUET_BATCH_ROWS", 50000))  # 每个批次的行数上限，满后立即写出
+    PARQUET_FLUSH_INTERVAL = float(os.getenv("PARQUET_FLUSH_INTERVAL", 60))  # 未满的批次最长缓冲时间（秒）
+    PARQUET_MAX_PENDING = int(os.getenv("PARQUET_MAX_PENDING", 8))  # 等待写出的批次上限，超出时丢弃
+    PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")  # snappy / zstd / gzip / none
+
+    # 消息历史库（SQLite，/admin/history/*，路径为空时不启用）
+    HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "")
+    HISTORY_METHODS = os.getenv(
+        "HISTORY_METHODS", "WebcastChatMessage,WebcastGiftMessage,WebcastSocialMessage"
+    )  # 保存的消息类型（逗号分隔，为空时保存所有类型）
+    HISTORY_STORE_DATA = os.getenv("HISTORY_STORE_DATA", "").lower() in ("1", "true", "yes")  # 同时保存完整消息 JSON
+    HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", 5000))  # 每个写入事务的行数
+    HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", 1))  # 缓冲写入间隔（秒）
+    HISTORY_MAX_BUFFER = int(os.getenv("HISTORY_MAX_BUFFER", 100000))  # 缓冲行数上限，超出时丢弃
+    HISTORY_RETENTION_HOURS = float(os.getenv("HISTORY_RETENTION_HOURS", 72))  # 保留时长（小时，0 表示不清理）
+    HISTORY_COMPACT_INTERVAL = float(os.getenv("HISTORY_COMPACT_INTERVAL", 600))  # 清理过期消息的间隔（秒）
+
+    # Webhook 推送，格式: name=url|methods|rooms;name2=...（rooms 为空或 * 表示所有房间，为空时不启用）
+    WEBHOOK_DESTINATIONS = os.getenv("WEBHOOK_DESTINATIONS", "")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # 请求体 HMAC-SHA256 签名密钥（X-Webhook-Signature）
+    WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", 100))  # 每个请求的事件数上限
+    WEBHOOK_FLUSH_INTERVAL = float(os.getenv("WEBHOOK_FLUSH_INTERVAL", 1))  # 未满批次的最长缓冲时间（秒）
+    WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", 8))  # 所有目标共用的并发请求数（连接池大小）
+    WEBHOOK_DESTINATION_CONCURRENCY = int(os.getenv("WEBHOOK_DESTINATION_CONCURRENCY", 2))  # 每个目标的并发请求数
+    WEBHOOK_MAX_QUEUE = int(os.getenv("WEBHOOK_MAX_QUEUE", 20))  # 每个目标内存中待发送的批次上限，超出时溢出到磁盘
+    WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", 5))  # 单次请求超时（秒）
+    WEBHOOK_MAX_RETRIES = int(os.getenv("WEBHOOK_MAX_RETRIES", 3))  # 单个批次的重试次数
+    WEBHOOK_RETRY_BASE = float(os.getenv("WEBHOOK_RETRY_BASE", 0.5))  # 最小重试退避（秒）
+    WEBHOOK_RETRY_MAX = float(os.getenv("WEBHOOK_RETRY_MAX", 10))  # 最大重试退避（秒）
+    WEBHOOK_BREAKER_THRESHOLD = int(os.getenv("WEBHOOK_BREAKER_THRESHOLD", 5))  # 连续多少次失败后熔断该目标
+    WEBHOOK_BREAKER_RESET = float(os.getenv("WEBHOOK_BREAKER_RESET", 30))  # 熔断后多久放行探测请求（秒）
+    WEBHOOK_SPILL_DIR = os.getenv("WEBHOOK_SPILL_DIR", "")  # 磁盘溢出队列目录（为空时无法投递的批次直接丢弃）
+    WEBHOOK_SPILL_MAX_MB = float(os.getenv("WEBHOOK_SPILL_MAX_MB", 100))  # 每个目标溢出队列的大小上限（MB）
+
+    # 消息字段投影，格式: Method=path1,path2;Method2=path3
+    # 例如 WebcastChatMessage=user.nickname,user.id,content
+    MESSAGE_PROJECTIONS = os.getenv("MESSAGE_PROJECTIONS", "")
 
     @classmethod
     def validate(cls):
@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from log.logger import logger
+from utils.pool import ScoredPool
+from utils.token import gen_ttwid
+
+# 归咎于凭据本身的握手状态码（其它失败通常是网络或代理问题）
+CREDENTIAL_STATUS_CODES = frozenset({401, 403, 429})
+
+
+def credential_key(cookie: str, source: str) -> str:
+    """凭据的脱敏名称：来源 + Cookie 摘要"""
+    return f"{source}-{hashlib.sha1(cookie.encode()).hexdigest()[:8]}"
+
+
+def parse_cookie_list(text: str) -> List[str]:
+    """解析 || 或换行分隔的 Cookie 列表，忽略空行和 # 开头的注释行"""
+    cookies = []
+    for line in text.replace("||", "\n").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            cookies.append(line)
+    return cookies
+
+
+class CredentialPool(ScoredPool):
+    """
+    上游连接凭据（Cookie）池
+
+    凭据来源：WSS_COOKIES / WSS_COOKIES_LIST 环境变量、WSS_COOKIES_FILE 文件，
+    以及通过 gen_ttwid 生成的 ttwid Cookie。新房间分配给负载最低、握手失败最少的凭据；
+    只有 401 / 403 / 429 握手状态码计入凭据失败，连续失败的凭据被隔离。
+    生成的凭据被隔离达 retire_after 次后移出池并补充新的 ttwid。
+    """
+
+    name = "credential"
+
+    def __init__(
+        self,
+        max_active: int = 0,
+        quarantine_failures: int = 3,
+        quarantine_seconds: float = 60,
+        generate: int = 0,
+        user_agent: Optional[str] = None,
+        retire_after: int = 2,
+    ):
+        super().__init__(max_active, quarantine_failures, quarantine_seconds)
+        self.generate = generate
+        self.user_agent = user_agent
+        self.retire_after = retire_after
+
+    def counts_failure(self, reason: str, status: Optional[int]) -> bool:
+        return status in CREDENTIAL_STATUS_CODES
+
+    def load(self, cookies: Iterable[str], source: str) -> None:
+        for cookie in cookies:
+            self.add(credential_key(cookie, source), cookie)
+
+    @classmethod
+    def from_config(
+        cls,
+        cookie: str = "",
+        cookie_list: str = "",
+        cookie_file: str = "",
+        **kwargs,
+    ) -> "CredentialPool":
+        pool = cls(**kwargs)
+        if cookie:
+            pool.load([cookie], "env")
+        pool.load(parse_cookie_list(cookie_list), "env")
+        if cookie_file:
+            try:
+                pool.load(parse_cookie_list(Path(cookie_file).read_text(encoding="utf-8")), "file")
+            except OSError as e:
+                logger.error(
+                    f"[CredentialPool] [❌ 读取凭据文件失败] | [文件: {cookie_file}] | [错误: {str(e)}]"
+                )
+        return pool
+
+    def _generated(self) -> List[str]:
+        return [key for key in self.members if key.startswith("ttwid-")]
+
+    def _retire(self) -> int:
+        """移出多次被隔离且没有承载连接的生成凭据"""
+        retired = [
+            key
+            for key in self._generated()
+            if self.members[key].quarantine_count >= self.retire_after
+            and self.members[key].active == 0
+        ]
+        for key in retired:
+            self.remove(key)
+        return len(retired)
+
+    async def refill(self) -> int:
+        """补充生成的 ttwid 凭据到 generate 个，返回新增数量"""
+        if not self.generate:
+            return 0
+        retired = self._retire()
+        missing = self.generate - len(self._generated())
+        if missing <= 0:
+            return 0
+        ttwids = await asyncio.gather(*(gen_ttwid(self.user_agent) for _ in range(missing)))
+        added = [f"ttwid={t}" for t in ttwids if t]
+        self.load(added, "ttwid")
+        logger.info(
+            f"[CredentialPool] [🔑 补充生成凭据] | [新增: {len(added)}/{missing}] | "
+            f"[移出: {retired}] | [凭据数: {len(self)}]"
+        )
+        return len(added)
+
+    async def run(self, interval: float = 60) -> None:
+        """定期移出失效的生成凭据并补充"""
+        while True:
+            try:
+                await self.refill()
+            except Exception as e:
+                logger.error(f"[CredentialPool] [⚠️ 补充凭据失败] | [错误: {str(e)}]")
+            await asyncio.sleep(interval)
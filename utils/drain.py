@@ -0,0 +1,171 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from log.logger import logger
+from utils import jsonlib
+from utils.metrics import metrics
+
+DRAINS_TOTAL = metrics.counter("node_drains_total", "节点进入排空模式的次数")
+DRAINING_GAUGE = metrics.gauge("node_draining", "节点是否处于排空模式（1 为是）")
+
+
+def encode_resume_token(room_id: str, seq: int, secret: str = "") -> str:
+    """生成续传令牌：room_id + 最后收到的消息序号，配置密钥时附带 HMAC 签名"""
+    body = json.dumps({"room_id": room_id, "seq": seq}, separators=(",", ":")).encode()
+    token = base64.urlsafe_b64encode(body).decode().rstrip("=")
+    if secret:
+        sig = hmac.new(secret.encode(), body, hashlib.sha256).digest()[:12]
+        token += "." + base64.urlsafe_b64encode(sig).decode().rstrip("=")
+    return token
+
+
+def decode_resume_token(token: str, secret: str = "") -> Optional[Dict[str, Any]]:
+    """解析续传令牌，格式错误或签名不匹配时返回 None"""
+    try:
+        body_part, _, sig_part = token.partition(".")
+        body = base64.urlsafe_b64decode(body_part + "=" * (-len(body_part) % 4))
+        if secret:
+            expected = hmac.new(secret.encode(), body, hashlib.sha256).digest()[:12]
+            sig = base64.urlsafe_b64decode(sig_part + "=" * (-len(sig_part) % 4))
+            if not hmac.compare_digest(sig, expected):
+                return None
+        data = json.loads(body)
+        return {"room_id": str(data["room_id"]), "seq": int(data["seq"])}
+    except Exception:
+        return None
+
+
+class DrainController:
+    """
+    节点排空（滚动发布 / 下线）
+
+    进入排空模式后节点拒绝新的加入；可选先请求对端节点预热房间上游，
+    然后通知每个客户端携带续传令牌重连到其它节点，最后在截止时间内
+    并发关闭所有上游连接。
+    """
+
+    def __init__(
+        self,
+        rooms,
+        peer_url: str = "",
+        redirect_url: str = "",
+        secret: str = "",
+        admin_token: str = "",
+    ):
+        self.rooms = rooms
+        self.peer_url = peer_url.rstrip("/")
+        self.redirect_url = redirect_url
+        self.secret = secret
+        self.admin_token = admin_token
+        self.draining = False
+        self.started_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self._lock = asyncio.Lock()
+
+    def drain_frame(self, room) -> str:
+        return jsonlib.dumps(
+            {
+                "type": "drain",
+                "message": "服务节点即将下线，请重新连接",
+                "reconnect": True,
+                "redirect": self.redirect_url or None,
+                "resume_token": encode_resume_token(room.room_id, room.seq, self.secret),
+            }
+        )
+
+    async def _warm_peer(self, room_ids: List[str], timeout: float) -> Dict[str, bool]:
+        """请求对端节点预热房间上游（POST /admin/rooms/{room_id}/warm）"""
+        headers = {"X-Admin-Token": self.admin_token} if self.admin_token else {}
+        results: Dict[str, bool] = {}
+
+        async with httpx.AsyncClient(timeout=timeout) as client:
+
+            async def warm(room_id: str):
+                try:
+                    response = await client.post(
+                        f"{self.peer_url}/admin/rooms/{room_id}/warm", headers=headers
+                    )
+                    results[room_id] = response.status_code < 400
+                except Exception as e:
+                    logger.warning(
+                        f"[Drain] [⚠️ 对端预热失败] | [房间ID: {room_id}] | [错误: {str(e)}]"
+                    )
+                    results[room_id] = False
+
+            await asyncio.wait(
+                [asyncio.create_task(warm(r)) for r in room_ids], timeout=timeout
+            )
+        return results
+
+    async def _notify_clients(self, room) -> int:
+        frame = self.drain_frame(room)
+        notified = 0
+        for ws in list(room.clients):
+            try:
+                await ws.send_text(frame)
+                await ws.close(code=1012)  # 1012: Service Restart
+                notified += 1
+            except Exception:
+                pass
+        return notified
+
+    async def drain(self, deadline: float) -> Dict[str, Any]:
+        """进入排空模式并在 deadline 秒内完成迁移，重复调用返回首次结果"""
+        async with self._lock:
+            if self.result is not None:
+                return self.result
+            self.draining = True
+            self.started_at = time.time()
+            DRAINS_TOTAL.inc()
+            DRAINING_GAUGE.set(1)
+            start = time.monotonic()
+            room_list = list(self.rooms)
+            logger.info(f"[Drain] [🚧 进入排空模式] | [房间数: {len(room_list)}]")
+
+            warmed: Dict[str, bool] = {}
+            if self.peer_url and room_list:
+                warmed = await self._warm_peer(
+                    [room.room_id for room in room_list], timeout=deadline / 2
+                )
+
+            notified = 0
+            if room_list:
+                counts = await asyncio.gather(
+                    *(self._notify_clients(room) for room in room_list),
+                    return_exceptions=True,
+                )
+                notified = sum(c for c in counts if isinstance(c, int))
+
+            remaining = max(0.1, deadline - (time.monotonic() - start))
+            tasks = [
+                asyncio.create_task(self.rooms.teardown(room.room_id)) for room in room_list
+            ]
+            timed_out = 0
+            if tasks:
+                _, pending = await asyncio.wait(tasks, timeout=remaining)
+                timed_out = len(pending)
+                for task in pending:
+                    task.cancel()
+
+            self.result = {
+                "draining": True,
+                "rooms": [
+                    {"room_id": room.room_id, "seq": room.seq, "warmed": warmed.get(room.room_id)}
+                    for room in room_list
+                ],
+                "clients_notified": notified,
+                "upstream_timed_out": timed_out,
+                "elapsed": round(time.monotonic() - start, 3),
+            }
+            logger.info(
+                f"[Drain] [✅ 排空完成] | [房间数: {len(room_list)}] | "
+                f"[通知客户端: {notified}] | [超时: {timed_out}]"
+            )
+            return self.result
@@ -0,0 +1,33 @@
+"""
+JSON 编解码后端
+
+安装了 orjson 时使用 orjson，否则回退到标准库 json。两种后端输出一致：
+紧凑分隔符、非 ASCII 字符不转义。可通过 JSON_BACKEND=json 强制使用标准库
+（便于基准对比）。
+"""
+
+import json
+import os
+from typing import Any
+
+JSONDecodeError = json.JSONDecodeError
+
+_requested = os.getenv("JSON_BACKEND", "auto").lower()
+
+try:
+    if _requested == "json":
+        raise ImportError
+    import orjson
+
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    loads = orjson.loads
+    BACKEND = "orjson"
+except ImportError:
+
+    def dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+    loads = json.loads
+    BACKEND = "json"
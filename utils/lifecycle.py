@@ -0,0 +1,122 @@
+import asyncio
+import heapq
+import time
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+from log.logger import logger
+from utils.metrics import metrics
+
+ROOMS_EXPIRED = metrics.counter("room_idle_expired_total", "因空闲超时被关闭的房间数")
+ROOM_SHUTDOWN_SECONDS = metrics.histogram("room_shutdown_seconds", "单个房间关闭耗时（秒）")
+
+
+class RoomLifecycleManager:
+    """
+    房间空闲过期管理
+
+    房间的最后活跃时间由调用方维护（消息、客户端加入/离开时更新，O(1)），
+    通过 last_active 回调读取，房间已不存在时返回 None。
+    最小堆中每个房间只保留一个到期时间。到期时若房间期间有活动则按新的
+    到期时间重新入堆（惰性重排），否则在无客户端时关闭房间。
+    每次唤醒的工作量只与到期房间数相关，不再全量扫描。
+    """
+
+    def __init__(
+        self,
+        close_room: Callable[[str], Awaitable[None]],
+        has_clients: Callable[[str], bool],
+        last_active: Callable[[str], Optional[float]],
+        idle_timeout: float = 300,
+        max_concurrent_shutdowns: int = 16,
+        shutdown_timeout: float = 10,
+    ):
+        self.close_room = close_room
+        self.has_clients = has_clients
+        self.last_active = last_active
+        self.idle_timeout = idle_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self._shutdown_limiter = asyncio.Semaphore(max_concurrent_shutdowns)
+        self._scheduled: Set[str] = set()
+        self._heap: List[Tuple[float, str]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self._scheduled)
+
+    def track(self, room_id: str) -> None:
+        """开始调度房间的空闲过期（已调度时忽略）"""
+        if room_id in self._scheduled:
+            return
+        self._schedule(room_id, time.monotonic() + self.idle_timeout)
+
+    def _schedule(self, room_id: str, deadline: float) -> None:
+        self._scheduled.add(room_id)
+        heapq.heappush(self._heap, (deadline, room_id))
+        # 新到期时间早于当前等待目标时唤醒调度循环
+        if self._wakeup is not None and self._heap[0][1] == room_id:
+            self._wakeup.set()
+
+    def _pop_expired(self, now: float) -> List[str]:
+        expired = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, room_id = heapq.heappop(heap)
+            last_active = self.last_active(room_id)
+            if last_active is None:
+                self._scheduled.discard(room_id)  # 房间已移除
+                continue
+            deadline = last_active + self.idle_timeout
+            if deadline > now:
+                heapq.heappush(heap, (deadline, room_id))
+            elif self.has_clients(room_id):
+                heapq.heappush(heap, (now + self.idle_timeout, room_id))
+            else:
+                self._scheduled.discard(room_id)
+                expired.append(room_id)
+        return expired
+
+    async def _shutdown(self, room_id: str) -> None:
+        async with self._shutdown_limiter:
+            # 等待期间房间可能已被移除或有客户端重新加入
+            if self.last_active(room_id) is None:
+                return
+            if self.has_clients(room_id):
+                self.track(room_id)
+                return
+            logger.info(
+                f"[AutoCleanup] [🧹 清理超时资源] | [房间ID: {room_id}] "
+                f"[无活跃连接超过{self.idle_timeout:.0f}秒]"
+            )
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self.close_room(room_id), self.shutdown_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"[AutoCleanup] [⏰ 关闭房间超时] | [房间ID: {room_id}]")
+            except Exception as e:
+                logger.error(f"[AutoCleanup] [⚠️ 关闭房间失败] | [房间ID: {room_id}] | [错误: {str(e)}]")
+            finally:
+                ROOMS_EXPIRED.inc()
+                ROOM_SHUTDOWN_SECONDS.observe(time.perf_counter() - start)
+
+    async def run(self) -> None:
+        """调度循环：睡眠到最早到期时间，批量并发关闭到期房间"""
+        self._wakeup = asyncio.Event()
+        pending = set()
+        try:
+            while True:
+                timeout = None
+                if self._heap:
+                    timeout = max(0.0, self._heap[0][0] - time.monotonic())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+                for room_id in self._pop_expired(time.monotonic()):
+                    task = asyncio.create_task(self._shutdown(room_id))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+        finally:
+            for task in list(pending):
+                task.cancel()
@@ -0,0 +1,216 @@
+import asyncio
+import functools
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+from log.logger import logger
+from utils.config import Config
+from utils.metrics import metrics
+
+LOOP_LAG_SECONDS = metrics.histogram("event_loop_lag_seconds", "事件循环调度延迟（秒）")
+COROUTINE_STEP_SECONDS = metrics.histogram(
+    "coroutine_step_seconds", "协程单次占用事件循环的时长（秒，仅启用慢回调分析时记录）", ["coroutine"]
+)
+SLOW_CALLBACKS = metrics.counter(
+    "slow_callbacks_total", "占用事件循环超过阈值的协程步数", ["coroutine"]
+)
+
+T = TypeVar("T")
+
+
+class LoopLagMonitor:
+    """
+    事件循环延迟采样
+
+    每隔 interval 秒睡眠一次，实际唤醒时间与预期之差即为事件循环延迟，
+    反映同步解码、大量发送等阻塞回调对所有房间的影响。
+    """
+
+    def __init__(self, interval: float = 0.25, window: int = 40, alpha: float = 0.2):
+        self.interval = interval
+        self.alpha = alpha
+        self.lag = 0.0  # 指数滑动平均（秒）
+        self.last_lag = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def max_lag(self) -> float:
+        """最近窗口内的最大延迟（秒）"""
+        return max(self._recent, default=0.0)
+
+    def snapshot(self) -> dict:
+        return {
+            "loop_lag_ms": round(self.lag * 1000, 2),
+            "loop_lag_last_ms": round(self.last_lag * 1000, 2),
+            "loop_lag_max_ms": round(self.max_lag * 1000, 2),
+        }
+
+    async def run(self) -> None:
+        logger.info(f"[LoopMonitor] [⏱ 开始采样事件循环延迟] | [间隔: {self.interval}s]")
+        interval = self.interval
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.monotonic() - start - interval)
+            self.last_lag = lag
+            self._recent.append(lag)
+            self.lag += self.alpha * (lag - self.lag)
+            LOOP_LAG_SECONDS.observe(lag)
+
+
+class _CoroutineStats:
+    __slots__ = ("name", "calls", "steps", "total", "max", "slow", "histogram", "slow_counter")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.steps = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.histogram = COROUTINE_STEP_SECONDS.labels(name)
+        self.slow_counter = SLOW_CALLBACKS.labels(name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "coroutine": self.name,
+            "calls": self.calls,
+            "steps": self.steps,
+            "total_ms": round(self.total * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "avg_ms": round(self.total / self.steps * 1000, 3) if self.steps else 0.0,
+            "slow": self.slow,
+        }
+
+
+class _TimedCoroutine:
+    """
+    逐步驱动被包装的协程，记录每一步（两次 await 之间）的同步执行时长
+
+    只统计协程真正占用事件循环的时间，不包含等待 I/O 的时间；
+    嵌套的被分析协程会同时计入外层。
+    """
+
+    __slots__ = ("_coro", "_stats", "_profiler")
+
+    def __init__(self, coro, stats: _CoroutineStats, profiler: "SlowCallbackProfiler"):
+        self._coro = coro
+        self._stats = stats
+        self._profiler = profiler
+
+    def __await__(self):
+        coro = self._coro
+        record = self._profiler._record
+        stats = self._stats
+        perf_counter = time.perf_counter
+        value = None
+        error: Optional[BaseException] = None
+        while True:
+            start = perf_counter()
+            try:
+                future = coro.send(value) if error is None else coro.throw(error)
+            except StopIteration as stop:
+                record(stats, perf_counter() - start)
+                return stop.value
+            except BaseException:
+                record(stats, perf_counter() - start)
+                raise
+            record(stats, perf_counter() - start)
+            try:
+                value = yield future
+                error = None
+            except GeneratorExit:
+                coro.close()
+                raise
+            except BaseException as e:
+                value = None
+                error = e
+
+
+class SlowCallbackProfiler:
+    """
+    慢回调分析（默认关闭）
+
+    关闭时 track() 原样返回协程，热路径只多一次属性判断；
+    开启后记录被分析协程每一步占用事件循环的时长，超过阈值的步记入慢回调列表，
+    可通过 report() 按最大 / 总占用时长查看前 N 个协程。
+    """
+
+    def __init__(self, enabled: bool = False, threshold: float = 0.05, keep_recent: int = 100):
+        self.enabled = enabled
+        self.threshold = threshold
+        self._stats: Dict[str, _CoroutineStats] = {}
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=keep_recent)
+
+    def configure(self, enabled: Optional[bool] = None, threshold: Optional[float] = None) -> None:
+        if enabled is not None:
+            self.enabled = enabled
+        if threshold is not None:
+            self.threshold = threshold
+        logger.info(
+            f"[SlowCallback] [🔍 慢回调分析] | [启用: {self.enabled}] | [阈值: {self.threshold * 1000:.0f}ms]"
+        )
+
+    def reset(self) -> None:
+        self._stats.clear()
+        self._recent.clear()
+
+    def track(self, coro: Awaitable[T], name: str) -> Awaitable[T]:
+        """包装协程进行分析，未启用时原样返回"""
+        if not self.enabled:
+            return coro
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = _CoroutineStats(name)
+        stats.calls += 1
+        return _TimedCoroutine(coro, stats, self)
+
+    def _record(self, stats: _CoroutineStats, duration: float) -> None:
+        stats.steps += 1
+        stats.total += duration
+        if duration > stats.max:
+            stats.max = duration
+        stats.histogram.observe(duration)
+        if duration >= self.threshold:
+            stats.slow += 1
+            stats.slow_counter.inc()
+            self._recent.append(
+                {"coroutine": stats.name, "ms": round(duration * 1000, 3), "at": time.time()}
+            )
+            logger.warning(
+                f"[SlowCallback] [🐢 占用事件循环过久] | [协程: {stats.name}] | [耗时: {duration * 1000:.1f}ms]"
+            )
+
+    def report(self, top: int = 10, sort: str = "max") -> Dict[str, Any]:
+        """按 max / total / slow 排序返回前 top 个协程及最近的慢回调"""
+        key = {"max": "max", "total": "total", "slow": "slow"}.get(sort, "max")
+        ranked: List[_CoroutineStats] = sorted(
+            self._stats.values(), key=lambda s: getattr(s, key), reverse=True
+        )
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold * 1000,
+            "sort": key,
+            "coroutines": [s.to_dict() for s in ranked[:top]],
+            "recent_slow": list(self._recent)[-top:],
+        }
+
+
+slow_callbacks = SlowCallbackProfiler(
+    enabled=Config.PROFILE_SLOW_CALLBACKS, threshold=Config.SLOW_CALLBACK_THRESHOLD
+)
+
+
+def profiled(name: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """装饰异步函数，启用慢回调分析时记录其占用事件循环的时长"""
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return slow_callbacks.track(func(*args, **kwargs), name)
+
+        return wrapper
+
+    return decorator
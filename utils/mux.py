@@ -0,0 +1,118 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from utils import jsonlib
+from utils.metrics import metrics
+
+# 当前打开的多房间连接
+_connections: Set["MuxConnection"] = set()
+
+metrics.gauge("mux_connections", "多房间 WebSocket 连接数", func=lambda: len(_connections))
+metrics.gauge(
+    "mux_subscriptions",
+    "多房间 WebSocket 连接订阅的房间总数",
+    func=lambda: sum(len(c.channels) for c in _connections),
+)
+
+
+class RoomChannel:
+    """
+    多房间连接中对一个房间的订阅
+
+    作为普通客户端加入房间的客户端集合，与单房间连接共用同一次扇出；
+    发送时把已编码的消息包装为 {"room_id": ..., "data": ...}，不重新解析。
+    """
+
+    __slots__ = ("connection", "room_id", "closed", "_prefix")
+
+    def __init__(self, connection: "MuxConnection", room_id: str):
+        self.connection = connection
+        self.room_id = room_id
+        self.closed = False
+        self._prefix = '{"room_id":' + jsonlib.dumps(room_id) + ',"data":'
+
+    @property
+    def client_state(self):
+        return self.connection.websocket.client_state
+
+    @property
+    def _closed(self) -> bool:
+        # 扇出时按 _closed 判断连接是否已断开
+        return self.closed
+
+    async def send_text(self, frame: str) -> None:
+        await self.connection.websocket.send_text(self._prefix + frame + "}")
+
+    async def close(self, code: int = 1000) -> None:
+        """关闭订阅（排空等场景），底层连接保持打开"""
+        await self.connection.unsubscribe(self.room_id, code=code)
+
+
+class MuxConnection:
+    """
+    一条多房间 WebSocket 连接的订阅状态
+
+    leave 为客户端离开房间的回调（房间没有客户端时负责清理上游）。
+    订阅在后台任务中完成，启动上游较慢的房间不阻塞其它控制消息；
+    任务进行中取消订阅时只标记关闭，由任务结束时离开房间。
+    """
+
+    def __init__(
+        self,
+        websocket: Any,
+        leave: Callable[[str, Any], Awaitable[None]],
+        max_rooms: int = 0,
+    ):
+        self.websocket = websocket
+        self.leave = leave
+        self.max_rooms = max_rooms  # 0 表示不限制
+        self.channels: Dict[str, RoomChannel] = {}
+        self.pending: Dict[str, asyncio.Task] = {}
+        _connections.add(self)
+
+    def __contains__(self, room_id: str) -> bool:
+        return room_id in self.channels
+
+    @property
+    def full(self) -> bool:
+        return bool(self.max_rooms) and len(self.channels) >= self.max_rooms
+
+    def open(self, room_id: str) -> RoomChannel:
+        channel = self.channels.get(room_id)
+        if channel is None:
+            channel = RoomChannel(self, room_id)
+            self.channels[room_id] = channel
+        return channel
+
+    def track(self, room_id: str, task: asyncio.Task) -> None:
+        """记录进行中的订阅任务（任务结束时自行移除）"""
+        self.pending[room_id] = task
+
+    async def send(self, frame: Dict[str, Any]) -> None:
+        """发送控制消息（subscribed / unsubscribed / error / pong），连接已断开时忽略"""
+        try:
+            await self.websocket.send_text(jsonlib.dumps(frame))
+        except Exception:
+            pass
+
+    async def unsubscribe(self, room_id: str, code: Optional[int] = None) -> bool:
+        """取消订阅并离开房间，code 不为空时通知客户端（服务端主动关闭）"""
+        channel = self.channels.pop(room_id, None)
+        if channel is None:
+            return False
+        channel.closed = True
+        # 订阅任务仍在启动上游时由任务结束后离开房间，避免与上游启动交错
+        if room_id not in self.pending:
+            await self.leave(room_id, channel)
+        if code is not None:
+            await self.send({"type": "unsubscribed", "room_id": room_id, "code": code})
+        return True
+
+    async def close(self) -> None:
+        """连接断开：取消所有订阅"""
+        _connections.discard(self)
+        for room_id in list(self.channels):
+            await self.unsubscribe(room_id)
+
+    def room_ids(self) -> List[str]:
+        return list(self.channels)
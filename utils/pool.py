@@ -0,0 +1,234 @@
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from log.logger import logger
+from utils.metrics import metrics
+
+POOL_EVENTS = metrics.counter(
+    "pool_events_total",
+    "资源池成员事件数（connect / failure / timeout / quarantine）",
+    ["pool", "member", "event"],
+)
+POOL_ACTIVE = metrics.gauge("pool_active", "资源池成员当前承载的上游连接数", ["pool", "member"])
+POOL_EVENT_NAMES = ("connect", "failure", "timeout", "quarantine")
+
+
+class PoolExhausted(ConnectionError):
+    """资源池没有可用成员（全部达到上限或处于隔离中）"""
+
+
+class PoolMember:
+    """资源池中的一个成员（代理、凭据等）及其健康统计"""
+
+    __slots__ = (
+        "key",
+        "value",
+        "active",
+        "connects",
+        "failures",
+        "consecutive_failures",
+        "recv_timeouts",
+        "latency",
+        "status_codes",
+        "last_error",
+        "quarantined_until",
+        "quarantine_count",
+    )
+
+    def __init__(self, key: str, value: Any):
+        self.key = key  # 用于日志和指标的名称（不含敏感信息）
+        self.value = value
+        self.active = 0
+        self.connects = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.recv_timeouts = 0
+        self.latency: Optional[float] = None  # 连接耗时 EWMA（秒）
+        self.status_codes: Counter = Counter()
+        self.last_error: Optional[str] = None
+        self.quarantined_until = 0.0
+        self.quarantine_count = 0
+
+    @property
+    def attempts(self) -> int:
+        return self.connects + self.failures
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failures / (self.attempts + 1)
+
+    @property
+    def timeout_rate(self) -> float:
+        return self.recv_timeouts / (self.connects + 1)
+
+    def quarantined(self, now: Optional[float] = None) -> bool:
+        return self.quarantined_until > (now if now is not None else time.monotonic())
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "member": self.key,
+            "active": self.active,
+            "connects": self.connects,
+            "failures": self.failures,
+            "failure_rate": round(self.failure_rate, 3),
+            "recv_timeouts": self.recv_timeouts,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "status_codes": {str(k): v for k, v in self.status_codes.items()},
+            "last_error": self.last_error,
+            "quarantined_seconds": round(max(0.0, self.quarantined_until - now), 1),
+            "quarantine_count": self.quarantine_count,
+        }
+
+
+class Lease:
+    """
+    一条上游连接对资源池成员的占用
+
+    爬虫在连接成功、失败、接收超时时回报结果，连接结束后释放（重复释放无副作用）。
+    """
+
+    __slots__ = ("pool", "member", "released")
+
+    def __init__(self, pool: "ScoredPool", member: PoolMember):
+        self.pool = pool
+        self.member = member
+        self.released = False
+
+    @property
+    def value(self) -> Any:
+        return self.member.value
+
+    def connected(self, latency: float) -> None:
+        self.pool.report_success(self.member, latency)
+
+    def failed(self, reason: str, status: Optional[int] = None) -> None:
+        self.pool.report_failure(self.member, reason, status)
+
+    def timeout(self) -> None:
+        self.pool.report_timeout(self.member)
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.pool.release(self.member)
+
+
+class ScoredPool:
+    """
+    按负载和健康评分分配成员的资源池
+
+    acquire() 在未隔离且未达到连接上限的成员中选择评分最低者：
+    评分 = 负载比例 + 2 × 失败率 + 连接耗时（秒，上限 5）+ 0.5 × 接收超时率。
+    连续失败 quarantine_failures 次的成员被隔离 quarantine_seconds 秒，
+    再次被隔离时时长翻倍（上限 16 倍）；隔离结束后一次成功即清零连续失败计数。
+    """
+
+    name = "pool"
+
+    def __init__(
+        self,
+        max_active: int = 0,
+        quarantine_failures: int = 3,
+        quarantine_seconds: float = 60,
+    ):
+        self.max_active = max_active  # 0 表示不限制
+        self.quarantine_failures = max(1, quarantine_failures)
+        self.quarantine_seconds = quarantine_seconds
+        self.members: Dict[str, PoolMember] = {}
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __bool__(self) -> bool:
+        return bool(self.members)
+
+    def add(self, key: str, value: Any) -> PoolMember:
+        member = self.members.get(key)
+        if member is None:
+            member = PoolMember(key, value)
+            self.members[key] = member
+        return member
+
+    def remove(self, key: str) -> None:
+        if self.members.pop(key, None) is not None:
+            POOL_ACTIVE.remove(self.name, key)
+            for event in POOL_EVENT_NAMES:
+                POOL_EVENTS.remove(self.name, key, event)
+
+    def score(self, member: PoolMember) -> float:
+        load = member.active / self.max_active if self.max_active else member.active / 100
+        latency = min(member.latency, 5.0) if member.latency is not None else 0.0
+        return load + 2 * member.failure_rate + latency + 0.5 * member.timeout_rate
+
+    def available(self, member: PoolMember, now: float) -> bool:
+        if member.quarantined(now):
+            return False
+        return not self.max_active or member.active < self.max_active
+
+    def acquire(self) -> Optional[Lease]:
+        """占用评分最低的可用成员，没有可用成员时返回 None"""
+        now = time.monotonic()
+        candidates = [m for m in self.members.values() if self.available(m, now)]
+        if not candidates:
+            return None
+        member = min(candidates, key=self.score)
+        member.active += 1
+        POOL_ACTIVE.labels(self.name, member.key).set(member.active)
+        return Lease(self, member)
+
+    def release(self, member: PoolMember) -> None:
+        member.active = max(0, member.active - 1)
+        POOL_ACTIVE.labels(self.name, member.key).set(member.active)
+
+    def report_success(self, member: PoolMember, latency: float) -> None:
+        member.connects += 1
+        member.consecutive_failures = 0
+        member.latency = latency if member.latency is None else 0.7 * member.latency + 0.3 * latency
+        POOL_EVENTS.labels(self.name, member.key, "connect").inc()
+
+    def counts_failure(self, reason: str, status: Optional[int]) -> bool:
+        """该失败是否归咎于本资源池的成员（子类可按状态码区分）"""
+        return True
+
+    def report_failure(self, member: PoolMember, reason: str, status: Optional[int] = None) -> None:
+        if status is not None:
+            member.status_codes[status] += 1
+        if not self.counts_failure(reason, status):
+            return
+        member.failures += 1
+        member.consecutive_failures += 1
+        member.last_error = reason
+        POOL_EVENTS.labels(self.name, member.key, "failure").inc()
+        if member.consecutive_failures >= self.quarantine_failures:
+            self.quarantine(member, reason)
+
+    def report_timeout(self, member: PoolMember) -> None:
+        member.recv_timeouts += 1
+        POOL_EVENTS.labels(self.name, member.key, "timeout").inc()
+
+    def quarantine(self, member: PoolMember, reason: str) -> None:
+        duration = self.quarantine_seconds * min(16, 2**member.quarantine_count)
+        member.quarantined_until = time.monotonic() + duration
+        member.quarantine_count += 1
+        member.consecutive_failures = 0
+        POOL_EVENTS.labels(self.name, member.key, "quarantine").inc()
+        logger.warning(
+            f"[Pool] [🚫 成员已隔离] | [资源池: {self.name}] | [成员: {member.key}] | "
+            f"[时长: {duration:.0f}秒] | [原因: {reason}]"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        items: List[Dict[str, Any]] = []
+        for member in sorted(self.members.values(), key=self.score):
+            items.append({**member.to_dict(), "score": round(self.score(member), 3)})
+        return {
+            "members": len(self.members),
+            "available": sum(1 for m in self.members.values() if self.available(m, now)),
+            "quarantined": sum(1 for m in self.members.values() if m.quarantined(now)),
+            "active": sum(m.active for m in self.members.values()),
+            "max_active_per_member": self.max_active,
+            "items": items,
+        }
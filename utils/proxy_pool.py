@@ -0,0 +1,70 @@
+from pathlib import Path
+from typing import Iterable, List, Optional
+from urllib.parse import urlsplit
+
+from log.logger import logger
+from utils.pool import ScoredPool
+
+
+def mask_proxy(url: str) -> str:
+    """去掉代理地址中的用户名密码，用于日志和指标"""
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    if parts.port:
+        host = f"{host}:{parts.port}"
+    return f"{parts.scheme}://{host}" if parts.scheme else host
+
+
+def parse_proxy_list(text: str) -> List[str]:
+    """解析逗号或换行分隔的代理列表，忽略空行和 # 注释"""
+    proxies = []
+    for line in text.replace(",", "\n").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            proxies.append(line)
+    return proxies
+
+
+class ProxyPool(ScoredPool):
+    """
+    上游连接代理池
+
+    支持 http:// 与 socks5:// 代理（由 websockets_proxy 建立隧道）。每个代理承载的
+    上游连接数不超过 max_active，新房间分配给评分最低（负载低、失败少、连接快）的代理，
+    连续失败的代理被隔离。
+    """
+
+    name = "proxy"
+
+    def load(self, proxies: Iterable[str]) -> None:
+        for url in proxies:
+            self.add(mask_proxy(url), url)
+
+    @classmethod
+    def from_config(
+        cls,
+        proxy_list: str = "",
+        proxy_file: str = "",
+        max_active: int = 0,
+        quarantine_failures: int = 3,
+        quarantine_seconds: float = 60,
+    ) -> "ProxyPool":
+        pool = cls(max_active, quarantine_failures, quarantine_seconds)
+        pool.load(parse_proxy_list(proxy_list))
+        if proxy_file:
+            try:
+                pool.load(parse_proxy_list(Path(proxy_file).read_text(encoding="utf-8")))
+            except OSError as e:
+                logger.error(
+                    f"[ProxyPool] [❌ 读取代理文件失败] | [文件: {proxy_file}] | [错误: {str(e)}]"
+                )
+        if pool:
+            logger.info(
+                f"[ProxyPool] [🧭 代理池已加载] | [代理数: {len(pool)}] | "
+                f"[单代理连接上限: {max_active or '不限'}]"
+            )
+        return pool
+
+    def proxies_kwargs(self, url: Optional[str]) -> dict:
+        """转换为 DouyinWebSocketCrawler 的 proxies 参数"""
+        return {"http://": url, "https://": url}
@@ -0,0 +1,251 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from crawler.errors import (
+    CircuitOpenError,
+    UpstreamError,
+    UpstreamStatusError,
+    UpstreamTimeoutError,
+)
+from log.logger import logger
+from utils.config import Config
+from utils.metrics import metrics
+
+CONNECT_ATTEMPTS = metrics.counter(
+    "upstream_connect_attempts_total",
+    "上游连接尝试次数（success / network / timeout / status / circuit_open）",
+    ["result"],
+)
+CONNECT_SECONDS = metrics.histogram("upstream_connect_seconds", "上游连接建立耗时（秒）")
+RECOVER_SECONDS = metrics.histogram(
+    "upstream_recover_seconds",
+    "房间上游从失败到重连后收到首条消息的耗时（秒）",
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+CIRCUIT_STATE = metrics.gauge("upstream_circuit_state", "上游熔断器状态（0 关闭 / 1 半开 / 2 打开）")
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class Backoff:
+    """单个房间的重连退避状态（decorrelated jitter）"""
+
+    __slots__ = ("policy", "attempts", "_prev")
+
+    def __init__(self, policy: "ReconnectPolicy"):
+        self.policy = policy
+        self.attempts = 0
+        self._prev = policy.base
+
+    def next_delay(self) -> Optional[float]:
+        """返回下一次重连前的等待时间，超过最大重试次数时返回 None"""
+        policy = self.policy
+        if policy.max_attempts and self.attempts >= policy.max_attempts:
+            return None
+        self.attempts += 1
+        # sleep = min(cap, random(base, prev * 3))，各房间的重连时间自然错开
+        self._prev = min(policy.cap, random.uniform(policy.base, self._prev * 3))
+        return self._prev
+
+    def reset(self) -> None:
+        self.attempts = 0
+        self._prev = self.policy.base
+
+
+class ReconnectPolicy:
+    """
+    上游重连策略
+
+    采用 decorrelated jitter 退避：每次等待时间在 base 与上次等待的 3 倍之间随机，
+    不超过 cap。上游短暂故障后各房间的重连时间随机分散，不会同时冲击上游。
+    连接稳定运行超过 stable_after 秒后再断开时重新从 base 开始退避。
+    """
+
+    def __init__(
+        self,
+        base: float = 1.0,
+        cap: float = 60.0,
+        max_attempts: int = 8,
+        stable_after: float = 60.0,
+    ):
+        self.base = base
+        self.cap = cap
+        self.max_attempts = max_attempts  # 0 表示不限制
+        self.stable_after = stable_after
+
+    def new(self) -> Backoff:
+        return Backoff(self)
+
+    def circuit_delay(self, retry_after: float) -> float:
+        """熔断器打开时的等待时间：等到半开后再加随机错开量"""
+        return retry_after + random.uniform(0, self.base * 5)
+
+
+class CircuitBreaker:
+    """
+    熔断器（默认为进程级上游熔断器）
+
+    连续 failure_threshold 次计入熔断的连接失败后打开，reset_timeout 秒内直接拒绝
+    连接；之后进入半开状态，只放行一个探测连接：成功则关闭，失败则重新打开。
+    name / gauge 用于区分其它用途的熔断器（如每个 Webhook 目标一个）。
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 10,
+        reset_timeout: float = 30.0,
+        name: str = "upstream",
+        gauge: Any = CIRCUIT_STATE,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self.gauge = gauge
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened_total = 0
+        self._probing = False
+        gauge.set(0)
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning(
+                f"[CircuitBreaker] [⚡ 熔断器状态变化] | [名称: {self.name}] | "
+                f"[{self.state} → {state}] | [连续失败: {self.failures}]"
+            )
+        self.state = state
+        self.gauge.set(_STATE_VALUES[state])
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """是否允许发起连接（半开状态下占用唯一的探测名额）"""
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                return False
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probing = False
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.opened_total += 1
+            self._set_state(OPEN)
+
+    def release_probe(self) -> None:
+        """半开探测未计入成败（如凭据错误）时归还探测名额"""
+        self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_after": round(self.retry_after(), 1) if self.state == OPEN else 0.0,
+            "opened_total": self.opened_total,
+        }
+
+
+class UpstreamGate:
+    """
+    所有上游连接共用的入口：熔断器 + 并发连接数限制 + 连接尝试指标
+
+    用法:
+        async with upstream_gate.attempt():
+            websocket = await websockets.connect(...)
+    """
+
+    def __init__(self, breaker: CircuitBreaker, max_concurrent: int = 10):
+        self.breaker = breaker
+        self.max_concurrent = max_concurrent
+        self._limiter = asyncio.Semaphore(max_concurrent) if max_concurrent > 0 else None
+        self.inflight = 0
+        metrics.gauge(
+            "upstream_connect_inflight", "正在建立的上游连接数", func=lambda: self.inflight
+        )
+
+    def _reject(self) -> None:
+        CONNECT_ATTEMPTS.labels("circuit_open").inc()
+        retry_after = self.breaker.retry_after() or 1.0
+        raise CircuitOpenError(
+            f"[UpstreamGate] [⚡ 上游熔断中] | [{retry_after:.1f}秒后重试]", retry_after
+        )
+
+    @asynccontextmanager
+    async def attempt(self) -> AsyncIterator[None]:
+        if not self.breaker.allow():
+            self._reject()
+        if self._limiter is not None:
+            try:
+                await self._limiter.acquire()
+            except BaseException:
+                # 等待并发名额时被取消（房间关闭、排空、停机），归还半开探测名额
+                self.breaker.release_probe()
+                raise
+        self.inflight += 1
+        start = time.monotonic()
+        try:
+            yield
+        except UpstreamError as exc:
+            CONNECT_ATTEMPTS.labels(_result_label(exc)).inc()
+            if exc.trips_breaker:
+                self.breaker.record_failure()
+            else:
+                self.breaker.release_probe()
+            raise
+        except BaseException:
+            self.breaker.release_probe()
+            raise
+        else:
+            CONNECT_ATTEMPTS.labels("success").inc()
+            CONNECT_SECONDS.observe(time.monotonic() - start)
+            self.breaker.record_success()
+        finally:
+            self.inflight -= 1
+            if self._limiter is not None:
+                self._limiter.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.snapshot(),
+            "connect_inflight": self.inflight,
+            "max_concurrent_connects": self.max_concurrent,
+            "connect_attempts": CONNECT_ATTEMPTS.snapshot(),
+        }
+
+
+def _result_label(exc: UpstreamError) -> str:
+    if isinstance(exc, UpstreamTimeoutError):
+        return "timeout"
+    if isinstance(exc, UpstreamStatusError):
+        return "status"
+    return "network"
+
+
+reconnect_policy = ReconnectPolicy(
+    base=Config.RECONNECT_BASE_DELAY,
+    cap=Config.RECONNECT_MAX_DELAY,
+    max_attempts=Config.RECONNECT_MAX_ATTEMPTS,
+)
+upstream_gate = UpstreamGate(
+    CircuitBreaker(Config.BREAKER_FAILURE_THRESHOLD, Config.BREAKER_RESET_TIMEOUT),
+    max_concurrent=Config.UPSTREAM_CONNECT_CONCURRENCY,
+)
@@ -0,0 +1,329 @@
+import asyncio
+import sys
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from log.logger import logger
+from utils.metrics import metrics
+
+EGRESS_BYTES = metrics.counter("egress_bytes_total", "发送给下游客户端的总字节数")
+MESSAGE_STAGE_SECONDS = metrics.histogram(
+    "message_stage_seconds", "消息各处理阶段耗时（秒），阶段见 crawler/trace.py", ["room_id", "stage"]
+)
+
+
+class Room:
+    """
+    单个直播间的运行状态
+
+    爬虫、爬虫任务、客户端集合、计数器、最近消息环形缓冲和时间戳集中在一条记录中，
+    避免多个字典之间状态不同步。
+    """
+
+    __slots__ = (
+        "room_id",
+        "crawler",
+        "task",
+        "clients",
+        "ts_clients",
+        "combo_clients",
+        "combos",
+        "summaries",
+        "stats_clients",
+        "analytics",
+        "state",
+        "created_at",
+        "last_active",
+        "last_message_at",
+        "seq",
+        "messages_in",
+        "messages_out",
+        "bytes_out",
+        "recent",
+        "recent_bytes",
+        "msg_rate",
+        "_rate_window_start",
+        "_rate_count",
+        "_stage_histograms",
+    )
+
+    def __init__(self, room_id: str, ring_size: int = 200):
+        now = time.monotonic()
+        self.room_id = room_id
+        self.crawler: Any = None
+        self.task: Optional[asyncio.Task] = None
+        self.clients: Set[Any] = set()
+        self.ts_clients: Set[Any] = set()  # 需要 _ts 时间戳字段的客户端
+        self.combo_clients: Set[Any] = set()  # 接收连击礼物聚合帧（而非逐条礼物消息）的客户端
+        self.combos: Any = None  # GiftComboAggregator，有聚合客户端时才创建
+        self.summaries: Any = None  # RoomSummarizer，有汇总订阅的客户端时才创建
+        self.stats_clients: Set[Any] = set()  # 接收定期统计帧的客户端
+        self.analytics: Any = None  # RoomAnalytics，启动上游时创建
+        self.state: Any = None  # RoomState，启动上游时创建
+        self.created_at = time.time()
+        self.last_active = now
+        self.last_message_at: Optional[float] = None
+        self.seq = 0  # 房间内消息序号，单调递增（毫秒时间戳基准）
+        self.messages_in = 0
+        self.messages_out = 0
+        self.bytes_out = 0
+        # 最近消息环形缓冲：(seq, frame)
+        self.recent: Deque[Tuple[int, str]] = deque(maxlen=ring_size)
+        self.recent_bytes = 0
+        self.msg_rate = 0.0
+        self._rate_window_start = now
+        self._rate_count = 0
+        self._stage_histograms: Dict[str, Any] = {}
+
+    def touch(self) -> None:
+        self.last_active = time.monotonic()
+
+    @property
+    def upstream_alive(self) -> bool:
+        crawler = self.crawler
+        return (
+            crawler is not None
+            and crawler.websocket is not None
+            and not crawler.websocket.closed
+        )
+
+    def record_message(self, frame: str) -> int:
+        """
+        记录一条上游消息，写入环形缓冲并返回其序号
+
+        序号取 max(上一序号 + 1, 当前毫秒时间戳)，单调递增且在不同节点之间可比较，
+        客户端迁移到其它节点后可用同一序号续传。
+        """
+        now = time.monotonic()
+        self.seq = max(self.seq + 1, int(time.time() * 1000))
+        self.messages_in += 1
+        self.last_message_at = now
+        # 只有存在客户端时消息才算作活跃，无人订阅的房间仍会按空闲超时关闭
+        if self.clients:
+            self.last_active = now
+
+        recent = self.recent
+        if len(recent) == recent.maxlen:
+            self.recent_bytes -= len(recent[0][1])
+        recent.append((self.seq, frame))
+        self.recent_bytes += len(frame)
+
+        # 按秒窗口计算消息速率
+        self._rate_count += 1
+        elapsed = now - self._rate_window_start
+        if elapsed >= 1.0:
+            self.msg_rate = self._rate_count / elapsed
+            self._rate_window_start = now
+            self._rate_count = 0
+        return self.seq
+
+    def record_send(self, size: int) -> None:
+        self.messages_out += 1
+        self.bytes_out += size
+        EGRESS_BYTES.inc(size)
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        histogram = self._stage_histograms.get(stage)
+        if histogram is None:
+            histogram = MESSAGE_STAGE_SECONDS.labels(self.room_id, stage)
+            self._stage_histograms[stage] = histogram
+        # 跨时钟的阶段可能因时钟偏差为负
+        histogram.observe(seconds if seconds > 0 else 0.0)
+
+    def observe_trace(self, trace) -> None:
+        """记录每条消息只计算一次的阶段（upstream / network / decode）"""
+        for stage, seconds in trace.upstream_stages().items():
+            self.observe_stage(stage, seconds)
+
+    def observe_delivery(self, trace, start: float, end: float) -> None:
+        """记录单个客户端的 queue / send / end_to_end 阶段"""
+        self.observe_stage("queue", start - trace.decoded)
+        self.observe_stage("send", end - start)
+        if trace.created:
+            self.observe_stage("end_to_end", end - trace.created)
+
+    def latency(self) -> Dict[str, Any]:
+        """各阶段延迟的 p50 / p99（毫秒）"""
+        return {
+            stage: {
+                "count": h.count,
+                "p50_ms": h.quantile(0.5) * 1000,
+                "p99_ms": h.quantile(0.99) * 1000,
+            }
+            for stage, h in self._stage_histograms.items()
+        }
+
+    def entries_since(self, seq: int) -> List[Tuple[int, str]]:
+        """返回环形缓冲中序号大于 seq 的 (序号, 消息)"""
+        return [(frame_seq, frame) for frame_seq, frame in self.recent if frame_seq > seq]
+
+    def replay_since(self, seq: int) -> List[str]:
+        """返回环形缓冲中序号大于 seq 的消息"""
+        return [frame for _, frame in self.entries_since(seq)]
+
+    def current_rate(self) -> float:
+        # 超过两个窗口没有消息时速率归零
+        if time.monotonic() - self._rate_window_start > 2.0 and not self._rate_count:
+            return 0.0
+        return self.msg_rate
+
+    def memory_bytes(self) -> int:
+        """估算房间占用内存（记录本身 + 客户端集合 + 环形缓冲 + 实时统计）"""
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.clients)
+            + sys.getsizeof(self.recent)
+            + self.recent_bytes
+            + (self.analytics.memory_bytes() if self.analytics is not None else 0)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "room_id": self.room_id,
+            "clients": len(self.clients),
+            "upstream_alive": self.upstream_alive,
+            "created_at": self.created_at,
+            "idle_seconds": round(now - self.last_active, 3),
+            "last_message_seconds": (
+                round(now - self.last_message_at, 3) if self.last_message_at else None
+            ),
+            "seq": self.seq,
+            "messages_in": self.messages_in,
+            "messages_out": self.messages_out,
+            "bytes_out": self.bytes_out,
+            "msg_rate": round(self.current_rate(), 2),
+            "buffered_messages": len(self.recent),
+            "active_combos": len(self.combos) if self.combos is not None else 0,
+            "summary_windows": len(self.summaries) if self.summaries is not None else 0,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+
+class RoomRegistry:
+    """
+    房间注册表
+
+    join / leave / detach / remove 都是同步操作，在事件循环中天然原子；
+    需要等待的关闭操作先从注册表摘除再关闭，不会与新的加入交错。
+    """
+
+    def __init__(self, ring_size: int = 200):
+        self.ring_size = ring_size
+        self._rooms: Dict[str, Room] = {}
+        self.total_clients = 0
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def __contains__(self, room_id: str) -> bool:
+        return room_id in self._rooms
+
+    def __iter__(self) -> Iterator[Room]:
+        return iter(list(self._rooms.values()))
+
+    def get(self, room_id: str) -> Optional[Room]:
+        return self._rooms.get(room_id)
+
+    def ensure(self, room_id: str) -> Room:
+        """获取房间，不存在时创建（不加入客户端）"""
+        room = self._rooms.get(room_id)
+        if room is None:
+            room = Room(room_id, self.ring_size)
+            self._rooms[room_id] = room
+        return room
+
+    def join(
+        self,
+        room_id: str,
+        client: Any,
+        timestamps: bool = False,
+        combo: bool = False,
+        stats: bool = False,
+    ) -> Room:
+        """
+        客户端加入房间（房间不存在时创建）
+
+        timestamps 为 True 时下发 _ts 字段；combo 为 True 时礼物消息以连击聚合帧下发；
+        stats 为 True 时定期接收房间统计帧。
+        """
+        room = self.ensure(room_id)
+        if client not in room.clients:
+            room.clients.add(client)
+            self.total_clients += 1
+        if timestamps:
+            room.ts_clients.add(client)
+        if combo:
+            room.combo_clients.add(client)
+        if stats:
+            room.stats_clients.add(client)
+        room.touch()
+        return room
+
+    def leave(self, room_id: str, client: Any) -> Optional[Room]:
+        """客户端离开房间，返回房间（不存在或客户端不在房间时返回 None）"""
+        room = self._rooms.get(room_id)
+        if room is None or client not in room.clients:
+            return None
+        room.clients.discard(client)
+        room.ts_clients.discard(client)
+        room.combo_clients.discard(client)
+        room.stats_clients.discard(client)
+        if not room.combo_clients:
+            room.combos = None  # 没有聚合客户端时丢弃进行中的连击状态
+        if room.summaries is not None:
+            room.summaries.unsubscribe(client)
+            if not room.summaries:
+                room.summaries = None
+        self.total_clients -= 1
+        room.touch()
+        return room
+
+    def attach(self, room: Room, crawler: Any, task: Optional[asyncio.Task] = None) -> None:
+        room.crawler = crawler
+        room.task = task
+        room.touch()
+
+    def detach(self, room: Room) -> Tuple[Any, Optional[asyncio.Task]]:
+        """摘除房间的爬虫和任务（客户端保留），返回被摘除的对象"""
+        crawler, task = room.crawler, room.task
+        room.crawler = None
+        room.task = None
+        return crawler, task
+
+    def remove(self, room_id: str) -> Optional[Room]:
+        """从注册表移除房间，客户端计数同步扣减"""
+        room = self._rooms.pop(room_id, None)
+        if room is not None:
+            self.total_clients -= len(room.clients)
+            for stage in room._stage_histograms:
+                MESSAGE_STAGE_SECONDS.remove(room_id, stage)
+        return room
+
+    async def stop_upstream(self, room: Room) -> None:
+        """关闭房间的上游爬虫连接并取消爬虫任务"""
+        crawler, task = self.detach(room)
+        if crawler is not None:
+            await crawler.close()  # 主动关闭WebSocket连接
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def teardown(self, room_id: str) -> None:
+        """移除房间并关闭其上游连接"""
+        room = self.remove(room_id)
+        if room is None:
+            return
+        logger.info(f"[RoomRegistry] [🧹 清理房间] | [房间ID: {room_id}]")
+        await self.stop_upstream(room)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rooms": len(self._rooms),
+            "clients": self.total_clients,
+            "upstream_alive": sum(1 for r in self._rooms.values() if r.upstream_alive),
+        }
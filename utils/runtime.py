@@ -0,0 +1,65 @@
+import asyncio
+import importlib.util
+import os
+import platform
+from typing import Dict
+
+import google.protobuf
+from google.protobuf.internal import api_implementation
+
+from log.logger import logger
+from utils import jsonlib
+from utils.metrics import metrics
+
+PROTOBUF_BACKEND_INFO = metrics.gauge(
+    "protobuf_backend_info",
+    "当前使用的 protobuf 运行时实现（值恒为 1）",
+    ["implementation", "version"],
+)
+
+
+def protobuf_backend() -> Dict[str, str]:
+    """
+    检测当前 protobuf 运行时实现
+
+    实现由环境变量 PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION 控制（python / upb / cpp），
+    未设置时 protobuf 自动选择可用的最快实现。
+    """
+    return {
+        "implementation": api_implementation.Type(),
+        "version": google.protobuf.__version__,
+        "requested": os.getenv("PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION", "auto"),
+    }
+
+
+def server_stack() -> Dict[str, str]:
+    """当前事件循环实现、JSON 后端以及可选加速库是否安装"""
+    try:
+        loop = type(asyncio.get_running_loop())
+        loop_name = f"{loop.__module__}.{loop.__name__}"
+    except RuntimeError:
+        loop_name = "none"
+    return {
+        "loop": loop_name,
+        "json": jsonlib.BACKEND,
+        "uvloop_installed": importlib.util.find_spec("uvloop") is not None,
+        "httptools_installed": importlib.util.find_spec("httptools") is not None,
+    }
+
+
+def report_runtime() -> Dict[str, str]:
+    """启动时记录运行时信息并导出到 /metrics"""
+    backend = protobuf_backend()
+    PROTOBUF_BACKEND_INFO.labels(backend["implementation"], backend["version"]).set(1)
+    logger.info(
+        f"[Runtime] [🧬 protobuf 后端] | [实现: {backend['implementation']}] | "
+        f"[版本: {backend['version']}] | [请求: {backend['requested']}] | "
+        f"[Python: {platform.python_version()}]"
+    )
+    stack = server_stack()
+    logger.info(f"[Runtime] [⚙️ 服务栈] | [事件循环: {stack['loop']}] | [JSON: {stack['json']}]")
+    if backend["implementation"] == "python":
+        logger.warning(
+            "[Runtime] [⚠️ 使用纯 Python protobuf 实现] | [解码速度明显下降，建议使用 upb 后端]"
+        )
+    return backend
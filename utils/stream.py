@@ -0,0 +1,135 @@
+import asyncio
+from typing import Any, AsyncIterator, Iterable, Optional, Set, Tuple
+
+from starlette.websockets import WebSocketState
+
+from utils.metrics import metrics
+
+SSE, NDJSON = "sse", "ndjson"
+_KEEPALIVE = {SSE: ": ping\n\n", NDJSON: "\n"}
+
+# 当前打开的流客户端（保活任务遍历）
+_clients: Set["StreamClient"] = set()
+
+STREAM_CLIENTS = metrics.gauge("stream_clients", "SSE / NDJSON 流客户端数", ["format"])
+STREAM_DROPPED = metrics.counter(
+    "stream_dropped_total", "发送队列已满被断开的流客户端数", ["format"]
+)
+
+
+def encode_event(fmt: str, seq: Optional[int], frame: str) -> str:
+    """
+    把已编码的消息包装为 SSE 事件或 NDJSON 行
+
+    id 为房间消息序号，用于续传；只有写入环形缓冲的消息有序号，聚合 / 汇总 / 统计帧
+    等不在缓冲中的帧不带 id（SSE 不写 id 行时 Last-Event-ID 保持为上一条消息的序号）。
+    """
+    if fmt == SSE:
+        if seq is None:
+            return f"data: {frame}\n\n"
+        return f"id: {seq}\ndata: {frame}\n\n"
+    if seq is None:
+        return f'{{"data":{frame}}}\n'
+    return f'{{"id":{seq},"data":{frame}}}\n'
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+class StreamClient:
+    """
+    单向 HTTP 流（SSE / NDJSON）客户端
+
+    作为普通客户端加入房间的客户端集合，与 WebSocket 客户端共用同一次扇出；
+    扇出只把编码后的事件放入有界队列，由响应生成器写出。队列满（消费过慢）时
+    断开该客户端，不拖慢房间的其它客户端。
+    """
+
+    __slots__ = ("room", "format", "queue", "closed", "idle")
+
+    def __init__(self, room: Any, fmt: str, max_queue: int = 1000):
+        self.room = room
+        self.format = fmt
+        self.queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(max_queue)
+        self.closed = False
+        self.idle = True  # 上一个保活周期内没有发送过事件
+
+    @property
+    def client_state(self) -> WebSocketState:
+        return WebSocketState.DISCONNECTED if self.closed else WebSocketState.CONNECTED
+
+    @property
+    def _closed(self) -> bool:
+        return self.closed
+
+    def _put(self, chunk: Optional[str]) -> bool:
+        try:
+            self.queue.put_nowait(chunk)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def send_text(self, frame: str, seq: Optional[int] = None) -> None:
+        """放入一条事件；seq 为该消息在房间环形缓冲中的序号（没有时不带事件 id）"""
+        if self.closed:
+            raise RuntimeError("stream was closed")
+        self.idle = False
+        if not self._put(encode_event(self.format, seq, frame)):
+            # 写入结束标记使响应正常结束，客户端随后带 Last-Event-ID 重连续传
+            self._end()
+            STREAM_DROPPED.labels(self.format).inc()
+            raise RuntimeError("stream queue full, stream was closed")
+
+    def _end(self) -> None:
+        self.closed = True
+        if not self._put(None):
+            # 队列已满时丢弃最早的事件，保证结束标记能写入
+            self.queue.get_nowait()
+            self._put(None)
+
+    async def close(self, code: int = 1000) -> None:
+        """结束响应（排空等场景），已排队的事件先写出"""
+        self._end()
+
+    def keepalive(self) -> None:
+        """上一个周期内没有事件时写出保活内容（SSE 注释行 / NDJSON 空行）"""
+        if self.idle and not self.closed:
+            self._put(_KEEPALIVE[self.format])
+        self.idle = True
+
+    async def events(
+        self, backlog: Iterable[Tuple[Optional[int], str]] = ()
+    ) -> AsyncIterator[str]:
+        """响应内容：先写出续传的缓冲消息，之后逐条写出扇出的事件"""
+        STREAM_CLIENTS.labels(self.format).inc()
+        _clients.add(self)
+        try:
+            if self.format == SSE:
+                yield "retry: 3000\n\n"
+            for seq, frame in backlog:
+                yield encode_event(self.format, seq, frame)
+            while True:
+                chunk = await self.queue.get()
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            self.closed = True
+            _clients.discard(self)
+            STREAM_CLIENTS.labels(self.format).dec()
+
+
+async def run_keepalive(interval: float = 15.0) -> None:
+    """
+    定期为空闲的流客户端写出保活内容，防止代理因空闲断开连接
+
+    所有客户端共用一个定时任务，不为每个连接单独计时。
+    """
+    while True:
+        await asyncio.sleep(interval)
+        for client in list(_clients):
+            client.keepalive()